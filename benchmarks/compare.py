@@ -0,0 +1,258 @@
+"""
+Performance regression gate, comparing a benchmark run against a baseline.
+
+A case regresses when its best run is slower than the baseline's by more than
+the threshold, or when its peak memory grew by more than the memory threshold.
+The best run is compared, rather than the median, since it's the least
+affected by other processes running on the machine. The exit status is 1
+when any case regressed, or when a case of the baseline is missing from the
+run (a crashed or dropped case), unless --allow-missing is given.
+
+When no run is given, the cases of the baseline are run again first.
+
+Run with: python -m benchmarks.compare [--run run.json] [--threshold 0.25]
+"""
+
+import argparse
+import json
+from collections.abc import Iterable, Sequence
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+from cys403_project.crypto.imgenc import BlockMode
+
+from .crypto import image_cases, results_to_json, rsa_cases
+from .measure import Measurement
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Key generation time depends on how far the random primes are, so it varies a
+# lot more between runs than the other cases.
+DEFAULT_KEYGEN_THRESHOLD = 1.0
+
+# Memory growth smaller than this is never a regression, as small allocations
+# vary between runs and Python versions.
+DEFAULT_MEMORY_SLACK = 1 << 16
+
+
+class Comparison(NamedTuple):
+    """Comparison of a case between the baseline and the run."""
+
+    name: str
+    # Relative slowdown, positive when the run is slower
+    slowdown: float
+    # Relative peak memory growth, positive when the run uses more memory
+    memory_growth: float
+    regressed: bool
+
+
+def _speed(result: dict[str, Any]) -> float:
+    """Get how fast the best run of a case was, higher is better."""
+    return (result["size"] or 1) / max(float(result["min"]), 1e-12)
+
+
+def compare(  # noqa: PLR0913
+    baseline: dict[str, Any],
+    run: dict[str, Any],
+    *,
+    threshold: float,
+    memory_threshold: float,
+    keygen_threshold: float = DEFAULT_KEYGEN_THRESHOLD,
+    memory_slack: int = DEFAULT_MEMORY_SLACK,
+    ignore: Iterable[str] = (),
+) -> tuple[list[Comparison], list[str]]:
+    """
+    Compare the cases of a run with the ones of a baseline.
+
+    Args:
+        baseline: Baseline results, as written by the benchmarks.
+        run: Results to check.
+        threshold: Largest allowed relative slowdown.
+        memory_threshold: Largest allowed relative peak memory growth.
+        keygen_threshold: Largest allowed relative slowdown of key generation.
+        memory_slack: Memory growth in bytes that is always allowed.
+        ignore: Patterns of case names not to check.
+
+    Returns:
+        The comparison of every case in both, and the names of the baseline
+        cases missing from the run.
+
+    """
+    patterns = tuple(ignore)
+    results = {result["name"]: result for result in run["results"]}
+
+    comparisons: list[Comparison] = []
+    missing: list[str] = []
+    for expected in baseline["results"]:
+        name = expected["name"]
+        if any(fnmatch(name, pattern) for pattern in patterns):
+            continue
+
+        actual = results.get(name)
+        if actual is None:
+            missing.append(name)
+            continue
+
+        slowdown = _speed(expected) / _speed(actual) - 1
+        allowed = (
+            keygen_threshold
+            if expected["params"].get("operation") == "keygen"
+            else threshold
+        )
+        growth = actual["peak_memory"] - expected["peak_memory"]
+        memory_growth = growth / max(expected["peak_memory"], 1)
+
+        comparisons.append(
+            Comparison(
+                name,
+                slowdown,
+                memory_growth,
+                slowdown > allowed
+                or (memory_growth > memory_threshold and growth > memory_slack),
+            )
+        )
+
+    return comparisons, missing
+
+
+def rerun(
+    baseline: dict[str, Any], repeat: int, keygen_repeat: int, max_time: float
+) -> list[Measurement]:
+    """Run the benchmark cases found in a baseline again."""
+    image_params = [
+        result["params"]
+        for result in baseline["results"]
+        if result["name"].startswith("image.")
+    ]
+    rsa_params = [
+        result["params"]
+        for result in baseline["results"]
+        if result["name"].startswith("rsa.")
+    ]
+
+    results: list[Measurement] = []
+    if image_params:
+        results.extend(
+            image_cases(
+                sorted({params["size"] for params in image_params}),
+                sorted({params["key_size"] for params in image_params}),
+                [
+                    mode
+                    for mode in BlockMode
+                    if any(params["mode"] == mode.name for params in image_params)
+                ],
+                repeat,
+                max_time,
+            )
+        )
+    if rsa_params:
+        results.extend(
+            rsa_cases(
+                sorted({params["bits"] for params in rsa_params}),
+                repeat,
+                keygen_repeat,
+                max_time,
+                next(
+                    (params["workers"] for params in rsa_params if "workers" in params),
+                    None,
+                ),
+            )
+        )
+
+    return results
+
+
+def _print_report(comparisons: Sequence[Comparison], missing: Sequence[str]) -> None:
+    """Print the comparison of every case."""
+    print(f"{'case':<32} {'slowdown':>10} {'memory':>10}")
+    for comparison in comparisons:
+        print(
+            f"{comparison.name:<32}",
+            f"{comparison.slowdown:>+10.1%}",
+            f"{comparison.memory_growth:>+10.1%}",
+            "REGRESSED" if comparison.regressed else "",
+        )
+    for name in missing:
+        print(f"{name:<32} {'missing':>10}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Compare a run with the baseline, exiting with 1 when a case failed."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--run", type=Path, help="results to check, the baseline is run when omitted"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="largest allowed slowdown (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.25,
+        help="largest allowed peak memory growth (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--keygen-threshold",
+        type=float,
+        default=DEFAULT_KEYGEN_THRESHOLD,
+        help="largest allowed key generation slowdown (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--memory-slack", type=int, default=DEFAULT_MEMORY_SLACK, help="in bytes"
+    )
+    parser.add_argument(
+        "--ignore", action="append", default=[], help="case name pattern to skip"
+    )
+    parser.add_argument(
+        "--allow-missing",
+        action="store_true",
+        help="don't fail when baseline cases are missing from the run",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--keygen-repeat", type=int, default=3)
+    parser.add_argument("--max-time", type=float, default=10)
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="write the run as the new baseline instead of comparing",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    if args.run is not None:
+        run = json.loads(args.run.read_text())
+    else:
+        run = results_to_json(
+            rerun(baseline, args.repeat, args.keygen_repeat, args.max_time)
+        )
+
+    if args.update:
+        args.baseline.write_text(json.dumps(run, indent=2) + "\n")
+        return 0
+
+    comparisons, missing = compare(
+        baseline,
+        run,
+        threshold=args.threshold,
+        memory_threshold=args.memory_threshold,
+        keygen_threshold=args.keygen_threshold,
+        memory_slack=args.memory_slack,
+        ignore=args.ignore,
+    )
+    _print_report(comparisons, missing)
+
+    regressions = sum(comparison.regressed for comparison in comparisons)
+    if regressions:
+        print(f"{regressions} case(s) regressed.")
+    if missing and not args.allow_missing:
+        print(f"{len(missing)} case(s) missing from the run.")
+    return 1 if regressions or (missing and not args.allow_missing) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,228 @@
+"""
+Benchmark of the image and RSA encryption engines.
+
+Image encryption is measured over buffer, key and mode sizes, and RSA over
+modulus sizes. Every case reports its latency percentiles, throughput and peak
+traced memory, and all results can be written as JSON to compare runs.
+
+Run with: python -m benchmarks.crypto [--groups image rsa] [--output run.json]
+"""
+
+import argparse
+import json
+from collections.abc import Iterator, Sequence
+from functools import partial
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+from cys403_project.crypto.rsa import RSAEncryptor
+from cys403_project.tracing import peak_rss
+
+from .measure import PERCENTILES, Measurement, environment, measure
+
+# Version of the JSON results layout.
+RESULTS_VERSION = 1
+
+DEFAULT_IMAGE_SIZES = (1 << 10, 1 << 16, 1 << 20, 1 << 24, 1 << 28)
+DEFAULT_KEY_SIZES = (16, 32)
+DEFAULT_RSA_SIZES = (1024, 2048, 4096, 8192)
+
+_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size in bytes, with an optional K, M or G suffix."""
+    text = text.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in _UNITS else ""
+    return int(text.removesuffix(unit)) * _UNITS[unit]
+
+
+def format_size(size: int) -> str:
+    """Format a size in bytes with the largest exact K, M or G suffix."""
+    for unit, factor in reversed(_UNITS.items()):
+        if size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def image_cases(
+    sizes: Sequence[int],
+    key_sizes: Sequence[int],
+    modes: Sequence[BlockMode],
+    repeat: int,
+    max_time: float,
+) -> Iterator[Measurement]:
+    """Measure image encryption and decryption."""
+    rng = np.random.default_rng(0)
+
+    for size in sizes:
+        image = rng.bytes(size)
+        # Bound even when no case runs, for the del below
+        encrypted = b""
+
+        for key_size in key_sizes:
+            for mode in modes:
+                encryptor = ImageEncryptor(ImageEncryptor.keygen(key_size), mode)
+                encrypted = encryptor.encrypt(image)
+                name = f"{mode.name.lower()}.k{key_size}.{format_size(size)}"
+                params = {"mode": mode.name, "key_size": key_size, "size": size}
+
+                yield measure(
+                    f"image.encrypt.{name}",
+                    partial(encryptor.encrypt, image),
+                    repeat=repeat,
+                    max_time=max_time,
+                    size=size,
+                    params={"operation": "encrypt", **params},
+                )
+                yield measure(
+                    f"image.decrypt.{name}",
+                    partial(encryptor.decrypt, encrypted),
+                    repeat=repeat,
+                    max_time=max_time,
+                    size=size,
+                    params={"operation": "decrypt", **params},
+                )
+
+        # Freed before the next, larger, image is generated
+        del image, encrypted
+
+
+def rsa_cases(
+    sizes: Sequence[int],
+    repeat: int,
+    keygen_repeat: int,
+    max_time: float,
+    workers: Optional[int],
+) -> Iterator[Measurement]:
+    """Measure RSA key generation, encryption and decryption."""
+    for bits in sizes:
+        yield measure(
+            f"rsa.keygen.{bits}",
+            partial(RSAEncryptor.keygen, bits, workers=workers),
+            repeat=keygen_repeat,
+            max_time=max_time,
+            params={"operation": "keygen", "bits": bits, "workers": workers},
+        )
+
+        public_key, private_key = RSAEncryptor.keygen(bits, crt=True, workers=workers)
+        encryptor = RSAEncryptor(public_key=public_key)
+        message = bytes(encryptor.max_message_size)
+        encrypted = encryptor.encrypt(message)
+
+        yield measure(
+            f"rsa.encrypt.{bits}",
+            partial(encryptor.encrypt, message),
+            repeat=repeat,
+            max_time=max_time,
+            size=len(message),
+            params={"operation": "encrypt", "bits": bits},
+        )
+
+        for operation, key in (
+            ("decrypt", private_key[:2]),
+            ("decrypt_crt", private_key),
+        ):
+            decryptor = RSAEncryptor(private_key=key)
+            yield measure(
+                f"rsa.{operation}.{bits}",
+                partial(decryptor.decrypt, encrypted),
+                repeat=repeat,
+                max_time=max_time,
+                size=len(message),
+                params={"operation": operation, "bits": bits},
+            )
+
+
+def results_to_json(results: Sequence[Measurement]) -> dict[str, Any]:
+    """Get a benchmark run as a JSON serializable dict."""
+    return {
+        "version": RESULTS_VERSION,
+        "environment": environment(),
+        "peak_rss": peak_rss(),
+        "results": [result.to_json() for result in results],
+    }
+
+
+def _print_result(result: Measurement) -> None:
+    """Print a result as a table row."""
+    throughput = result.throughput
+    print(
+        f"{result.name:<32}",
+        *(f"{result.percentile(q) * 1000:>10.3f}" for q in PERCENTILES),
+        f"{throughput / (1 << 20):>10.2f}" if throughput is not None else f"{'-':>10}",
+        f"{result.peak_memory / (1 << 20):>10.2f}",
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmarks, printing every result as soon as it's measured."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--groups", nargs="+", choices=("image", "rsa"), default=["image", "rsa"]
+    )
+    parser.add_argument(
+        "--image-sizes", type=parse_size, nargs="+", default=DEFAULT_IMAGE_SIZES
+    )
+    parser.add_argument("--key-sizes", type=int, nargs="+", default=DEFAULT_KEY_SIZES)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=[mode.name.lower() for mode in BlockMode],
+        default=[mode.name.lower() for mode in BlockMode],
+    )
+    parser.add_argument("--rsa-sizes", type=int, nargs="+", default=DEFAULT_RSA_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keygen-repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-time",
+        type=float,
+        default=10,
+        help="seconds of timed runs after which a case stops repeating",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="key generation processes"
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    print(
+        f"{'case':<32}",
+        *(f"{f'p{q} ms':>10}" for q in PERCENTILES),
+        f"{'MB/s':>10}",
+        f"{'peak MB':>10}",
+    )
+
+    results: list[Measurement] = []
+    if "image" in args.groups:
+        for result in image_cases(
+            args.image_sizes,
+            args.key_sizes,
+            [BlockMode[mode.upper()] for mode in args.modes],
+            args.repeat,
+            args.max_time,
+        ):
+            _print_result(result)
+            results.append(result)
+    if "rsa" in args.groups:
+        for result in rsa_cases(
+            args.rsa_sizes,
+            args.repeat,
+            args.keygen_repeat,
+            args.max_time,
+            args.workers,
+        ):
+            _print_result(result)
+            results.append(result)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results_to_json(results), indent=2) + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+"""
+Benchmark of RSA key generation, against pycryptodome's getPrime.
+
+Run with: python -m benchmarks.keygen [--sizes 1024 2048] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Sequence
+from typing import Callable, Optional
+
+from Crypto.Util.number import getPrime
+
+from cys403_project.crypto.primes import generate_primes
+
+
+def median_time(function: Callable[[], object], repeat: int) -> float:
+    """Get the median run time of a function, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Print the time to find the two primes of a key, for every modulus size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048, 3072])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print("Median time to find the primes of a key, in seconds.")
+    print(f"{'size':>6} {'getPrime':>10} {'sieve':>10} {'parallel':>10}")
+    for size in args.sizes:
+        sizes = (size - size // 2, size // 2)
+
+        print(
+            f"{size:>6}",
+            f"{median_time(lambda: [getPrime(b) for b in sizes], args.repeat):>10.3f}",  # noqa: B023
+            f"{median_time(lambda: generate_primes(sizes, 1), args.repeat):>10.3f}",  # noqa: B023
+            f"{median_time(lambda: generate_primes(sizes), args.repeat):>10.3f}",  # noqa: B023
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
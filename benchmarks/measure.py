@@ -0,0 +1,128 @@
+"""Measurement of run time, throughput and memory of a single benchmark case."""
+
+import gc
+import importlib.util
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+# Percentiles reported for every case.
+PERCENTILES = (50, 90, 99)
+
+
+class Measurement(NamedTuple):
+    """Result of a benchmark case."""
+
+    name: str
+    params: dict[str, Any]
+    # Run times in seconds, in the order they were measured
+    times: list[float]
+    # Bytes processed by a single run, None when it's not a throughput case
+    size: Optional[int]
+    # Highest amount of memory allocated during a run, in bytes
+    peak_memory: int
+
+    def percentile(self, q: float) -> float:
+        """Get a percentile of the run times, interpolated between runs."""
+        times = sorted(self.times)
+        position = (len(times) - 1) * q / 100
+        low = math.floor(position)
+        high = math.ceil(position)
+        return times[low] + (times[high] - times[low]) * (position - low)
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Get the median throughput, in bytes per second."""
+        if self.size is None:
+            return None
+        return self.size / max(self.percentile(50), 1e-12)
+
+    def to_json(self) -> dict[str, Any]:
+        """Get the result as a JSON serializable dict."""
+        return {
+            "name": self.name,
+            "params": self.params,
+            "runs": len(self.times),
+            "size": self.size,
+            "mean": statistics.fmean(self.times),
+            "min": min(self.times),
+            "max": max(self.times),
+            **{f"p{q}": self.percentile(q) for q in PERCENTILES},
+            "throughput": self.throughput,
+            "peak_memory": self.peak_memory,
+        }
+
+
+def measure(  # noqa: PLR0913
+    name: str,
+    function: Callable[[], object],
+    *,
+    repeat: int,
+    max_time: float = math.inf,
+    size: Optional[int] = None,
+    params: Optional[dict[str, Any]] = None,
+) -> Measurement:
+    """
+    Run a benchmark case and measure it.
+
+    The case is run once with tracemalloc for the peak memory, then timed
+    without it, since tracing slows down allocations.
+
+    Args:
+        name: Name of the case.
+        function: Runs the case once.
+        repeat: Number of timed runs.
+        max_time: Stop after this many seconds of timed runs, even if there
+            are runs left. At least one run is always done.
+        size: Bytes processed by a single run.
+        params: Parameters of the case, kept in the result.
+
+    Returns:
+        The measurement.
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times: list[float] = []
+    deadline = time.perf_counter() + max_time
+    while len(times) < repeat and (not times or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return Measurement(name, params or {}, times, size, peak_memory)
+
+
+def environment() -> dict[str, Any]:
+    """Get a description of the machine and interpreter the benchmarks ran on."""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": _cpu_count(),
+        "numpy": np.__version__,
+        "gmpy2": importlib.util.find_spec("gmpy2") is not None,
+    }
+
+
+def _cpu_count() -> Optional[int]:
+    """Get the number of CPUs usable by the process."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count()
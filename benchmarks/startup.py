@@ -0,0 +1,289 @@
+"""
+Benchmark of the application startup.
+
+Every module is imported in a fresh interpreter with -X importtime, reporting
+its import time, the slowest modules it imported, and which heavy dependencies
+got imported with it (they should only be imported on first use). With
+--first-frame the application is launched too, with tracing enabled, and the
+time until its first frame is drawn is reported, which needs a display.
+
+Run with: python -m benchmarks.startup [--first-frame] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from functools import partial
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from cys403_project.tracing import TRACE_ENV
+
+from .crypto import results_to_json
+from .measure import PERCENTILES, Measurement
+
+DEFAULT_MODULES = (
+    "cys403_project.ui.main",
+    "cys403_project.ui.worker_pool",
+    "cys403_project.ui.key_pool",
+    "cys403_project.crypto.rsa",
+    "cys403_project.cli",
+)
+
+# Dependencies that are slow to import, and shouldn't be imported at startup.
+HEAVY_MODULES = ("numpy", "PIL", "Crypto", "multiprocessing", "concurrent.futures")
+
+DEFAULT_COMMAND = (sys.executable, "-m", "cys403_project")
+
+# Written to stderr right before the measured import, to skip the modules
+# imported by the interpreter itself.
+_MARKER = "-- startup benchmark --"
+
+
+class ImportTime(NamedTuple):
+    """Import time of a single module, as reported by -X importtime."""
+
+    name: str
+    # Time spent in the module itself, in microseconds
+    self_us: int
+    # Time including the modules it imported, in microseconds
+    cumulative_us: int
+    # 0 for modules imported directly, 1 for the modules they import, ...
+    depth: int
+
+
+class StartupError(Exception):
+    """Exception for a module that failed to import, or an app that didn't start."""
+
+
+def parse_importtime(text: str) -> list[ImportTime]:
+    """
+    Parse the -X importtime report.
+
+    Lines before the benchmark marker are skipped when it's found.
+
+    Args:
+        text: Standard error of the interpreter.
+
+    Returns:
+        The modules in the order they finished importing.
+
+    """
+    lines = text.splitlines()
+    if _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1 :]
+
+    imports: list[ImportTime] = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        # Skip the header
+        if not self_us.strip().isdigit():
+            continue
+
+        # Nested modules are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append(
+            ImportTime(name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+
+    return imports
+
+
+def import_module(module: str) -> list[ImportTime]:
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module: Name of the module.
+
+    Raises:
+        StartupError: When the import failed.
+
+    Returns:
+        The modules imported by the module.
+
+    """
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys; print({_MARKER!r}, file=sys.stderr); import {module}",
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        msg = f"Failed to import {module}: {error[0]}"
+        raise StartupError(msg)
+
+    return parse_importtime(result.stderr)
+
+
+def heavy_modules(imports: Sequence[ImportTime]) -> list[str]:
+    """Get the heavy dependencies found in the imported modules."""
+    names = {entry.name for entry in imports}
+    return [name for name in HEAVY_MODULES if name in names]
+
+
+def import_case(module: str, repeat: int, top: int) -> Measurement:
+    """Measure the import time of a module, over fresh interpreters."""
+    times: list[float] = []
+    imports: list[ImportTime] = []
+    for _ in range(repeat):
+        imports = import_module(module)
+        times.append(
+            sum(entry.cumulative_us for entry in imports if entry.depth == 0) / 1e6
+        )
+
+    slowest = sorted(imports, key=lambda entry: entry.self_us, reverse=True)[:top]
+    return Measurement(
+        f"import.{module}",
+        {
+            "operation": "import",
+            "module": module,
+            "modules": len(imports),
+            "heavy": heavy_modules(imports),
+            "slowest": [[entry.name, entry.self_us] for entry in slowest],
+        },
+        times,
+        None,
+        0,
+    )
+
+
+def first_frame(command: Sequence[str], timeout: float) -> float:
+    """
+    Launch the application and wait for its first frame.
+
+    Args:
+        command: Command launching the application.
+        timeout: Seconds to wait for the first frame.
+
+    Raises:
+        StartupError: When the application exited or timed out before drawing.
+
+    Returns:
+        Seconds from the launch to the end of the first frame.
+
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        trace = Path(directory) / "startup.jsonl"
+        start = time.time()
+        process = subprocess.Popen(  # noqa: S603
+            command,
+            env={**os.environ, TRACE_ENV: str(trace)},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.time() - start < timeout:
+                if trace.exists():
+                    for line in trace.read_text().splitlines():
+                        event = json.loads(line)
+                        if event["name"] == "app.startup":
+                            return event["timestamp"] / 1e6 + event["wall"] - start
+
+                if process.poll() is not None:
+                    msg = f"Application exited with status {process.returncode}"
+                    raise StartupError(msg)
+                time.sleep(0.01)
+        finally:
+            process.terminate()
+            process.wait()
+
+    msg = f"No frame was drawn in {timeout} seconds"
+    raise StartupError(msg)
+
+
+def first_frame_case(
+    command: Sequence[str], repeat: int, timeout: float
+) -> Measurement:
+    """Measure the time from launching the application to its first frame."""
+    return Measurement(
+        "startup.first_frame",
+        {"operation": "first_frame", "command": list(command)},
+        [first_frame(command, timeout) for _ in range(repeat)],
+        None,
+        0,
+    )
+
+
+def _print_result(result: Measurement) -> None:
+    """Print a result as a table row, with the modules it imported."""
+    print(
+        f"{result.name:<40}",
+        *(f"{result.percentile(q) * 1000:>10.1f}" for q in PERCENTILES),
+    )
+    if result.params.get("heavy"):
+        print(f"  heavy: {', '.join(result.params['heavy'])}")
+    for name, self_us in result.params.get("slowest", ()):
+        print(f"  {self_us / 1000:>8.1f} ms  {name}")
+
+
+def _run_case(case: Callable[[], Measurement]) -> Optional[Measurement]:
+    """Run a case and print its result, or why it failed."""
+    try:
+        result = case()
+    except StartupError as e:
+        print(e)
+        return None
+
+    _print_result(result)
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run the benchmarks, exiting with 1 when a case failed."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--top", type=int, default=5, help="slowest modules shown per case"
+    )
+    parser.add_argument(
+        "--first-frame", action="store_true", help="also launch the application"
+    )
+    parser.add_argument(
+        "--command",
+        nargs="+",
+        default=DEFAULT_COMMAND,
+        help="command launching the application",
+    )
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<40}", *(f"{f'p{q} ms':>10}" for q in PERCENTILES))
+
+    cases = [
+        partial(import_case, module, args.repeat, args.top) for module in args.modules
+    ]
+    if args.first_frame:
+        cases.append(partial(first_frame_case, args.command, args.repeat, args.timeout))
+
+    results: list[Measurement] = []
+    for case in cases:
+        result = _run_case(case)
+        if result is not None:
+            results.append(result)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results_to_json(results), indent=2) + "\n")
+
+    return 1 if len(results) < len(cases) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,9 @@
 APP_ID = "@APP_ID@"
 APP_NAME = "cys403_project"
 
+# First argument that selects the headless CLI instead of the GUI.
+CLI_COMMANDS = ("image", "rsa")
+
 PROJECT_HOME_PAGE_URL = "https://github.com/zefr0x/cys403_project"
 BUG_REPORT_URL = "https://github.com/zefr0x/cys403_project/issues/new/choose"
 
@@ -19,6 +19,15 @@ gettext.textdomain(BASE_ID)
 
 def main() -> int:
     """Entry point for the application."""
+    from cys403_project.__about__ import CLI_COMMANDS
+
+    # Commands run headless, anything else is passed to the GUI. The CLI is
+    # only imported when used, as it imports Pillow and the crypto modules.
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        from cys403_project.cli import main_cli
+
+        return main_cli(sys.argv[1:])
+
     from cys403_project.ui.main import main_ui
 
     main_ui(sys.argv)
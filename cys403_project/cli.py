@@ -0,0 +1,438 @@
+"""
+Headless command line interface, for batch processing without a display.
+
+Keys are read from text files holding base64 values, the same text the GUI
+shows: an image key file holds the symmetric key, an RSA public key file holds
+the public exponent and the modulo on separate lines, and an RSA private key
+file holds the private exponent and the modulo (followed by the CRT values when
+generated with them).
+
+Files are processed in parallel, one file per worker process.
+
+This module must not import GTK.
+"""
+
+import argparse
+import binascii
+import os
+import sys
+import time
+from base64 import b64decode, b64encode
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Callable, Optional
+
+from PIL import Image
+
+from cys403_project.crypto.cipher_image import CipherImageError, MappedCipherImage
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+from cys403_project.crypto.rsa import (
+    CRT_PRIVATE_KEY_LENGTH,
+    IntegrityError,
+    NonPrimeExponentError,
+    PadError,
+    RSAEncryptor,
+)
+
+CIPHER_IMAGE_SUFFIX = ".cipher_image"
+RSA_SUFFIX = ".rsa"
+
+# Image file suffixes picked up from input directories.
+IMAGE_SUFFIXES = frozenset((".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tiff", ".webp"))
+
+_MB = 1 << 20
+
+# Errors of a single file, reported without stopping the batch.
+_FILE_ERRORS = (OSError, ValueError, CipherImageError, PadError, IntegrityError)
+
+
+class KeyFileError(Exception):
+    """Exception for unreadable or invalid key files."""
+
+
+def read_key_file(path: Path) -> list[bytes]:
+    """
+    Read the base64 values of a key file, one per line.
+
+    Args:
+        path: Path of the key file.
+
+    Raises:
+        KeyFileError: If the file can't be read or contains invalid base64 text.
+
+    Returns:
+        The decoded values.
+
+    """
+    try:
+        lines = path.read_text().split()
+        return [b64decode(line, validate=True) for line in lines]
+    except (OSError, UnicodeDecodeError, binascii.Error) as e:
+        msg = f"Failed to read key file {path}: {e}"
+        raise KeyFileError(msg) from e
+
+
+def write_key_file(path: Path, values: Iterable[bytes], *, private: bool) -> None:
+    """
+    Write base64 values to a key file, one per line.
+
+    Args:
+        path: Path of the key file.
+        values: Values to write.
+        private: Make the file readable only by the user.
+
+    """
+    fd = os.open(
+        path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600 if private else 0o644
+    )
+    with os.fdopen(fd, "w") as f:
+        if private:
+            os.fchmod(f.fileno(), 0o600)
+        f.writelines(b64encode(value).decode("ascii") + "\n" for value in values)
+
+
+@contextmanager
+def _removed_on_error(target: Path) -> Iterator[None]:
+    """Remove the partly written target file when the block fails."""
+    try:
+        yield
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+
+
+def _encrypt_image_file(key: bytes, mode: BlockMode, source: str, target: str) -> int:
+    """Encrypt an image file into a cipher image file (job)."""
+    pm = Image.open(source).convert("RGB")  # Force RGB format
+    data = pm.tobytes()
+
+    with (
+        _removed_on_error(Path(target)),
+        MappedCipherImage.create(Path(target), *pm.size, len(key), mode) as cm,
+    ):
+        ImageEncryptor(key=key, mode=mode).encrypt_into(data, cm.data)
+
+    return len(data)
+
+
+def _decrypt_image_file(key: bytes, source: str, target: str) -> int:
+    """Decrypt a cipher image file into an image file (job)."""
+    with MappedCipherImage.open(Path(source)) as cm:
+        if cm.block_size is not None and cm.block_size != len(key):
+            msg = "Key size doesn't match the cipher image."
+            raise CipherImageError(msg)
+
+        # Damaged data would decrypt into a silently damaged image
+        corrupted = cm.corrupted_chunks()
+        if corrupted:
+            msg = f"Corrupted cipher image, {len(corrupted)} chunks failed the check."
+            raise CipherImageError(msg)
+
+        out = bytearray(max(len(cm.data) - len(key), 0))
+        size = ImageEncryptor(key=key, mode=cm.mode).decrypt_into(cm.data, out)
+
+        if size != cm.width * cm.height * 3:
+            msg = "Decrypted image size doesn't match, wrong key or mode."
+            raise CipherImageError(msg)
+
+        with _removed_on_error(Path(target)):
+            Image.frombytes(
+                mode="RGB", size=cm.get_size(), data=memoryview(out)[:size]
+            ).save(target)
+
+    return size
+
+
+def _encrypt_rsa_file(public_key: tuple[bytes, bytes], source: str, target: str) -> int:
+    """Encrypt a file with an RSA wrapped session key (job)."""
+    data = Path(source).read_bytes()
+    Path(target).write_bytes(RSAEncryptor(public_key=public_key).encrypt_hybrid(data))
+    return len(data)
+
+
+def _decrypt_rsa_file(private_key: tuple[bytes, ...], source: str, target: str) -> int:
+    """Decrypt a file encrypted with _encrypt_rsa_file (job)."""
+    data = RSAEncryptor(private_key=private_key).decrypt_hybrid(
+        Path(source).read_bytes()
+    )
+    Path(target).write_bytes(data)
+    return len(data)
+
+
+def _collect(inputs: Sequence[Path], suffixes: Optional[Iterable[str]]) -> list[Path]:
+    """
+    Get the input files, directories are expanded to their files.
+
+    Only files with one of the suffixes are taken from directories, when given.
+    """
+    allowed = None if suffixes is None else frozenset(suffixes)
+    files: list[Path] = []
+
+    for path in inputs:
+        if path.is_dir():
+            files.extend(
+                child
+                for child in sorted(path.iterdir())
+                if child.is_file()
+                and (allowed is None or child.suffix.lower() in allowed)
+            )
+        else:
+            files.append(path)
+
+    return files
+
+
+def _run_batch(
+    job: Callable[[str, str], int],
+    files: Sequence[tuple[Path, Path]],
+    workers: Optional[int],
+    unit: str,
+) -> int:
+    """
+    Run a job for every source and target pair, then report the throughput.
+
+    Args:
+        job: Picklable job taking the source and the target paths, and returning
+            the number of plain bytes it processed, so that encryption and
+            decryption throughputs can be compared.
+        files: Source and target paths.
+        workers: Number of worker processes. (default: number of CPUs)
+        unit: Name of the processed items in the report.
+
+    Returns:
+        Exit status, non-zero if any file failed.
+
+    """
+    if not files:
+        print("No input files.", file=sys.stderr)
+        return 1
+
+    processed_bytes = 0
+    processed = 0
+    failed = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(job, str(source), str(target)): source
+            for source, target in files
+        }
+
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is None:
+                processed_bytes += future.result()
+                processed += 1
+            elif isinstance(error, _FILE_ERRORS):
+                # A broken file doesn't stop the others
+                failed += 1
+                print(f"{futures[future]}: {error}", file=sys.stderr)
+            else:
+                raise error
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    print(
+        f"Processed {processed} {unit} ({processed_bytes / _MB:.2f} MB) "
+        f"in {elapsed:.3f} s: {processed_bytes / _MB / elapsed:.2f} MB/s, "
+        f"{processed / elapsed:.2f} {unit}/s"
+    )
+    if failed:
+        print(f"Failed to process {failed} {unit}.", file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+def _pair(
+    files: Sequence[Path], output: Path, rename: Callable[[Path], str]
+) -> list[tuple[Path, Path]]:
+    """
+    Pair every input file with its output file in the output directory.
+
+    A file given twice is only paired once.
+
+    Raises:
+        ValueError: When two input files would be written to the same output file.
+
+    """
+    pairs: dict[Path, Path] = {}
+    for path in files:
+        target = output / rename(path)
+        # Two workers writing the same file would silently lose one of them
+        other = pairs.setdefault(target, path)
+        if other.resolve() != path.resolve():
+            msg = f"Inputs {other} and {path} would both be written to {target}."
+            raise ValueError(msg)
+
+    output.mkdir(parents=True, exist_ok=True)
+    return [(path, target) for target, path in pairs.items()]
+
+
+def _read_key(path: Path, lengths: Iterable[int]) -> tuple[bytes, ...]:
+    """Read a key file, checking its number of values."""
+    values = tuple(read_key_file(path))
+    if len(values) not in lengths:
+        msg = f"Invalid key file {path}: unexpected number of values."
+        raise KeyFileError(msg)
+    return values
+
+
+def _image_command(args: argparse.Namespace) -> int:
+    """Handle the image commands."""
+    if args.action == "keygen":
+        write_key_file(args.output, [ImageEncryptor.keygen(args.size)], private=True)
+        return 0
+
+    (key,) = _read_key(args.key, (1,))
+
+    if args.action == "encrypt":
+        files = _pair(
+            _collect(args.inputs, IMAGE_SUFFIXES),
+            args.output,
+            lambda path: path.stem + CIPHER_IMAGE_SUFFIX,
+        )
+        job = partial(_encrypt_image_file, key, BlockMode[args.mode.upper()])
+    else:
+        files = _pair(
+            _collect(args.inputs, (CIPHER_IMAGE_SUFFIX,)),
+            args.output,
+            lambda path: path.stem + ".png",
+        )
+        job = partial(_decrypt_image_file, key)
+
+    return _run_batch(job, files, args.workers, "images")
+
+
+def _rsa_command(args: argparse.Namespace) -> int:
+    """Handle the RSA commands."""
+    if args.action == "keygen":
+        public_key, private_key = RSAEncryptor.keygen(
+            args.size, args.e, crt=True, workers=args.workers
+        )
+        # Appended rather than replaced, so "-o key.pub" keeps the private key
+        public_path = args.output.with_name(args.output.name + ".pub")
+        write_key_file(public_path, public_key, private=False)
+        write_key_file(args.output, private_key, private=True)
+        return 0
+
+    if args.action == "encrypt":
+        e, n = _read_key(args.key, (2,))
+        files = _pair(
+            _collect(args.inputs, None),
+            args.output,
+            lambda path: path.name + RSA_SUFFIX,
+        )
+        job = partial(_encrypt_rsa_file, (e, n))
+    else:
+        private_key = _read_key(args.key, (2, CRT_PRIVATE_KEY_LENGTH))
+        files = _pair(
+            _collect(args.inputs, (RSA_SUFFIX,)),
+            args.output,
+            lambda path: path.stem if path.suffix == RSA_SUFFIX else path.name,
+        )
+        job = partial(_decrypt_rsa_file, private_key)
+
+    return _run_batch(job, files, args.workers, "files")
+
+
+def _add_batch_arguments(parser: argparse.ArgumentParser, key_help: str) -> None:
+    """Add the arguments shared by all encrypt and decrypt commands."""
+    parser.add_argument("-k", "--key", type=Path, required=True, help=key_help)
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="output directory"
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("inputs", type=Path, nargs="+", help="files or directories")
+
+
+def _parser() -> argparse.ArgumentParser:
+    """Build the argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="cys403_project",
+        description="Encrypt and decrypt files in batch, without the GUI.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Image commands
+    image_actions = commands.add_parser(
+        "image", help="image encryption"
+    ).add_subparsers(dest="action", required=True)
+
+    encrypt = image_actions.add_parser("encrypt", help="encrypt image files")
+    _add_batch_arguments(encrypt, "image key file")
+    encrypt.add_argument(
+        "-m",
+        "--mode",
+        choices=[mode.name.lower() for mode in BlockMode],
+        default=BlockMode.CBC.name.lower(),
+        help="cipher block mode (default: %(default)s)",
+    )
+    _add_batch_arguments(
+        image_actions.add_parser("decrypt", help="decrypt cipher image files"),
+        "image key file",
+    )
+
+    keygen = image_actions.add_parser("keygen", help="generate an image key file")
+    keygen.add_argument(
+        "-s", "--size", type=int, default=16, help="key size in bytes (default: 16)"
+    )
+    keygen.add_argument("-o", "--output", type=Path, required=True, help="key file")
+
+    # RSA commands
+    rsa_actions = commands.add_parser("rsa", help="RSA encryption").add_subparsers(
+        dest="action", required=True
+    )
+
+    _add_batch_arguments(
+        rsa_actions.add_parser("encrypt", help="encrypt files"), "public key file"
+    )
+    _add_batch_arguments(
+        rsa_actions.add_parser("decrypt", help="decrypt .rsa files"),
+        "private key file",
+    )
+
+    keygen = rsa_actions.add_parser(
+        "keygen", help="generate a private key file, and a .pub public key file"
+    )
+    keygen.add_argument(
+        "-s", "--size", type=int, default=2048, help="modulo size in bits"
+    )
+    keygen.add_argument("-e", type=int, default=65537, help="public exponent")
+    keygen.add_argument(
+        "-j", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    keygen.add_argument(
+        "-o", "--output", type=Path, required=True, help="private key file"
+    )
+
+    return parser
+
+
+def main_cli(argv: Sequence[str]) -> int:
+    """
+    Run a command without the GUI.
+
+    Args:
+        argv: Command line arguments, without the program name.
+
+    Returns:
+        Exit status.
+
+    """
+    args = _parser().parse_args(argv)
+
+    try:
+        if args.command == "image":
+            return _image_command(args)
+        return _rsa_command(args)
+    except (KeyFileError, NonPrimeExponentError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
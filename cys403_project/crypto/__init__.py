@@ -1,19 +1,90 @@
-"""The crypto implementation part of the application."""
+"""
+The crypto implementation part of the application.
 
-from .imgenc import ImageEncryptor
-from .rsa import (
-    MessageTooLongError,
-    PadError,
-    PrivateKeyError,
-    PublicKeyError,
-    RSAEncryptor,
-)
+Names are imported from their modules on first access, so importing one module
+of the package doesn't import the heavy dependencies of the others (NumPy for
+image encryption, pycryptodome for hybrid RSA encryption).
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .cipher_image import CipherImage, CipherImageError, MappedCipherImage
+    from .imgenc import (
+        BlockMode,
+        ImageCTRContext,
+        ImageDecryptContext,
+        ImageEncryptContext,
+        ImageEncryptor,
+    )
+    from .primes import SearchCancelledError, generate_primes
+    from .rsa import (
+        FrameError,
+        IntegrityError,
+        MessageTooLongError,
+        PadError,
+        PrivateKeyError,
+        PublicKeyError,
+        RSABlockReader,
+        RSABlockWriter,
+        RSAEncryptor,
+    )
+
+# Module defining every exported name.
+_EXPORTS = {
+    "BlockMode": ".imgenc",
+    "CipherImage": ".cipher_image",
+    "CipherImageError": ".cipher_image",
+    "FrameError": ".rsa",
+    "ImageCTRContext": ".imgenc",
+    "ImageDecryptContext": ".imgenc",
+    "ImageEncryptContext": ".imgenc",
+    "ImageEncryptor": ".imgenc",
+    "IntegrityError": ".rsa",
+    "MappedCipherImage": ".cipher_image",
+    "MessageTooLongError": ".rsa",
+    "PadError": ".rsa",
+    "PrivateKeyError": ".rsa",
+    "PublicKeyError": ".rsa",
+    "RSABlockReader": ".rsa",
+    "RSABlockWriter": ".rsa",
+    "RSAEncryptor": ".rsa",
+    "SearchCancelledError": ".primes",
+    "generate_primes": ".primes",
+}
 
 __all__ = [
+    "BlockMode",
+    "CipherImage",
+    "CipherImageError",
+    "FrameError",
+    "ImageCTRContext",
+    "ImageDecryptContext",
+    "ImageEncryptContext",
     "ImageEncryptor",
+    "IntegrityError",
+    "MappedCipherImage",
     "MessageTooLongError",
     "PadError",
     "PrivateKeyError",
     "PublicKeyError",
+    "RSABlockReader",
+    "RSABlockWriter",
     "RSAEncryptor",
+    "SearchCancelledError",
+    "generate_primes",
 ]
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    """Import an exported name from its module on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+
+    value = getattr(import_module(module, __name__), name)
+    # Later accesses don't go through __getattr__
+    globals()[name] = value
+    return value
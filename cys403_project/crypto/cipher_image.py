@@ -0,0 +1,498 @@
+r"""
+Cipher image file format.
+
+A cipher image file starts with a fixed size binary header (big endian):
+
+    magic        8 bytes  b"\x89CIPHIMG"
+    version      uint16
+    width        uint32
+    height       uint32
+    channels     uint8    number of bytes per pixel (3 for RGB)
+    mode         uint8    cipher block mode (0: CBC, 1: CTR)
+    block_size   uint16   block (key) size in bytes
+    chunk_size   uint32   bytes covered by each checksum, 0 when there is none
+    chunk_count  uint32   number of checksums
+    data_size    uint64   size of the data (IV and cipher blocks)
+
+followed by chunk_count CRC32 checksums (uint32), and then the data as it was
+produced by ImageEncryptor, which starts with the IV.
+
+Files written by older versions start with ASCII lines of the (optional) mode, the
+width and the height, followed directly by the data. They are still readable.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional, Self, Union
+
+from .imgenc import BlockMode
+
+MAGIC = b"\x89CIPHIMG"
+VERSION = 1
+
+# Default amount of data covered by each checksum.
+DEFAULT_CHECKSUM_CHUNK_SIZE = 1 << 22
+
+_HEADER = struct.Struct(">8sHIIBBHIIQ")
+_CHECKSUM = struct.Struct(">I")
+_MODE_IDS = {BlockMode.CBC: 0, BlockMode.CTR: 1}
+
+# Bytes per pixel of RGB images.
+RGB_CHANNELS = 3
+
+
+class CipherImageError(ValueError):
+    """Exception for invalid or corrupted cipher image files."""
+
+
+class _Header(NamedTuple):
+    """Parsed cipher image header."""
+
+    version: int
+    width: int
+    height: int
+    channels: int
+    mode: BlockMode
+    block_size: Optional[int]
+    chunk_size: int
+    checksums: tuple[int, ...]
+    data_offset: int
+    data_size: Optional[int]
+
+
+def _expected_data_size(
+    width: int, height: int, channels: int, mode: BlockMode, block_size: int
+) -> int:
+    """Get the size of the encryption of an image, including the IV and padding."""
+    size = width * height * channels
+    if mode == BlockMode.CTR:
+        return block_size + size
+    return block_size + (size // block_size + 1) * block_size
+
+
+def _encode_header(  # noqa: PLR0913
+    width: int,
+    height: int,
+    mode: BlockMode,
+    block_size: int,
+    data_size: int,
+    chunk_size: int,
+    checksums: list[int],
+    channels: int = RGB_CHANNELS,
+) -> bytes:
+    """Create the header and checksum table of a cipher image file."""
+    return _HEADER.pack(
+        MAGIC,
+        VERSION,
+        width,
+        height,
+        channels,
+        _MODE_IDS[mode],
+        block_size,
+        chunk_size,
+        len(checksums),
+        data_size,
+    ) + b"".join(_CHECKSUM.pack(checksum) for checksum in checksums)
+
+
+def _parse_legacy_header(f: Union[BinaryIO, mmap.mmap]) -> _Header:
+    """
+    Read the ASCII lines of the (optional) mode, the width and the height.
+
+    f is left at the start of the data.
+    """
+    f.seek(0)
+    try:
+        line = f.readline().decode("ascii").strip()
+
+        # Files without a mode line are all encrypted in CBC mode
+        if line.isdigit():
+            mode = BlockMode.CBC
+        else:
+            mode = BlockMode(line)
+            line = f.readline().decode("ascii").strip()
+
+        width = int(line)
+        height = int(f.readline().decode("ascii").strip())
+    except ValueError as err:
+        msg = "Not a cipher image file."
+        raise CipherImageError(msg) from err
+
+    return _Header(0, width, height, RGB_CHANNELS, mode, None, 0, (), f.tell(), None)
+
+
+def _parse_header(f: Union[BinaryIO, mmap.mmap], file_size: int) -> _Header:
+    """
+    Read and validate the header of a cipher image file.
+
+    f is left at the start of the data.
+    """
+    fixed = f.read(_HEADER.size)
+
+    if not fixed.startswith(MAGIC):
+        return _parse_legacy_header(f)
+
+    if len(fixed) < _HEADER.size:
+        msg = "Truncated cipher image header."
+        raise CipherImageError(msg)
+
+    (
+        _magic,
+        version,
+        width,
+        height,
+        channels,
+        mode_id,
+        block_size,
+        chunk_size,
+        chunk_count,
+        data_size,
+    ) = _HEADER.unpack(fixed)
+
+    if version > VERSION:
+        msg = f"Unsupported cipher image version {version}."
+        raise CipherImageError(msg)
+
+    modes = {mode_id: mode for mode, mode_id in _MODE_IDS.items()}
+    if mode_id not in modes:
+        msg = f"Unknown cipher block mode {mode_id}."
+        raise CipherImageError(msg)
+    mode = modes[mode_id]
+
+    # Only RGB images are written, other values would give a wrong pixel geometry
+    if channels != RGB_CHANNELS:
+        msg = f"Unsupported number of channels {channels}, expected {RGB_CHANNELS}."
+        raise CipherImageError(msg)
+
+    table = f.read(chunk_count * _CHECKSUM.size)
+    data_offset = _HEADER.size + len(table)
+
+    if not block_size or data_size != _expected_data_size(
+        width, height, channels, mode, block_size
+    ):
+        msg = "Cipher image data size doesn't match its dimensions."
+        raise CipherImageError(msg)
+    if (chunk_size and chunk_count != -(-data_size // chunk_size)) or (
+        not chunk_size and chunk_count
+    ):
+        msg = "Cipher image checksum table doesn't match its data size."
+        raise CipherImageError(msg)
+    if file_size < data_offset + data_size:
+        msg = "Truncated cipher image data."
+        raise CipherImageError(msg)
+
+    checksums = tuple(checksum for (checksum,) in _CHECKSUM.iter_unpack(table))
+
+    return _Header(
+        version,
+        width,
+        height,
+        channels,
+        mode,
+        block_size,
+        chunk_size,
+        checksums,
+        data_offset,
+        data_size,
+    )
+
+
+def _checksums(
+    data: Union[bytes, memoryview], chunk_size: int, workers: Optional[int] = None
+) -> list[int]:
+    """
+    Compute the CRC32 of every chunk of the data.
+
+    zlib releases the GIL while hashing, so chunks are hashed in parallel threads.
+    """
+    view = memoryview(data)
+    with ThreadPoolExecutor(workers) as executor:
+        return list(
+            executor.map(
+                zlib.crc32,
+                (view[i : i + chunk_size] for i in range(0, len(view), chunk_size)),
+            )
+        )
+
+
+def _corrupted_chunks(
+    data: Union[bytes, memoryview],
+    chunk_size: int,
+    checksums: tuple[int, ...],
+    workers: Optional[int] = None,
+) -> list[int]:
+    """Get the indexes of the chunks that don't match their checksum."""
+    if not chunk_size:
+        return []
+
+    return [
+        i
+        for i, (expected, actual) in enumerate(
+            zip(checksums, _checksums(data, chunk_size, workers), strict=True)
+        )
+        if expected != actual
+    ]
+
+
+class CipherImage:
+    """Represent an encrypted image with its sizes and cipher block mode."""
+
+    def __init__(  # noqa: PLR0913
+        self,
+        width: int,
+        height: int,
+        data: bytes,
+        block_size: Optional[int],
+        mode: BlockMode = BlockMode.CBC,
+        checksums: tuple[int, ...] = (),
+        chunk_size: int = 0,
+    ) -> None:
+        """Initialize a cipher image."""
+        self.width = width
+        self.height = height
+        self.data = data
+        self.block_size = block_size
+        self.mode = mode
+        self.checksums = checksums
+        self.chunk_size = chunk_size
+
+    def write_to_file(
+        self, path: Path, chunk_size: int = DEFAULT_CHECKSUM_CHUNK_SIZE
+    ) -> None:
+        """
+        Write cipher image to a file.
+
+        Args:
+            path (Path): Path of the file.
+            chunk_size (int): Bytes covered by each checksum, 0 to not use checksums.
+
+        """
+        if self.block_size is None:
+            msg = "Block size is unknown, can't write the header."
+            raise CipherImageError(msg)
+
+        checksums = _checksums(self.data, chunk_size) if chunk_size else []
+        with Path.open(path, "wb") as f:
+            f.write(
+                _encode_header(
+                    self.width,
+                    self.height,
+                    self.mode,
+                    self.block_size,
+                    len(self.data),
+                    chunk_size,
+                    checksums,
+                )
+            )
+            f.write(self.data)
+
+    def get_size(self) -> tuple[int, int]:
+        """Get the image size in Pillow format."""
+        return (self.width, self.height)
+
+    def corrupted_chunks(self, workers: Optional[int] = None) -> list[int]:
+        """Get the indexes of the data chunks that don't match their checksum."""
+        return _corrupted_chunks(self.data, self.chunk_size, self.checksums, workers)
+
+    @staticmethod
+    def read_from_file(path: Path) -> "CipherImage":
+        """Read cipher image from a file."""
+        with Path.open(path, "rb") as f:
+            header = _parse_header(f, path.stat().st_size)
+            data = f.read(header.data_size or -1)
+
+        return CipherImage(
+            header.width,
+            header.height,
+            data,
+            header.block_size,
+            header.mode,
+            header.checksums,
+            header.chunk_size,
+        )
+
+
+class MappedCipherImage:
+    """
+    A cipher image file mapped into memory.
+
+    The header is only parsed when needed, and the data is a memoryview over the
+    mapped file, so opening a file doesn't read it nor copy it into memory. The
+    data can be passed directly to ImageEncryptor.decrypt_into(), or written to
+    with ImageEncryptor.encrypt_into() when the file is created with create().
+
+    Views taken from data must be released before calling close().
+    """
+
+    def __init__(self, path: Path, *, writable: bool = False) -> None:
+        """Map an existing cipher image file."""
+        with Path.open(path, "r+b" if writable else "rb") as f:
+            # Empty files can't be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                msg = "Empty cipher image file."
+                raise CipherImageError(msg)
+
+            self._map = mmap.mmap(
+                f.fileno(),
+                0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ,
+            )
+        self.path = path
+        self._writable = writable
+        self._data: Optional[memoryview] = None
+
+    @staticmethod
+    def open(path: Path) -> "MappedCipherImage":
+        """Map a cipher image file for reading."""
+        return MappedCipherImage(path)
+
+    @staticmethod
+    def create(  # noqa: PLR0913
+        path: Path,
+        width: int,
+        height: int,
+        block_size: int,
+        mode: BlockMode = BlockMode.CBC,
+        chunk_size: int = DEFAULT_CHECKSUM_CHUNK_SIZE,
+    ) -> "MappedCipherImage":
+        """
+        Create a cipher image file with room for its data and map it.
+
+        The checksums are written when the mapping is closed.
+
+        Args:
+            path (Path): Path of the file to create.
+            width (int): Image width.
+            height (int): Image height.
+            block_size (int): The block (key) size used for encryption.
+            mode (BlockMode): The cipher block mode the data is encrypted with.
+            chunk_size (int): Bytes covered by each checksum, 0 to not use checksums.
+
+        Returns:
+            MappedCipherImage: The mapped file, with a writable data view.
+
+        """
+        data_size = _expected_data_size(width, height, RGB_CHANNELS, mode, block_size)
+        chunk_count = -(-data_size // chunk_size) if chunk_size else 0
+
+        with Path.open(path, "wb") as f:
+            f.write(
+                _encode_header(
+                    width,
+                    height,
+                    mode,
+                    block_size,
+                    data_size,
+                    chunk_size,
+                    [0] * chunk_count,
+                )
+            )
+            f.truncate(f.tell() + data_size)
+
+        return MappedCipherImage(path, writable=True)
+
+    @cached_property
+    def _header(self) -> _Header:
+        """Parse the header on first use."""
+        self._map.seek(0)
+        return _parse_header(self._map, len(self._map))
+
+    @property
+    def version(self) -> int:
+        """Get the file format version, 0 for legacy files."""
+        return self._header.version
+
+    @property
+    def width(self) -> int:
+        """Get the image width."""
+        return self._header.width
+
+    @property
+    def height(self) -> int:
+        """Get the image height."""
+        return self._header.height
+
+    @property
+    def mode(self) -> BlockMode:
+        """Get the cipher block mode."""
+        return self._header.mode
+
+    @property
+    def block_size(self) -> Optional[int]:
+        """Get the block (key) size, unknown for legacy files."""
+        return self._header.block_size
+
+    @property
+    def data_offset(self) -> int:
+        """Get the offset of the encrypted data in the file."""
+        return self._header.data_offset
+
+    @property
+    def data(self) -> memoryview:
+        """Get a view of the encrypted data (starting with the IV) in the file."""
+        if self._data is None:
+            start = self._header.data_offset
+            stop = (
+                None
+                if self._header.data_size is None
+                else start + self._header.data_size
+            )
+            self._data = memoryview(self._map)[start:stop]
+        return self._data
+
+    @property
+    def chunk_count(self) -> int:
+        """Get the number of checksummed data chunks."""
+        return len(self._header.checksums)
+
+    def chunk(self, index: int) -> memoryview:
+        """Get a view of a checksummed data chunk."""
+        chunk_size = self._header.chunk_size
+        return self.data[index * chunk_size : (index + 1) * chunk_size]
+
+    def get_size(self) -> tuple[int, int]:
+        """Get the image size in Pillow format."""
+        return (self.width, self.height)
+
+    def corrupted_chunks(self, workers: Optional[int] = None) -> list[int]:
+        """Get the indexes of the data chunks that don't match their checksum."""
+        return _corrupted_chunks(
+            self.data, self._header.chunk_size, self._header.checksums, workers
+        )
+
+    def write_checksums(self) -> None:
+        """Compute the checksums of the data and write them to the file."""
+        header = self._header
+        checksums = (
+            _checksums(self.data, header.chunk_size) if header.chunk_size else []
+        )
+        table = b"".join(_CHECKSUM.pack(checksum) for checksum in checksums)
+
+        self._map[_HEADER.size : _HEADER.size + len(table)] = table
+        self.__dict__["_header"] = header._replace(checksums=tuple(checksums))
+
+    def flush(self) -> None:
+        """Write changes of the data back to the file."""
+        self._map.flush()
+
+    def close(self) -> None:
+        """Write the checksums of a created file, and unmap it."""
+        if self._writable and not self._map.closed:
+            self.write_checksums()
+        if self._data is not None:
+            self._data.release()
+            self._data = None
+        self._map.close()
+
+    def __enter__(self) -> Self:
+        """Use the mapped file as a context manager."""
+        return self
+
+    def __exit__(self, *_args: object) -> None:
+        """Unmap the file when leaving the context."""
+        self.close()
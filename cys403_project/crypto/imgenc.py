@@ -1,27 +1,289 @@
 """Image Encryption class."""
 
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from itertools import pairwise
+from mmap import mmap
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
 from secrets import token_bytes
+from typing import Any, Optional, Union
+
+import numpy as np
+
+# Default amount of bytes read at once when encrypting or decrypting files.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Objects supporting the buffer protocol that can be used as input or output.
+Buffer = Union[bytes, bytearray, memoryview, mmap, np.ndarray]
+
+# Size of a uint64 that holds the lower bytes of CTR counters.
+_COUNTER_WORD_SIZE = 8
+
+
+class BlockMode(Enum):
+    """Cipher block mode used to chain the block algorithm."""
+
+    CBC = "cbc"
+    CTR = "ctr"
+
+
+def _cbc_chain(blocks: np.ndarray, key: bytes) -> None:
+    """
+    CBC encrypt a matrix of blocks in place.
+
+    The first row must hold the IV (or the last cipher block of a previous call),
+    it is left as is.
+
+    Since the block algorithm is linear every cipher block is the XOR of the IV and
+    all previous plain blocks, and the inverted key when an odd number of block
+    algorithm applications are accumulated in it.
+    """
+    np.bitwise_xor.accumulate(blocks, axis=0, out=blocks)
+    blocks[1::2] ^= np.frombuffer(key, dtype=np.uint8) ^ 0xFF
+
+
+def _cbc_unchain(blocks: np.ndarray, key: bytes) -> np.ndarray:
+    """
+    CBC decrypt a matrix of blocks, where the first row is the IV.
+
+    Inverting after XOR with the key is the same as XOR with the inverted key.
+    """
+    return blocks[1:] ^ blocks[:-1] ^ (np.frombuffer(key, dtype=np.uint8) ^ 0xFF)
+
+
+def _ctr_keystream(key: bytes, iv: bytes, start: int, count: int) -> np.ndarray:
+    """
+    Generate the CTR keystream of count blocks starting from block index start.
+
+    The keystream of block i is the block algorithm applied to the counter IV + i,
+    as a big endian number modulo 2 ** (8 * block size). The lower (up to) 8 bytes
+    of the counters are computed as uint64, the higher bytes can only take two
+    values, with or without a carry from the lower ones.
+    """
+    blocksize = len(key)
+    low_size = min(blocksize, _COUNTER_WORD_SIZE)
+    high_size = blocksize - low_size
+    iv_int = int.from_bytes(iv, "big")
+
+    first = iv_int % (1 << (8 * low_size)) + start
+    counters = np.arange(count, dtype=np.uint64)
+    counters += np.uint64(first % (1 << 64))
+
+    keystream = np.empty((count, blocksize), dtype=np.uint8)
+    if high_size:
+        high = (iv_int >> (8 * low_size)) + (first >> 64)
+        high_values = np.frombuffer(
+            b"".join(
+                (value % (1 << (8 * high_size))).to_bytes(high_size, "big")
+                for value in (high, high + 1)
+            ),
+            dtype=np.uint8,
+        ).reshape(2, high_size)
+        # A counter smaller than the first one has wrapped around
+        carry = counters < np.uint64(first % (1 << 64))
+        keystream[:, :high_size] = high_values[carry.astype(np.intp)]
+    elif low_size < _COUNTER_WORD_SIZE:
+        counters %= np.uint64(1 << (8 * low_size))
+
+    keystream[:, high_size:] = (
+        counters.astype(">u8")
+        .view(np.uint8)
+        .reshape(count, _COUNTER_WORD_SIZE)[:, _COUNTER_WORD_SIZE - low_size :]
+    )
+
+    # block algorithm: invert the bits and xor with the key
+    keystream ^= np.frombuffer(key, dtype=np.uint8) ^ 0xFF
+    return keystream
+
+
+def _ctr_xor(
+    data: np.ndarray,
+    key: bytes,
+    iv: bytes,
+    offset: int,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    XOR data found at byte offset of the CTR stream with its keystream.
+
+    The keystream is generated for a chunk at a time, so it never takes more memory
+    than DEFAULT_CHUNK_SIZE. out may be the data itself.
+    """
+    if out is None:
+        out = np.empty_like(data)
+
+    blocksize = len(key)
+    chunk_size = max(DEFAULT_CHUNK_SIZE // blocksize, 1) * blocksize
+    position = 0
+    while position < len(data):
+        first_block, skip = divmod(offset + position, blocksize)
+        size = min(chunk_size - skip, len(data) - position)
+        count = -(-(skip + size) // blocksize)
+
+        keystream = _ctr_keystream(key, iv, first_block, count).reshape(-1)
+        np.bitwise_xor(
+            data[position : position + size],
+            keystream[skip : skip + size],
+            out=out[position : position + size],
+        )
+        position += size
+
+    return out
+
+
+@contextmanager
+def _shared_memory(size: int) -> Iterator[SharedMemory]:
+    """Create a shared memory segment that is removed on exit."""
+    shm = SharedMemory(create=True, size=max(size, 1))
+    try:
+        yield shm
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _shm_buffer(shm: SharedMemory) -> memoryview:
+    """Get the memory of an attached shared memory segment."""
+    if shm.buf is None:
+        msg = "Shared memory segment is closed."
+        raise ValueError(msg)
+    return shm.buf
+
+
+def _split(size: int, parts: int, align: int = 1) -> list[int]:
+    """Split [0, size) into (at most) parts ranges with bounds aligned to align."""
+    bounds = [size * i // parts // align * align for i in range(parts)]
+    return [*sorted(set(bounds)), size]
+
+
+def _run_parallel(
+    workers: int, function: Callable[..., None], arguments: list[tuple[Any, ...]]
+) -> None:
+    """Run a function in a process pool for every tuple of arguments."""
+    with ProcessPoolExecutor(workers) as executor:
+        for future in [executor.submit(function, *args) for args in arguments]:
+            future.result()
+
+
+def _ctr_range(  # noqa: PLR0913
+    key: bytes,
+    iv: bytes,
+    input_name: str,
+    input_offset: int,
+    output_name: str,
+    output_offset: int,
+    start: int,
+    stop: int,
+) -> None:
+    """
+    XOR the bytes [start, stop) of a CTR stream between shared memory segments.
+
+    The offsets tell where the stream starts in each segment, to skip the IV.
+    """
+    input_shm = SharedMemory(name=input_name)
+    output_shm = SharedMemory(name=output_name)
+    try:
+        source = np.ndarray(
+            stop - start,
+            np.uint8,
+            buffer=_shm_buffer(input_shm),
+            offset=input_offset + start,
+        )
+        destination = np.ndarray(
+            stop - start,
+            np.uint8,
+            buffer=_shm_buffer(output_shm),
+            offset=output_offset + start,
+        )
+
+        _ctr_xor(source, key, iv, start, out=destination)
+
+        # Views must be released before closing the segments
+        del source, destination
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+def _decrypt_range(
+    key: bytes, input_name: str, output_name: str, start: int, stop: int
+) -> None:
+    """
+    Decrypt the plain blocks [start, stop) between two shared memory segments.
+
+    The input segment holds the IV followed by the cipher blocks, so plain block i
+    needs input rows i and i + 1, ranges of neighbouring workers overlap by a block.
+    """
+    blocksize = len(key)
+    input_shm = SharedMemory(name=input_name)
+    output_shm = SharedMemory(name=output_name)
+    try:
+        cipher_blocks = np.ndarray(
+            (stop + 1 - start, blocksize),
+            dtype=np.uint8,
+            buffer=_shm_buffer(input_shm),
+            offset=start * blocksize,
+        )
+        plain_blocks = np.ndarray(
+            (stop - start, blocksize),
+            dtype=np.uint8,
+            buffer=_shm_buffer(output_shm),
+            offset=start * blocksize,
+        )
+
+        np.bitwise_xor(cipher_blocks[1:], cipher_blocks[:-1], out=plain_blocks)
+        plain_blocks ^= np.frombuffer(key, dtype=np.uint8) ^ 0xFF
+
+        # Views must be released before closing the segments
+        del cipher_blocks, plain_blocks
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+def _as_array(buffer: Buffer) -> np.ndarray:
+    """View any object supporting the buffer protocol as a flat uint8 array."""
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def _pad_length(decrypted: np.ndarray, last_block_size: int) -> int:
+    """Get the padding length to remove, never more than the last block has."""
+    pad_length = int(decrypted[-1])
+    if pad_length == 0 or pad_length > last_block_size:
+        return last_block_size
+    return pad_length
 
 
 class ImageEncryptor:
-    """Image encryption and decryption class using a block cipher (CBC) algorithm."""
+    """Image encryption and decryption class using a block cipher (CBC or CTR)."""
 
-    def __init__(self, key: bytes) -> None:
+    def __init__(self, key: bytes, mode: BlockMode = BlockMode.CBC) -> None:
         """
         Initialize the ImageEncryptor with a key.
 
         Args:
             key (bytes): The key for encryption and decryption.
+            mode (BlockMode): The cipher block mode. (default: CBC)
 
         """
         self.blocksize = len(key)
         self._key = key
+        self._mode = mode
 
     @property
     def key(self) -> bytes:
         """Get the key."""
         return self._key
 
+    @property
+    def mode(self) -> BlockMode:
+        """Get the cipher block mode."""
+        return self._mode
+
     @staticmethod
     def keygen(size: int = 16) -> bytes:
         """
@@ -37,10 +299,18 @@ class ImageEncryptor:
         """
         return token_bytes(size)
 
-    # TODO: Implement another cipher block mode.
-    def encrypt(self, image: bytes) -> bytes:
+    def _check_iv(self, iv: Optional[bytes]) -> bytes:
+        """Validate the given IV or generate a random one."""
+        if iv is None:
+            return token_bytes(self.blocksize)
+        if len(iv) != self.blocksize:
+            msg = "IV size doesn't match the block size."
+            raise ValueError(msg)
+        return iv
+
+    def encrypt(self, image: Buffer, iv: Optional[bytes] = None) -> bytes:
         """
-        Encrypt the image using a block cipher (CBC) algorithm.
+        Encrypt the image using a block cipher algorithm.
 
         The way this block cipher works is simple. We split the image into blocks of
         len(key). We then initialize a random initialization vector (IV)
@@ -49,69 +319,617 @@ class ImageEncryptor:
         The last block is padded with PKCS7 padding.
         We prefix the final resulting encrypted image with the IV.
 
+        The image is processed as a NumPy matrix of blocks, so no Python object is
+        created per byte. Because the block algorithm is `~x ^ key`, the chain is
+        computed in closed form with a prefix XOR scan over the blocks instead of a
+        sequential loop.
 
+        In CTR mode the block algorithm is applied to the IV plus the block index
+        instead, and the result is XOR'd with the block. No padding is needed.
 
         Args:
-            image (bytes): The image data to encrypt.
+            image (Buffer): The image data to encrypt.
+            iv (bytes): The IV to use, a random one is generated when not given.
 
         Returns:
             bytes: The encrypted image data.
 
+        """
+        out = np.empty(self.encrypted_size(len(_as_array(image))), dtype=np.uint8)
+        self.encrypt_into(image, out, iv=iv)
+        return out.tobytes()
+
+    def encrypted_size(self, size: int) -> int:
+        """
+        Get the size of the encryption of size bytes, including the IV and padding.
+
+        Args:
+            size (int): The size of the image data.
+
+        Returns:
+            int: The size of the encrypted image data.
+
+        """
+        if self._mode == BlockMode.CTR:
+            return self.blocksize + size
+        return self.blocksize + (size // self.blocksize + 1) * self.blocksize
+
+    def encrypt_into(
+        self, image: Buffer, out: Buffer, iv: Optional[bytes] = None
+    ) -> int:
+        """
+        Encrypt the image, writing the result into a given buffer.
+
+        Both the image and the output can be any object supporting the buffer
+        protocol, like a memoryview, bytearray, mmap or NumPy array. The padding is
+        written directly into the output, so the image is never copied.
+
+        Args:
+            image (Buffer): The image data to encrypt.
+            out (Buffer): A writable buffer of at least encrypted_size() bytes, that
+                doesn't overlap the image.
+            iv (bytes): The IV to use, a random one is generated when not given.
+
+        Raises:
+            ValueError: If the output buffer is too small.
+
+        Returns:
+            int: Number of bytes written to the output.
+
         """
         # initalize IV
-        iv = token_bytes(self.blocksize)
-        # split image into blocks of blocksize
-        pad_length = self.blocksize - (len(image) % self.blocksize)
-        image += bytes([pad_length] * pad_length)
-        blocks = [
-            image[i : i + self.blocksize] for i in range(0, len(image), self.blocksize)
-        ]
+        iv = self._check_iv(iv)
+
+        data = _as_array(image)
+        size = self.encrypted_size(len(data))
+        result = _as_array(out)
+        if len(result) < size:
+            msg = "Output buffer is too small."
+            raise ValueError(msg)
+
+        result[: self.blocksize] = np.frombuffer(iv, dtype=np.uint8)
+        encrypted = result[self.blocksize : self.blocksize + len(data)]
+
+        if self._mode == BlockMode.CTR:
+            _ctr_xor(data, self.key, iv, 0, out=encrypted)
+            return size
+
+        # Output layout: IV followed by the padded image, one block per row
+        encrypted[:] = data
+        result[self.blocksize + len(data) : size] = size - self.blocksize - len(data)
 
         # CBC encryption
-        encrypted_blocks = []
-        iv_original = iv
-        for block in blocks:
-            # xor the block with IV
-            xor_block = bytes(a ^ b for a, b in zip(block, iv))
-            # encryption algorithm: invert the bits and xor with the key
-            encrypted_block = bytes(
-                (~a & 0xFF) ^ b for a, b in zip(xor_block, self.key)
-            )
-            encrypted_blocks.append(encrypted_block)
-            iv = encrypted_block
+        _cbc_chain(result[:size].reshape(-1, self.blocksize), self.key)
 
-        return iv_original + b"".join(encrypted_blocks)
+        return size
 
-    def decrypt(self, encrypted_image: bytes) -> bytes:
+    def decrypt(self, encrypted_image: Buffer) -> bytes:
         """
         Decrypt the encryption resulting from encrypt() method.
 
+        Every plain block only depends on its cipher block and the previous one (or
+        its index in CTR mode), so the whole image is decrypted with a single array
+        operation.
+
         Args:
-            encrypted_image (bytes): The encrypted image data to decrypt.
+            encrypted_image (Buffer): The encrypted image data to decrypt.
 
         Returns:
             bytes: The decrypted image data.
 
         """
-        iv = encrypted_image[: self.blocksize]
+        out = np.empty(
+            max(len(_as_array(encrypted_image)) - self.blocksize, 0), np.uint8
+        )
+        return out[: self.decrypt_into(encrypted_image, out)].tobytes()
+
+    def decrypt_into(self, encrypted_image: Buffer, out: Buffer) -> int:
+        """
+        Decrypt the encrypted image, writing the result into a given buffer.
+
+        Both the encrypted image and the output can be any object supporting the
+        buffer protocol, like a memoryview, bytearray, mmap or NumPy array.
+
+        Args:
+            encrypted_image (Buffer): The encrypted image data to decrypt.
+            out (Buffer): A writable buffer of at least the encrypted image size
+                without the IV, that doesn't overlap the encrypted image.
+
+        Raises:
+            ValueError: If the encrypted data or output buffer is too small.
+
+        Returns:
+            int: Size of the decrypted image written to the output, without padding.
+
+        """
+        data = _as_array(encrypted_image)
+        size = len(data) - self.blocksize
+        if size < 0 or (size == 0 and self._mode == BlockMode.CBC):
+            msg = "Encrypted data is too short."
+            raise ValueError(msg)
+
+        result = _as_array(out)
+        if len(result) < size:
+            msg = "Output buffer is too small."
+            raise ValueError(msg)
+
+        if self._mode == BlockMode.CTR:
+            iv = data[: self.blocksize].tobytes()
+            _ctr_xor(data[self.blocksize :], self.key, iv, 0, out=result[:size])
+            return size
+
+        # Inverting after XOR with the key is the same as XOR with the inverted key
+        inverted_key = np.frombuffer(self.key, dtype=np.uint8) ^ 0xFF
 
-        # split image into blocks of blocksize
-        blocks = [
-            encrypted_image[i : i + self.blocksize]
-            for i in range(self.blocksize, len(encrypted_image), self.blocksize)
-        ]
-        decrypted_blocks = []
+        full_size = size - size % self.blocksize
+        blocks = data[: self.blocksize + full_size].reshape(-1, self.blocksize)
+        decrypted = result[:full_size].reshape(-1, self.blocksize)
+        np.bitwise_xor(blocks[1:], blocks[:-1], out=decrypted)
+        decrypted ^= inverted_key
 
-        # Currently assuming correct input where last block is padded
-        for block in blocks:
-            xor_result = bytes(a ^ b for a, b in zip(block, self.key))
-            inverted = bytes(~a & 0xFF for a in xor_result)
-            original_block = bytes(a ^ b for a, b in zip(inverted, iv))
-            decrypted_blocks.append(original_block)
-            iv = block
+        # A trailing partial block only happens with a wrong key size
+        if full_size != size:
+            partial_size = size - full_size
+            result[full_size:size] = (
+                data[self.blocksize + full_size :]
+                ^ data[full_size : full_size + partial_size]
+                ^ inverted_key[:partial_size]
+            )
 
         # remove padding
-        last_block = decrypted_blocks[-1]
-        pad_length = last_block[-1]
-        decrypted_blocks[-1] = last_block[:-pad_length]
-        return b"".join(decrypted_blocks)
+        last_block_size = size - (-(-size // self.blocksize) - 1) * self.blocksize
+        return size - _pad_length(result[:size], last_block_size)
+
+    def decrypt_range(self, encrypted_image: Buffer, start: int, stop: int) -> bytes:
+        """
+        Decrypt only the bytes [start, stop) of the image.
+
+        Only the blocks covering the range are touched, which makes it cheap to get a
+        single row of pixels for example.
+
+        Args:
+            encrypted_image (Buffer): The encrypted image data.
+            start (int): Offset of the first byte to decrypt.
+            stop (int): Offset after the last byte to decrypt.
+
+        Returns:
+            bytes: The decrypted bytes, cut at the end of the image.
+
+        """
+        data = np.frombuffer(encrypted_image, dtype=np.uint8)
+        size = len(data) - self.blocksize
+        start = max(start, 0)
+
+        if self._mode == BlockMode.CTR:
+            stop = min(stop, size)
+            if start >= stop:
+                return b""
+            iv = data[: self.blocksize].tobytes()
+            return _ctr_xor(
+                data[self.blocksize + start : self.blocksize + stop],
+                self.key,
+                iv,
+                start,
+            ).tobytes()
+
+        # A partial block only happens with a wrong key size
+        if size <= 0 or size % self.blocksize:
+            return self.decrypt(encrypted_image)[start:stop]
+
+        blocks = data.reshape(-1, self.blocksize)
+
+        # The padding found in the last block tells where the image ends
+        last_block = _cbc_unchain(blocks[-2:], self.key).reshape(-1)
+        stop = min(stop, size - _pad_length(last_block, self.blocksize))
+        if start >= stop:
+            return b""
+
+        first_block = start // self.blocksize
+        last_block_index = -(-stop // self.blocksize)
+        decrypted = _cbc_unchain(
+            blocks[first_block : last_block_index + 1], self.key
+        ).reshape(-1)
+
+        offset = first_block * self.blocksize
+        return decrypted[start - offset : stop - offset].tobytes()
+
+    def encrypt_parallel(
+        self,
+        image: Buffer,
+        workers: Optional[int] = None,
+        iv: Optional[bytes] = None,
+    ) -> bytes:
+        """
+        Encrypt the image using many processes.
+
+        Only CTR mode blocks are independent of each other, CBC mode falls back to
+        encrypt(), which is already bound by memory bandwidth.
+
+        Args:
+            image (Buffer): The image data to encrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            iv (bytes): The IV to use, a random one is generated when not given.
+
+        Returns:
+            bytes: The encrypted image data.
+
+        """
+        iv = self._check_iv(iv)
+        data = _as_array(image)
+        workers = min(workers or os.cpu_count() or 1, len(data) // self.blocksize)
+
+        if self._mode != BlockMode.CTR or workers <= 1:
+            return self.encrypt(image, iv=iv)
+
+        with (
+            _shared_memory(len(data)) as input_shm,
+            _shared_memory(self.blocksize + len(data)) as output_shm,
+        ):
+            _shm_buffer(input_shm)[: len(data)] = data.data
+            _shm_buffer(output_shm)[: self.blocksize] = iv
+
+            _run_parallel(
+                workers,
+                _ctr_range,
+                [
+                    (
+                        self.key,
+                        iv,
+                        input_shm.name,
+                        0,
+                        output_shm.name,
+                        self.blocksize,
+                        start,
+                        stop,
+                    )
+                    for start, stop in pairwise(
+                        _split(len(data), workers, self.blocksize)
+                    )
+                ],
+            )
+
+            return bytes(_shm_buffer(output_shm)[: self.blocksize + len(data)])
+
+    def decrypt_parallel(
+        self, encrypted_image: Buffer, workers: Optional[int] = None
+    ) -> bytes:
+        """
+        Decrypt the encryption resulting from encrypt() method using many processes.
+
+        The cipher blocks are split into ranges that are decrypted in a process pool,
+        data is passed to the workers through shared memory instead of pickling it.
+
+        Args:
+            encrypted_image (Buffer): The encrypted image data to decrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+
+        Returns:
+            bytes: The decrypted image data.
+
+        """
+        data = _as_array(encrypted_image)
+        blocks_count = len(data) // self.blocksize - 1
+        workers = min(workers or os.cpu_count() or 1, blocks_count)
+
+        # A partial CBC block only happens with a wrong key size, and small inputs
+        # are not worth starting processes for.
+        if workers <= 1 or (self._mode == BlockMode.CBC and len(data) % self.blocksize):
+            return self.decrypt(encrypted_image)
+
+        size = len(data) - self.blocksize
+        with (
+            _shared_memory(len(data)) as input_shm,
+            _shared_memory(size) as output_shm,
+        ):
+            _shm_buffer(input_shm)[: len(data)] = data.data
+
+            if self._mode == BlockMode.CTR:
+                # Sent to the workers, so it must be picklable
+                iv = data[: self.blocksize].tobytes()
+                _run_parallel(
+                    workers,
+                    _ctr_range,
+                    [
+                        (
+                            self.key,
+                            iv,
+                            input_shm.name,
+                            self.blocksize,
+                            output_shm.name,
+                            0,
+                            start,
+                            stop,
+                        )
+                        for start, stop in pairwise(
+                            _split(size, workers, self.blocksize)
+                        )
+                    ],
+                )
+                return bytes(_shm_buffer(output_shm)[:size])
+
+            _run_parallel(
+                workers,
+                _decrypt_range,
+                [
+                    (self.key, input_shm.name, output_shm.name, start, stop)
+                    for start, stop in pairwise(_split(blocks_count, workers))
+                ],
+            )
+
+            # remove padding
+            decrypted = np.ndarray(size, dtype=np.uint8, buffer=_shm_buffer(output_shm))
+            pad_length = _pad_length(decrypted, self.blocksize)
+            del decrypted
+            return bytes(_shm_buffer(output_shm)[: size - pad_length])
+
+    def encryptor(self, iv: Optional[bytes] = None) -> "ImageContext":
+        """
+        Create an incremental encryption context.
+
+        Args:
+            iv (bytes): The IV to use, a random one is generated when not given.
+
+        Returns:
+            ImageContext: A context carrying the cipher state across chunks.
+
+        """
+        if self._mode == BlockMode.CTR:
+            return ImageCTRContext(self.key, self._check_iv(iv))
+        return ImageEncryptContext(self.key, self._check_iv(iv))
+
+    def decryptor(self) -> "ImageContext":
+        """
+        Create an incremental decryption context.
+
+        Returns:
+            ImageContext: A context carrying the cipher state across chunks.
+
+        """
+        if self._mode == BlockMode.CTR:
+            return ImageCTRContext(self.key)
+        return ImageDecryptContext(self.key)
+
+    def encrypt_file(
+        self, src: Path, dst: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        """
+        Encrypt a file into another one, using constant memory.
+
+        Args:
+            src (Path): Path of the raw image data to encrypt.
+            dst (Path): Path to write the encrypted image data to.
+            chunk_size (int): Number of bytes to read at once.
+
+        """
+        _process_file(self.encryptor(), src, dst, chunk_size)
+
+    def decrypt_file(
+        self, src: Path, dst: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        """
+        Decrypt a file resulting from encrypt_file() into another one.
+
+        Args:
+            src (Path): Path of the encrypted image data.
+            dst (Path): Path to write the decrypted image data to.
+            chunk_size (int): Number of bytes to read at once.
+
+        """
+        _process_file(self.decryptor(), src, dst, chunk_size)
+
+
+class ImageEncryptContext:
+    """
+    Incremental CBC encryption.
+
+    Produces the same output as ImageEncryptor.encrypt() when all the chunks are
+    concatenated, the IV is part of the first returned chunk.
+    """
+
+    def __init__(self, key: bytes, iv: bytes) -> None:
+        """Initialize the context with a key and an IV."""
+        self._key = key
+        self._previous = np.frombuffer(iv, dtype=np.uint8)
+        self._pending = np.empty(0, dtype=np.uint8)
+        self._header = iv
+
+    def update(self, chunk: bytes) -> bytes:
+        """
+        Encrypt a chunk of the image.
+
+        Bytes that don't fill a whole block are kept until the next call.
+
+        Args:
+            chunk (bytes): The next part of the image data.
+
+        Returns:
+            bytes: The encrypted data that is ready so far.
+
+        """
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if len(self._pending):
+            data = np.concatenate((self._pending, data))
+
+        ready = len(data) - len(data) % len(self._key)
+        self._pending = data[ready:].copy()
+        return self._encrypt_blocks(data[:ready])
+
+    def finalize(self) -> bytes:
+        """
+        Pad and encrypt the remaining bytes.
+
+        Returns:
+            bytes: The last encrypted block(s).
+
+        """
+        pad_length = len(self._key) - len(self._pending)
+        data = np.concatenate(
+            (self._pending, np.full(pad_length, pad_length, dtype=np.uint8))
+        )
+        self._pending = np.empty(0, dtype=np.uint8)
+        return self._encrypt_blocks(data)
+
+    def _encrypt_blocks(self, data: np.ndarray) -> bytes:
+        """Encrypt whole blocks chained to the previous cipher block."""
+        blocks = np.empty((len(data) // len(self._key) + 1, len(self._key)), np.uint8)
+        blocks[0] = self._previous
+        blocks[1:] = data.reshape(-1, len(self._key))
+
+        _cbc_chain(blocks, self._key)
+        self._previous = blocks[-1].copy()
+
+        header, self._header = self._header, b""
+        return header + blocks[1:].tobytes()
+
+
+class ImageDecryptContext:
+    """
+    Incremental CBC decryption.
+
+    Produces the same output as ImageEncryptor.decrypt() when all the chunks are
+    concatenated. The last block is always kept until finalize(), since only then
+    it's known to be the padded one.
+    """
+
+    def __init__(self, key: bytes) -> None:
+        """Initialize the context with a key."""
+        self._key = key
+        self._previous: Optional[np.ndarray] = None
+        self._pending = np.empty(0, dtype=np.uint8)
+
+    def update(self, chunk: bytes) -> bytes:
+        """
+        Decrypt a chunk of the encrypted image.
+
+        Args:
+            chunk (bytes): The next part of the encrypted image data.
+
+        Returns:
+            bytes: The decrypted data that is ready so far.
+
+        """
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if len(self._pending):
+            data = np.concatenate((self._pending, data))
+
+        blocksize = len(self._key)
+
+        # The stream starts with the IV
+        if self._previous is None:
+            if len(data) < blocksize:
+                self._pending = data.copy()
+                return b""
+            self._previous = data[:blocksize].copy()
+            data = data[blocksize:]
+
+        # Keep at least one byte, so the last block is never decrypted here
+        ready = max(len(data) - 1, 0) // blocksize * blocksize
+        self._pending = data[ready:].copy()
+        if not ready:
+            return b""
+
+        blocks = np.empty((ready // blocksize + 1, blocksize), np.uint8)
+        blocks[0] = self._previous
+        blocks[1:] = data[:ready].reshape(-1, blocksize)
+        self._previous = blocks[-1].copy()
+
+        return _cbc_unchain(blocks, self._key).tobytes()
+
+    def finalize(self) -> bytes:
+        """
+        Decrypt the last block and remove its padding.
+
+        Returns:
+            bytes: The last decrypted block without padding.
+
+        """
+        if self._previous is None or not len(self._pending):
+            msg = "Encrypted data is too short."
+            raise ValueError(msg)
+
+        # A partial last block only happens with a wrong key size, extend it to a
+        # full block, the extra bytes are cut off afterwards.
+        size = len(self._pending)
+        blocks = np.zeros((2, len(self._key)), np.uint8)
+        blocks[0] = self._previous
+        blocks[1, :size] = self._pending
+        self._pending = np.empty(0, dtype=np.uint8)
+
+        decrypted = _cbc_unchain(blocks, self._key).reshape(-1)[:size]
+        return decrypted[: size - _pad_length(decrypted, size)].tobytes()
+
+
+class ImageCTRContext:
+    """
+    Incremental CTR encryption or decryption.
+
+    When an IV is given the context encrypts, and the IV is part of the first
+    returned chunk. Otherwise it decrypts, and the IV is read from the start of the
+    encrypted data.
+    """
+
+    def __init__(self, key: bytes, iv: Optional[bytes] = None) -> None:
+        """Initialize the context with a key and an optional IV."""
+        self._key = key
+        self._iv = iv
+        self._header = iv or b""
+        self._pending = b""
+        self._offset = 0
+
+    def update(self, chunk: bytes) -> bytes:
+        """
+        Encrypt or decrypt a chunk of data.
+
+        Args:
+            chunk (bytes): The next part of the data.
+
+        Returns:
+            bytes: The processed data.
+
+        """
+        # The encrypted stream starts with the IV
+        if self._iv is None:
+            self._pending += chunk
+            if len(self._pending) < len(self._key):
+                return b""
+            self._iv = self._pending[: len(self._key)]
+            chunk = self._pending[len(self._key) :]
+            self._pending = b""
+
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        result = _ctr_xor(data, self._key, self._iv, self._offset).tobytes()
+        self._offset += len(data)
+
+        header, self._header = self._header, b""
+        return header + result
+
+    def finalize(self) -> bytes:
+        """
+        Finish the stream, no padding is used in CTR mode.
+
+        Returns:
+            bytes: The IV when nothing has been encrypted yet.
+
+        """
+        if self._iv is None:
+            msg = "Encrypted data is too short."
+            raise ValueError(msg)
+
+        header, self._header = self._header, b""
+        return header
+
+
+ImageContext = Union[ImageEncryptContext, ImageDecryptContext, ImageCTRContext]
+
+
+def _process_file(
+    context: ImageContext,
+    src: Path,
+    dst: Path,
+    chunk_size: int,
+) -> None:
+    """Stream a file through an encryption or decryption context."""
+    with Path.open(src, "rb") as fin, Path.open(dst, "wb") as fout:
+        while chunk := fin.read(chunk_size):
+            fout.write(context.update(chunk))
+        fout.write(context.finalize())
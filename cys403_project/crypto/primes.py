@@ -0,0 +1,288 @@
+"""Parallel and cancellable search of large random primes."""
+
+import os
+from collections import Counter
+from collections.abc import Sequence
+from itertools import compress
+from secrets import randbelow, randbits
+from typing import TYPE_CHECKING, Callable, Optional
+
+# Process pools are only imported when searching in parallel.
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from multiprocessing.synchronize import Event
+
+try:
+    # Optional, only makes the primality tests faster
+    from gmpy2 import is_prime as _gmpy2_is_prime
+except ImportError:
+    _gmpy2_is_prime = None
+
+# Smallest prime size with enough primes having both top bits set, for any
+# public exponent.
+MIN_PRIME_SIZE = 8
+
+# Number of small odd primes that the candidates are sieved with.
+SIEVE_PRIMES_COUNT = 2048
+
+
+class SearchCancelledError(Exception):
+    """Exception for a prime search cancelled before finding all the primes."""
+
+
+def _odd_primes(count: int) -> list[int]:
+    """Get the first odd primes, using the sieve of Eratosthenes."""
+    limit = 64
+    while True:
+        sieve = bytearray([1]) * limit
+        for i in range(3, int(limit**0.5) + 1, 2):
+            if sieve[i]:
+                sieve[i * i :: i] = bytes(len(range(i * i, limit, i)))
+
+        primes = [i for i in range(3, limit, 2) if sieve[i]]
+        if len(primes) >= count:
+            return primes[:count]
+        limit *= 2
+
+
+_SMALL_PRIMES = _odd_primes(SIEVE_PRIMES_COUNT)
+_SMALL_PRIMES_SET = frozenset(_SMALL_PRIMES)
+
+
+def _miller_rabin_rounds(bits: int) -> int:
+    """Get the rounds for a 2^-100 error on random candidates (FIPS 186-4 C.3)."""
+    for min_bits, rounds in ((1536, 4), (1024, 5), (512, 7)):
+        if bits >= min_bits:
+            return rounds
+    return 40
+
+
+def is_probable_prime(n: int, rounds: Optional[int] = None) -> bool:
+    """
+    Test if a number is prime, using the Miller-Rabin test.
+
+    Uses gmpy2 when it's installed.
+
+    Args:
+        n: The number to test.
+        rounds: Number of Miller-Rabin rounds, by default enough for an error
+            probability of 2^-100 on random candidates.
+
+    Returns:
+        bool: False if n is composite, True if it's prime with high probability.
+
+    """
+    if n < 3:  # noqa: PLR2004
+        return n == 2  # noqa: PLR2004
+    if n in _SMALL_PRIMES_SET:
+        return True
+    if not n & 1:
+        return False
+
+    rounds = rounds or _miller_rabin_rounds(n.bit_length())
+    if _gmpy2_is_prime is not None:
+        return bool(_gmpy2_is_prime(n, rounds))
+
+    # n - 1 = d * 2^s, with d odd
+    s = ((n - 1) & (1 - n)).bit_length() - 1
+    d = (n - 1) >> s
+
+    for _ in range(rounds):
+        x = pow(randbelow(n - 3) + 2, d, n)
+        if x in {1, n - 1}:
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def random_candidate(bits: int) -> int:
+    """
+    Get a random odd number of the given size, with its two top bits set.
+
+    The two top bits make the product of two such numbers exactly as long as
+    the sum of their sizes.
+
+    Args:
+        bits: Size of the number in bits.
+
+    Returns:
+        int: A random prime candidate.
+
+    """
+    return randbits(bits) | (0b11 << (bits - 2)) | 1
+
+
+def _search(
+    bits: int, stop: Callable[[], bool], e: Optional[int] = None
+) -> Optional[int]:
+    """
+    Search a prime until one is found, or the search is stopped.
+
+    Odd numbers in a window after a random candidate are sieved with the small
+    primes, and with e so that gcd(e, p - 1) = 1, only the remaining ones go
+    through the Miller-Rabin test.
+    """
+    window = max(4 * bits, 64)
+    # Only primes smaller than all candidates can be sieved with
+    primes = [p for p in _SMALL_PRIMES if p < 1 << (bits - 2)]
+    rounds = _miller_rabin_rounds(bits)
+
+    while not stop():
+        start = random_candidate(bits)
+
+        # sieve[k] tells if start + 2k may be a prime
+        sieve = bytearray([1]) * window
+        for p in primes:
+            # First k where p divides start + 2k, (p + 1) / 2 is the inverse of 2
+            k = -start * ((p + 1) // 2) % p
+            sieve[k::p] = bytes(len(range(k, window, p)))
+
+        if e is not None:
+            # Drop candidates where e divides p - 1, as e is a prime
+            k = (1 - start) * ((e + 1) // 2) % e
+            sieve[k::e] = bytes(len(range(k, window, e)))
+
+        for k in compress(range(window), sieve):
+            candidate = start + 2 * k
+            if candidate.bit_length() != bits or stop():
+                break
+            if is_probable_prime(candidate, rounds):
+                return candidate
+    return None
+
+
+# Events of the current search worker process, set by _init_worker.
+_worker_found: "dict[int, Event]" = {}
+_worker_cancel: "Optional[Event]" = None
+
+
+def _init_worker(found: "dict[int, Event]", cancel: "Optional[Event]") -> None:
+    """Keep the events shared with the search workers."""
+    global _worker_found, _worker_cancel  # noqa: PLW0603
+    _worker_found = found
+    _worker_cancel = cancel
+
+
+def _search_in_worker(bits: int, e: Optional[int]) -> Optional[int]:
+    """Search a prime until one of the given size is found by any worker."""
+    found = _worker_found[bits]
+    cancel = _worker_cancel
+    return _search(
+        bits, lambda: found.is_set() or (cancel is not None and cancel.is_set()), e
+    )
+
+
+def _generate_serial(
+    sizes: Sequence[int], cancel: "Optional[Event]", e: Optional[int]
+) -> dict[int, list[int]]:
+    """Search the primes one after the other in the current process."""
+    primes: dict[int, list[int]] = {bits: [] for bits in sizes}
+
+    for bits in sizes:
+        prime = _search(bits, lambda: cancel is not None and cancel.is_set(), e)
+        while prime in primes[bits]:
+            prime = _search(bits, lambda: cancel is not None and cancel.is_set(), e)
+
+        if prime is None:
+            break
+        primes[bits].append(prime)
+
+    return primes
+
+
+def _generate_parallel(
+    sizes: Sequence[int], workers: int, cancel: "Optional[Event]", e: Optional[int]
+) -> dict[int, list[int]]:
+    """Search the primes at the same time in a process pool."""
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    needed = Counter(sizes)
+    primes: dict[int, list[int]] = {bits: [] for bits in needed}
+
+    # Spawned like the pools of the UI, since the search may run in one of their
+    # workers or in the GTK process, which are unsafe to fork
+    context = multiprocessing.get_context("spawn")
+    found = {bits: context.Event() for bits in needed}
+
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(found, cancel),
+    ) as executor:
+        # Workers are spread evenly over the primes to find, with at least one
+        # search for every prime
+        running: dict[Future[Optional[int]], int] = {}
+        for i in range(max(workers, len(sizes))):
+            bits = sizes[i % len(sizes)]
+            running[executor.submit(_search_in_worker, bits, e)] = bits
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                bits = running.pop(future)
+                prime = future.result()
+
+                if prime is None or len(primes[bits]) == needed[bits]:
+                    continue
+
+                if prime not in primes[bits]:
+                    primes[bits].append(prime)
+                if len(primes[bits]) == needed[bits]:
+                    found[bits].set()
+                else:
+                    running[executor.submit(_search_in_worker, bits, e)] = bits
+
+    return primes
+
+
+def generate_primes(
+    sizes: Sequence[int],
+    workers: Optional[int] = None,
+    cancel: "Optional[Event]" = None,
+    e: Optional[int] = None,
+) -> list[int]:
+    """
+    Generate distinct random primes of the given sizes, searched at the same time.
+
+    The search for every prime is split between many worker processes, all
+    testing their own random candidates, until one of them finds it.
+
+    Args:
+        sizes: Size in bits of every prime.
+        workers: Number of processes to use. (default: number of CPUs)
+        cancel: Event to set for stopping the search from another process,
+            created from the "spawn" multiprocessing context.
+        e: Odd prime public exponent, only primes p with gcd(e, p - 1) = 1 are
+            generated when given.
+
+    Raises:
+        ValueError: If a size is smaller than MIN_PRIME_SIZE.
+        SearchCancelledError: If the cancel event is set before the end.
+
+    Returns:
+        list[int]: A prime for every size, in the same order.
+
+    """
+    if any(bits < MIN_PRIME_SIZE for bits in sizes):
+        msg = f"Prime size must be at least {MIN_PRIME_SIZE} bits."
+        raise ValueError(msg)
+
+    workers = workers or os.cpu_count() or 1
+    primes = (
+        _generate_parallel(sizes, workers, cancel, e)
+        if workers > 1
+        else _generate_serial(sizes, cancel, e)
+    )
+
+    if sum(len(found) for found in primes.values()) < len(sizes):
+        msg = "Prime search was cancelled."
+        raise SearchCancelledError(msg)
+
+    return [primes[bits].pop() for bits in sizes]
@@ -1,9 +1,38 @@
 """Implementation of the RSAEncryptor class."""
 
+import os
+import struct
+from collections.abc import Iterable, Iterator
 from hashlib import sha256
-from typing import Optional
+from secrets import token_bytes
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO, Callable, Optional, Self
 
-from Crypto.Util.number import getPrime
+from .primes import generate_primes, is_probable_prime
+
+# Process pools and pycryptodome are only imported when used, as most of the
+# users of this module only encrypt single messages.
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.synchronize import Event
+
+# Number of fields in a private key that has the CRT components.
+CRT_PRIVATE_KEY_LENGTH = 7
+
+# Hash of the (empty) padding label.
+_LABEL_HASH = sha256(b"").digest()
+
+# Default number of messages sent to a worker at once by the batch methods.
+DEFAULT_BATCH_CHUNK_SIZE = 64
+
+# Hybrid encryption layout: RSA wrapped session key, nonce, tag, AES-GCM payload.
+_SESSION_KEY_SIZE = 32
+_NONCE_SIZE = 12
+_TAG_SIZE = 16
+
+# Multi-block layout: magic and block size, followed by the encrypted blocks.
+BLOCKS_MAGIC = b"RSAB"
+_BLOCKS_HEADER = struct.Struct(">4sI")
 
 
 class PrivateKeyError(Exception):
@@ -26,6 +55,14 @@ class NonPrimeExponentError(Exception):
     """Exception for using composit number as a public exponent."""
 
 
+class IntegrityError(Exception):
+    """Exception for encrypted data that fails authentication."""
+
+
+class FrameError(Exception):
+    """Exception for malformed multi-block messages."""
+
+
 class RSAEncryptor:
     """
     A class to handle RSA encryption and decryption.
@@ -37,57 +74,146 @@ class RSAEncryptor:
     def __init__(
         self,
         public_key: Optional[tuple[bytes, bytes]] = None,
-        private_key: Optional[tuple[bytes, bytes]] = None,
+        private_key: Optional[tuple[bytes, ...]] = None,
     ) -> None:
         """
         Initialize the RSAEncryptor with optional public and private keys.
 
         Args:
             public_key (tuple): public key for encryption (e, n) (default is None).
-            private_key (tuple): private key for decryption (d, n) (default is None).
+            private_key (tuple): private key for decryption (d, n), or
+                (d, n, p, q, dP, dQ, qInv) to decrypt using the Chinese Remainder
+                Theorem (default is None).
 
         """
         self.public_key = public_key
         self.private_key = private_key
 
+    @property
+    def public_key(self) -> Optional[tuple[bytes, bytes]]:
+        """Get the public key (e, n)."""
+        return self._public_key
+
+    @public_key.setter
+    def public_key(self, key: Optional[tuple[bytes, bytes]]) -> None:
+        """Set the public key, and parse everything encryption needs from it."""
+        self._public_key = key
+
+        if key:
+            self._e = int.from_bytes(key[0], byteorder="big")
+            self._public_n = int.from_bytes(key[1], byteorder="big")
+            self._public_n_size = (self._public_n.bit_length() + 7) // 8
+
+            # The padding only depends on the modulus size
+            self._padding_prefix = (
+                b"\x00" * (self._public_n.bit_length() // 8 - len(_LABEL_HASH) - 2)
+                + b"\x01"
+                + _LABEL_HASH
+            )
+
+    @property
+    def private_key(self) -> Optional[tuple[bytes, ...]]:
+        """Get the private key (d, n) or (d, n, p, q, dP, dQ, qInv)."""
+        return self._private_key
+
+    @private_key.setter
+    def private_key(self, key: Optional[tuple[bytes, ...]]) -> None:
+        """Set the private key, and parse everything decryption needs from it."""
+        self._private_key = key
+
+        if key:
+            self._d = int.from_bytes(key[0], byteorder="big")
+            self._private_n = int.from_bytes(key[1], byteorder="big")
+            self._private_n_size = (self._private_n.bit_length() + 7) // 8
+
+            self._crt: Optional[tuple[int, ...]] = (
+                tuple(int.from_bytes(x, byteorder="big") for x in key[2:])
+                if len(key) == CRT_PRIVATE_KEY_LENGTH
+                else None
+            )
+
+    @property
+    def max_message_size(self) -> int:
+        """Get the size of the longest message that encrypt() can take."""
+        if not self._public_key:
+            msg = "Public key is not set."
+            raise PublicKeyError(msg)
+
+        # The padded message must stay below the modulus
+        return max((self._public_n.bit_length() - 2) // 8 - len(_LABEL_HASH), 0)
+
+    @property
+    def block_size(self) -> int:
+        """Get the size of a message encrypted by encrypt()."""
+        if self._public_key:
+            return self._public_n_size
+        if self._private_key:
+            return self._private_n_size
+
+        msg = "Public key is not set."
+        raise PublicKeyError(msg)
+
     @staticmethod
     def keygen(
-        size: int = 2048, e: int = 65537
-    ) -> tuple[tuple[bytes, bytes], tuple[bytes, bytes]]:
+        size: int = 2048,
+        e: int = 65537,
+        *,
+        crt: bool = False,
+        workers: Optional[int] = None,
+        cancel: "Optional[Event]" = None,
+    ) -> tuple[tuple[bytes, bytes], tuple[bytes, ...]]:
         """
         Generate a new RSA key pair.
 
         This method generates a new public and private key pair for RSA encryption.
 
         Args:
-            size: The size of the key in bits (default is 2048).
+            size: The size of the modulus in bits (default is 2048).
             e: The public exponent (default is 65537).
+            crt: Keep the CRT components (p, q, dP, dQ, qInv) in the private key,
+                which makes decryption about 3-4 times faster (default is False).
+            workers: Number of processes searching the primes at the same time
+                (default is the number of CPUs).
+            cancel: Event to set for stopping the generation from another process,
+                created from the "spawn" multiprocessing context.
+
+        Raises:
+            NonPrimeExponentError: If e is not an odd prime.
+            ValueError: If the size is too small to have two distinct primes.
+            SearchCancelledError: If the cancel event is set before the end.
 
         Returns:
             Tuple: A tuple containing the public and private keys.
 
         """
-        # generate two large prime numbers
-        p = getPrime(size)
-        q = getPrime(size)
+        # Checked before the (long) prime search
+        if e == 2 or not is_probable_prime(e):  # noqa: PLR2004
+            msg = "Public exponent must be an odd prime."
+            raise NonPrimeExponentError(msg)
+
+        # generate two large prime numbers, half of the modulus size each, that
+        # always have an inverse of e
+        p, q = generate_primes((size - size // 2, size // 2), workers, cancel, e)
 
         n = p * q
         phi = (p - 1) * (q - 1)
-
-        try:
-            d = pow(e, -1, phi)
-        except ValueError as err:
-            # When e is not a prime number.
-            raise NonPrimeExponentError from err
+        d = pow(e, -1, phi)
 
         public_key = (
             e.to_bytes((e.bit_length() + 7) // 8, "big"),
             n.to_bytes((n.bit_length() + 7) // 8, "big"),
         )
-        private_key = (
+        private_key: tuple[bytes, ...] = (
             d.to_bytes((d.bit_length() + 7) // 8, "big"),
             n.to_bytes((n.bit_length() + 7) // 8, "big"),
         )
+
+        if crt:
+            private_key += tuple(
+                x.to_bytes((x.bit_length() + 7) // 8, "big")
+                for x in (p, q, d % (p - 1), d % (q - 1), pow(q, -1, p))
+            )
+
         return public_key, private_key
 
     def encrypt(self, data: bytes) -> bytes:
@@ -105,31 +231,23 @@ class RSAEncryptor:
             bytes: encrypted data with padding.
 
         """
-        if not self.public_key:
+        if not self._public_key:
             msg = "Public key is not set."
             raise PublicKeyError(msg)
 
         m_int = int.from_bytes(data, byteorder="big")
-        e, n = (
-            int.from_bytes(self.public_key[0], byteorder="big"),
-            int.from_bytes(self.public_key[1], byteorder="big"),
-        )
-        if m_int >= n:
+        if m_int >= self._public_n:
             # change this so he stops complaining later
             msg = "Message longer than modulus."
             raise MessageTooLongError(msg)
 
         # padding
-        h = sha256()
-        h.update(b"")
-        hashl = h.digest()
-        padding = b"\x00" * (n.bit_length() // 8 - len(hashl) - 2)
-        m = padding + b"\x01" + hashl + data
+        m = self._padding_prefix + data
 
         # encryption
         m_int = int.from_bytes(m, byteorder="big")
-        c_int = pow(m_int, e, n)
-        return c_int.to_bytes((n.bit_length() + 7) // 8, byteorder="big")
+        c_int = pow(m_int, self._e, self._public_n)
+        return c_int.to_bytes(self._public_n_size, byteorder="big")
 
     def decrypt(self, data: bytes) -> bytes:
         """
@@ -145,17 +263,23 @@ class RSAEncryptor:
             bytes: The decrypted data without padding.
 
         """
-        if not self.private_key:
+        if not self._private_key:
             msg = "Private key is not set."
             raise PrivateKeyError(msg)
 
-        d = int.from_bytes(self.private_key[0], byteorder="big")
-        n = int.from_bytes(self.private_key[1], byteorder="big")
         c_int = int.from_bytes(data, byteorder="big")
 
         # Decrypt the ciphertext
-        m_int = pow(c_int, d, n)
-        m = m_int.to_bytes((n.bit_length() + 7) // 8, byteorder="big")
+        if self._crt is not None:
+            p, q, d_p, d_q, q_inv = self._crt
+
+            # Two half size exponentiations, recombined with Garner's formula
+            m_p = pow(c_int, d_p, p)
+            m_q = pow(c_int, d_q, q)
+            m_int = m_q + (q_inv * (m_p - m_q) % p) * q
+        else:
+            m_int = pow(c_int, self._d, self._private_n)
+        m = m_int.to_bytes(self._private_n_size, byteorder="big")
 
         # Remove padding
         padding_index = m.find(b"\x01")
@@ -163,4 +287,472 @@ class RSAEncryptor:
             msg = "Invalid padding in decrypted message."
             raise PadError(msg)
 
-        return m[padding_index + 1 + sha256().digest_size :]
+        return m[padding_index + 1 + len(_LABEL_HASH) :]
+
+    def encrypt_hybrid(self, data: bytes) -> bytes:
+        """
+        Encrypts data of any size using a random session key wrapped with RSA.
+
+        The data is encrypted with AES-GCM, so only the session key goes through
+        the (slow) RSA operation.
+
+        Args:
+            data (bytes): The data to encrypt.
+
+        Raises:
+            PublicKeyError: If the public key is not set.
+            MessageTooLongError: If the modulus is too small for the session key.
+
+        Returns:
+            bytes: The wrapped session key, followed by the encrypted data.
+
+        """
+        if self.max_message_size < _SESSION_KEY_SIZE:
+            msg = "Message longer than modulus."
+            raise MessageTooLongError(msg)
+
+        session_key = token_bytes(_SESSION_KEY_SIZE)
+        wrapped_key = self.encrypt(session_key)
+
+        from Crypto.Cipher import AES
+
+        cipher = AES.new(session_key, AES.MODE_GCM, nonce=token_bytes(_NONCE_SIZE))
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+
+        return wrapped_key + cipher.nonce + tag + ciphertext
+
+    def decrypt_hybrid(self, data: bytes) -> bytes:
+        """
+        Decrypts the data encrypted by encrypt_hybrid().
+
+        Args:
+            data (bytes): The encrypted data to decrypt.
+
+        Raises:
+            PrivateKeyError: If the private key is not set.
+            PadError: If the session key has an invalid padding.
+            IntegrityError: If the data was modified or the key is wrong.
+
+        Returns:
+            bytes: The decrypted data.
+
+        """
+        if not self._private_key:
+            msg = "Private key is not set."
+            raise PrivateKeyError(msg)
+
+        header_size = self._private_n_size + _NONCE_SIZE + _TAG_SIZE
+        if len(data) < header_size:
+            msg = "Encrypted data is too short."
+            raise IntegrityError(msg)
+
+        session_key = self.decrypt(data[: self._private_n_size])
+        nonce = data[self._private_n_size : self._private_n_size + _NONCE_SIZE]
+        tag = data[header_size - _TAG_SIZE : header_size]
+
+        if len(session_key) != _SESSION_KEY_SIZE:
+            msg = "Invalid session key."
+            raise IntegrityError(msg)
+
+        from Crypto.Cipher import AES
+
+        cipher = AES.new(session_key, AES.MODE_GCM, nonce=nonce)
+        try:
+            return cipher.decrypt_and_verify(data[header_size:], tag)
+        except ValueError as err:
+            msg = "Encrypted data failed authentication."
+            raise IntegrityError(msg) from err
+
+    def encrypt_blocks(
+        self,
+        data: bytes,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> bytes:
+        """
+        Encrypts data of any size, split into blocks of max_message_size bytes.
+
+        Every block is padded and encrypted on its own, in many processes.
+
+        Args:
+            data (bytes): The data to encrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            chunksize (int): Number of blocks sent to a worker at once.
+
+        Raises:
+            PublicKeyError: If the public key is not set.
+            MessageTooLongError: If the modulus is too small for any data.
+
+        Returns:
+            bytes: The multi-block header, followed by the encrypted blocks.
+
+        """
+        message_size = self.max_message_size
+        if message_size == 0:
+            msg = "Message longer than modulus."
+            raise MessageTooLongError(msg)
+
+        blocks = self.encrypt_many(
+            (data[i : i + message_size] for i in range(0, len(data), message_size)),
+            workers,
+            chunksize,
+        )
+        return _BLOCKS_HEADER.pack(BLOCKS_MAGIC, self.block_size) + b"".join(blocks)
+
+    def decrypt_blocks(
+        self,
+        data: bytes,
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> bytes:
+        """
+        Decrypts the data encrypted by encrypt_blocks(), in many processes.
+
+        Args:
+            data (bytes): The encrypted data to decrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            chunksize (int): Number of blocks sent to a worker at once.
+
+        Raises:
+            PrivateKeyError: If the private key is not set.
+            FrameError: If the data is not a multi-block message of this key.
+            PadError: If a decrypted block has an invalid padding.
+
+        Returns:
+            bytes: The decrypted data.
+
+        """
+        if not self._private_key:
+            msg = "Private key is not set."
+            raise PrivateKeyError(msg)
+
+        _check_blocks_header(data[: _BLOCKS_HEADER.size], self._private_n_size)
+
+        size = self._private_n_size
+        blocks = memoryview(data)[_BLOCKS_HEADER.size :]
+        if len(blocks) % size:
+            msg = "Truncated block."
+            raise FrameError(msg)
+
+        return b"".join(
+            self.decrypt_many(
+                (bytes(blocks[i : i + size]) for i in range(0, len(blocks), size)),
+                workers,
+                chunksize,
+            )
+        )
+
+    def encrypt_many(
+        self,
+        messages: Iterable[bytes],
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> list[bytes]:
+        """
+        Encrypts many messages under the public key using many processes.
+
+        Args:
+            messages (Iterable[bytes]): The messages to encrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            chunksize (int): Number of messages sent to a worker at once, bigger
+                chunks cost less communication, smaller ones balance the load
+                better between the workers.
+
+        Raises:
+            PublicKeyError: If the public key is not set.
+            MessageTooLongError: If a message is longer than the modulus.
+
+        Returns:
+            list[bytes]: The encrypted messages, in the same order.
+
+        """
+        if not self._public_key:
+            msg = "Public key is not set."
+            raise PublicKeyError(msg)
+
+        return self._map(self.encrypt, _encrypt_in_worker, messages, workers, chunksize)
+
+    def decrypt_many(
+        self,
+        messages: Iterable[bytes],
+        workers: Optional[int] = None,
+        chunksize: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> list[bytes]:
+        """
+        Decrypts many messages under the private key using many processes.
+
+        Args:
+            messages (Iterable[bytes]): The encrypted messages to decrypt.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            chunksize (int): Number of messages sent to a worker at once, bigger
+                chunks cost less communication, smaller ones balance the load
+                better between the workers.
+
+        Raises:
+            PrivateKeyError: If the private key is not set.
+            PadError: If a decrypted message has an invalid padding.
+
+        Returns:
+            list[bytes]: The decrypted messages, in the same order.
+
+        """
+        if not self._private_key:
+            msg = "Private key is not set."
+            raise PrivateKeyError(msg)
+
+        return self._map(self.decrypt, _decrypt_in_worker, messages, workers, chunksize)
+
+    def _map(
+        self,
+        function: Callable[[bytes], bytes],
+        worker_function: Callable[[bytes], bytes],
+        messages: Iterable[bytes],
+        workers: Optional[int],
+        chunksize: int,
+    ) -> list[bytes]:
+        """Apply a function to every message, in a process pool when worth it."""
+        messages = list(messages)
+        chunks_count = -(-len(messages) // chunksize)
+        workers = min(workers or os.cpu_count() or 1, chunks_count)
+
+        if workers <= 1:
+            return [function(message) for message in messages]
+
+        with _batch_executor(self, workers) as executor:
+            return list(executor.map(worker_function, messages, chunksize=chunksize))
+
+
+def _check_blocks_header(header: bytes, block_size: int) -> None:
+    """Validate the header of a multi-block message."""
+    if len(header) != _BLOCKS_HEADER.size:
+        msg = "Not a multi-block message."
+        raise FrameError(msg)
+
+    magic, size = _BLOCKS_HEADER.unpack(header)
+    if magic != BLOCKS_MAGIC:
+        msg = "Not a multi-block message."
+        raise FrameError(msg)
+    if size != block_size:
+        msg = "Block size doesn't match the key."
+        raise FrameError(msg)
+
+
+def _batch_executor(encryptor: RSAEncryptor, workers: int) -> "ProcessPoolExecutor":
+    """Create a process pool where every worker holds a copy of an encryptor."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Every worker parses the keys once, then only receives the messages.
+    return ProcessPoolExecutor(
+        workers,
+        initializer=_init_worker,
+        initargs=(encryptor.public_key, encryptor.private_key),
+    )
+
+
+class _BlockStream:
+    """Common part of the multi-block stream writer and reader."""
+
+    def __init__(
+        self,
+        encryptor: RSAEncryptor,
+        stream: BinaryIO,
+        workers: Optional[int],
+        batch_size: int,
+    ) -> None:
+        """Start the process pool when more than one worker is used."""
+        self._encryptor = encryptor
+        self._stream = stream
+        self._batch_size = batch_size
+        self._workers = workers or os.cpu_count() or 1
+
+        # Kept for all batches, so processes are only started once.
+        self._executor = (
+            _batch_executor(encryptor, self._workers) if self._workers > 1 else None
+        )
+
+    def _map(
+        self,
+        function: Callable[[bytes], bytes],
+        worker_function: Callable[[bytes], bytes],
+        messages: list[bytes],
+    ) -> list[bytes]:
+        """Apply a function to a batch of messages."""
+        if self._executor is None:
+            return [function(message) for message in messages]
+
+        chunksize = max(-(-len(messages) // self._workers), 1)
+        return list(self._executor.map(worker_function, messages, chunksize=chunksize))
+
+    def close(self) -> None:
+        """Stop the process pool."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> Self:
+        """Use the stream as a context manager."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the stream."""
+        self.close()
+
+
+class RSABlockWriter(_BlockStream):
+    """Encrypts a stream into a multi-block message, as the data is written."""
+
+    def __init__(
+        self,
+        encryptor: RSAEncryptor,
+        stream: BinaryIO,
+        workers: Optional[int] = None,
+        batch_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> None:
+        """
+        Write the multi-block header.
+
+        Args:
+            encryptor (RSAEncryptor): Encryptor with a public key.
+            stream (BinaryIO): Binary file to write the encrypted blocks to.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            batch_size (int): Number of blocks encrypted together.
+
+        Raises:
+            MessageTooLongError: If the modulus is too small for any data.
+
+        """
+        self._message_size = encryptor.max_message_size
+        if self._message_size == 0:
+            msg = "Message longer than modulus."
+            raise MessageTooLongError(msg)
+
+        super().__init__(encryptor, stream, workers, batch_size)
+        self._buffer = bytearray()
+
+        stream.write(_BLOCKS_HEADER.pack(BLOCKS_MAGIC, encryptor.block_size))
+
+    def write(self, data: bytes) -> int:
+        """
+        Encrypt data, full batches of blocks are written immediately.
+
+        Args:
+            data (bytes): The data to encrypt.
+
+        Returns:
+            int: Number of bytes taken.
+
+        """
+        self._buffer += data
+        if len(self._buffer) >= self._message_size * self._batch_size:
+            self._flush(len(self._buffer) - len(self._buffer) % self._message_size)
+        return len(data)
+
+    def _flush(self, size: int) -> None:
+        """Encrypt and write the first size bytes of the buffer."""
+        messages = [
+            bytes(self._buffer[i : min(i + self._message_size, size)])
+            for i in range(0, size, self._message_size)
+        ]
+        for block in self._map(self._encryptor.encrypt, _encrypt_in_worker, messages):
+            self._stream.write(block)
+        del self._buffer[:size]
+
+    def close(self) -> None:
+        """Write the remaining data, including the last partial block."""
+        if self._buffer:
+            self._flush(len(self._buffer))
+        super().close()
+
+
+class RSABlockReader(_BlockStream):
+    """Decrypts a multi-block message from a stream, a batch of blocks at a time."""
+
+    def __init__(
+        self,
+        encryptor: RSAEncryptor,
+        stream: BinaryIO,
+        workers: Optional[int] = None,
+        batch_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    ) -> None:
+        """
+        Read and validate the multi-block header.
+
+        Args:
+            encryptor (RSAEncryptor): Encryptor with a private key.
+            stream (BinaryIO): Binary file to read the encrypted blocks from.
+            workers (int): Number of processes to use. (default: number of CPUs)
+            batch_size (int): Number of blocks decrypted together.
+
+        Raises:
+            PrivateKeyError: If the private key is not set.
+            FrameError: If the stream is not a multi-block message of this key.
+
+        """
+        if not encryptor.private_key:
+            msg = "Private key is not set."
+            raise PrivateKeyError(msg)
+
+        self._block_size = encryptor.block_size
+        _check_blocks_header(stream.read(_BLOCKS_HEADER.size), self._block_size)
+
+        super().__init__(encryptor, stream, workers, batch_size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """
+        Iterate over the decrypted data of every batch of blocks.
+
+        Raises:
+            FrameError: If the last block is truncated.
+            PadError: If a decrypted block has an invalid padding.
+
+        """
+        while data := self._stream.read(self._block_size * self._batch_size):
+            if len(data) % self._block_size:
+                msg = "Truncated block."
+                raise FrameError(msg)
+
+            messages = [
+                data[i : i + self._block_size]
+                for i in range(0, len(data), self._block_size)
+            ]
+            yield b"".join(
+                self._map(self._encryptor.decrypt, _decrypt_in_worker, messages)
+            )
+
+    def read(self) -> bytes:
+        """Decrypt all the remaining blocks."""
+        return b"".join(self)
+
+
+# Encryptor of the current batch worker process.
+_worker_encryptor: Optional[RSAEncryptor] = None
+
+
+def _init_worker(
+    public_key: Optional[tuple[bytes, bytes]],
+    private_key: Optional[tuple[bytes, ...]],
+) -> None:
+    """Create the encryptor of a batch worker process."""
+    global _worker_encryptor  # noqa: PLW0603
+    _worker_encryptor = RSAEncryptor(public_key, private_key)
+
+
+def _encrypt_in_worker(message: bytes) -> bytes:
+    """Encrypt a message with the encryptor of the batch worker process."""
+    if _worker_encryptor is None:
+        msg = "Worker encryptor is not initialized."
+        raise RuntimeError(msg)
+    return _worker_encryptor.encrypt(message)
+
+
+def _decrypt_in_worker(message: bytes) -> bytes:
+    """Decrypt a message with the encryptor of the batch worker process."""
+    if _worker_encryptor is None:
+        msg = "Worker encryptor is not initialized."
+        raise RuntimeError(msg)
+    return _worker_encryptor.decrypt(message)
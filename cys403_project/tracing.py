@@ -0,0 +1,329 @@
+"""
+Timing and memory instrumentation of the application stages.
+
+Spans are only recorded when the CYS403_TRACE environment variable holds the
+path of a trace file. Every span records its wall time, CPU time of the
+process, bytes processed, the peak resident memory of the whole process so far,
+and how much the span raised that peak (0 when it stayed below an earlier peak,
+so it's a lower bound of the memory used by the span). Setting
+CYS403_TRACE_MEMORY=1 also records the peak memory traced by tracemalloc, which
+slows down allocations.
+
+Files ending with ".json" are written in the Chrome trace event format (open
+them in chrome://tracing or https://ui.perfetto.dev), any other file gets a JSON
+object per line. Events are appended as soon as a span ends, so worker
+processes, which inherit the environment, write to the same file.
+
+This module must not import GTK, since it is imported in the worker processes.
+"""
+
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Optional, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+TRACE_ENV = "CYS403_TRACE"
+TRACE_MEMORY_ENV = "CYS403_TRACE_MEMORY"
+
+_trace_path = os.environ.get(TRACE_ENV) or None
+_trace_memory = os.environ.get(TRACE_MEMORY_ENV) == "1"
+# Whether tracemalloc was started by a span, and not by someone else.
+_started_tracemalloc = False
+
+# Trace file of the current process, opened on the first event.
+_fd: Optional[int] = None
+_fd_pid: Optional[int] = None
+_fd_lock = threading.Lock()
+
+# Spans recording the tracemalloc peak, open in any thread of the process.
+_memory_spans: list["Span"] = []
+_memory_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    """Check if spans are recorded."""
+    return _trace_path is not None
+
+
+def configure(path: Optional[str], *, memory: bool = False) -> None:
+    """
+    Start or stop recording spans, overriding the environment variables.
+
+    The environment variables are updated too, so processes started afterwards
+    record to the same file.
+
+    Args:
+        path: Trace file path, None to stop recording.
+        memory: Also record the peak memory traced by tracemalloc.
+
+    """
+    global _trace_path, _trace_memory, _fd, _started_tracemalloc  # noqa: PLW0603
+
+    with _fd_lock:
+        if _fd is not None and _fd_pid == os.getpid():
+            os.close(_fd)
+        _fd = None
+
+    if not memory:
+        with _memory_lock:
+            _memory_spans.clear()
+        if _started_tracemalloc:
+            tracemalloc.stop()
+            _started_tracemalloc = False
+
+    _trace_path = path
+    _trace_memory = memory
+
+    if path is None:
+        os.environ.pop(TRACE_ENV, None)
+        os.environ.pop(TRACE_MEMORY_ENV, None)
+    else:
+        os.environ[TRACE_ENV] = path
+        os.environ[TRACE_MEMORY_ENV] = "1" if memory else "0"
+
+
+def peak_rss() -> int:
+    """Get the highest resident memory of the process so far, in bytes."""
+    # Reported in kilobytes on Linux, and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _start_tracemalloc() -> None:
+    """Start tracing allocations, if nobody did already."""
+    global _started_tracemalloc  # noqa: PLW0603
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+
+
+def _fold_traced_peak() -> None:
+    """
+    Pass the tracemalloc peak to every open span, and reset it.
+
+    The peak is global, so it's reset when any span starts or ends, after being
+    kept by all the spans open since the last reset.
+    """
+    peak = tracemalloc.get_traced_memory()[1]
+    for open_span in _memory_spans:
+        open_span._peak_traced = max(open_span._peak_traced, peak)  # noqa: SLF001
+    tracemalloc.reset_peak()
+
+
+class Span:
+    """A timed stage of the application, ended once."""
+
+    def __init__(self, name: str, size: Optional[int], args: dict[str, Any]) -> None:
+        """
+        Start the span.
+
+        Args:
+            name: Name of the stage.
+            size: Bytes processed by the stage, if known already.
+            args: Extra values kept in the event.
+
+        """
+        self.name = name
+        self.size = size
+        self.args = args
+        self._peak_traced = 0
+        self._ended = False
+
+        if _trace_memory:
+            _start_tracemalloc()
+            with _memory_lock:
+                _fold_traced_peak()
+                _memory_spans.append(self)
+
+        self._peak_rss = peak_rss()
+        self._timestamp = time.time_ns() // 1000
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    def end(self) -> None:
+        """End the span, and write its event."""
+        if self._ended:
+            return
+        self._ended = True
+
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        rss = peak_rss()
+
+        peak_traced = None
+        with _memory_lock:
+            if self in _memory_spans:
+                _fold_traced_peak()
+                _memory_spans.remove(self)
+                peak_traced = self._peak_traced
+
+        _write(
+            {
+                "name": self.name,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "timestamp": self._timestamp,
+                "wall": wall,
+                "cpu": cpu,
+                "bytes": self.size,
+                "process_peak_rss": rss,
+                "rss_growth": rss - self._peak_rss,
+                "peak_traced": peak_traced,
+                "args": self.args,
+            }
+        )
+
+
+class _NullSpan(Span):
+    """Span that records nothing, used when tracing is disabled."""
+
+    def __init__(self) -> None:
+        """Initialize the span."""
+        self.name = ""
+        self.size = None
+        self.args = {}
+
+    def end(self) -> None:
+        """Do nothing."""
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def begin(name: str, size: Optional[int] = None, **args: Any) -> Span:  # noqa: ANN401
+    """
+    Start a span that is ended manually, like one covering a background job.
+
+    Args:
+        name: Name of the stage.
+        size: Bytes processed by the stage, can also be set later.
+        **args: Extra JSON serializable values kept in the event.
+
+    Returns:
+        The span, to call end() on.
+
+    """
+    if _trace_path is None:
+        return _NULL_SPAN
+    return Span(name, size, args)
+
+
+@contextmanager
+def span(name: str, size: Optional[int] = None, **args: Any) -> Iterator[Span]:  # noqa: ANN401
+    """
+    Record a span around a block.
+
+    Args:
+        name: Name of the stage.
+        size: Bytes processed by the stage, can also be set later.
+        **args: Extra JSON serializable values kept in the event.
+
+    Yields:
+        The span, to set its size on.
+
+    """
+    if _trace_path is None:
+        yield _NULL_SPAN
+        return
+
+    current = Span(name, size, args)
+    try:
+        yield current
+    finally:
+        current.end()
+
+
+def traced(name: str) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """
+    Record a span around every call of a function (decorator).
+
+    Args:
+        name: Name of the stage.
+
+    Returns:
+        The decorator.
+
+    """
+
+    def decorator(function: Callable[P, T]) -> Callable[P, T]:
+        @wraps(function)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if _trace_path is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _format(event: dict[str, Any], path: str) -> str:
+    """Format an event as a line of the trace file."""
+    if path.endswith(".json"):
+        # Complete event, the array is left open as allowed by the format
+        return (
+            json.dumps(
+                {
+                    "name": event["name"],
+                    "cat": event["name"].split(".", 1)[0],
+                    "ph": "X",
+                    "ts": event["timestamp"],
+                    "dur": event["wall"] * 1e6,
+                    "pid": event["pid"],
+                    "tid": event["tid"],
+                    "args": {
+                        "cpu_ms": event["cpu"] * 1e3,
+                        "bytes": event["bytes"],
+                        "process_peak_rss": event["process_peak_rss"],
+                        "rss_growth": event["rss_growth"],
+                        "peak_traced": event["peak_traced"],
+                        **event["args"],
+                    },
+                }
+            )
+            + ",\n"
+        )
+    return json.dumps(event) + "\n"
+
+
+def _open(path: str) -> int:
+    """Open the trace file for appending, starting it if it's new."""
+    if path.endswith(".json"):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            pass
+        else:
+            os.write(fd, b"[\n")
+            os.close(fd)
+
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+
+def _write(event: dict[str, Any]) -> None:
+    """Append an event to the trace file, with a single write."""
+    global _fd, _fd_pid  # noqa: PLW0603
+
+    path = _trace_path
+    if path is None:
+        return
+
+    line = _format(event, path).encode()
+    with _fd_lock:
+        # Forked processes open their own file descriptor
+        if _fd is None or _fd_pid != os.getpid():
+            _fd = _open(path)
+            _fd_pid = os.getpid()
+        os.write(_fd, line)
@@ -1,19 +1,29 @@
 """Image encryption page."""
 
 import binascii
-import multiprocessing
 from base64 import b64decode, b64encode
 from enum import Enum
+from functools import partial
 from gettext import gettext as _
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, Union
 
 import gi
-from PIL import Image
 
-from cys403_project.crypto.imgenc import ImageEncryptor
+from cys403_project import tracing
+from cys403_project.crypto.cipher_image import CipherImageError, MappedCipherImage
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+from cys403_project.ui.worker_pool import (
+    BufferHandle,
+    FileBufferHandle,
+    SharedBuffer,
+    decrypt_image,
+    encrypt_image,
+)
 
 if TYPE_CHECKING:
+    from concurrent.futures import Future
+
     from cys403_project.ui.main_window import Cys403ProjectMainWindow
 
 gi.require_version("Adw", "1")
@@ -34,36 +44,6 @@ class BinMode(Enum):
     PLAIN_IMAGE = 1
 
 
-class CipherImage:
-    """Represent an encrypted image with its sizes."""
-
-    def __init__(self, width: int, height: int, data: bytes) -> None:
-        """Initialize a cipher image."""
-        self.width = width
-        self.height = height
-        self.data = data
-
-    def write_to_file(self, path: Path) -> None:
-        """Write cipher image to a file."""
-        with Path.open(path, "wb") as f:
-            f.write((str(self.width) + "\n" + str(self.height) + "\n").encode("ascii"))
-            f.write(self.data)
-
-    def get_size(self) -> tuple[int, int]:
-        """Get the image size in Pillow format."""
-        return (self.width, self.height)
-
-    @staticmethod
-    def read_from_file(path: Path) -> "CipherImage":
-        """Read cipher image from a file."""
-        with Path.open(path, "rb") as f:
-            width = int(f.readline().decode("ascii").strip())
-            height = int(f.readline().decode("ascii").strip())
-            data = f.read()
-
-        return CipherImage(width, height, data)
-
-
 class KeyGenOptionsDialog(Adw.Dialog):
     """Dialog for selecting key generation options."""
 
@@ -119,10 +99,19 @@ class ImagePage(Adw.Bin):
         super().__init__()
         self._window = window
 
-        self.input_buffer: bytes
+        # Image buffers are shared with the worker processes, only their handles
+        # are sent with the jobs.
+        self.input_buffer: memoryview
+        self.input_handle: BufferHandle
+        self._input_shared: Optional[SharedBuffer] = None
+        self._input_mapped: Optional[MappedCipherImage] = None
         self._input_buffer_shape: tuple[int, int]
-        self.output_buffer: bytes
+        self.input_block_mode: BlockMode
+        self.output_buffer: Union[bytes, memoryview]
+        self._output_shared: Optional[SharedBuffer] = None
         self.output_buffer_shape: tuple[int, int]
+        self.output_block_mode: BlockMode
+        self.output_block_size: int
 
         self.split_view = Adw.OverlaySplitView()
         self.set_child(self.split_view)
@@ -142,6 +131,18 @@ class ImagePage(Adw.Bin):
         self._sidebar_box.append(self._key_gen_button)
         self._key_gen_button.connect("clicked", self._generate_new_key)
 
+        self._block_mode = Gtk.DropDown.new_from_strings(
+            [mode.name for mode in BlockMode]
+        )
+        self._sidebar_box.append(
+            Gtk.Frame(
+                child=self._block_mode,
+                label_widget=Gtk.Label(
+                    use_markup=True, label=_("<b>Cipher Block Mode</b>")
+                ),
+            )
+        )
+
         self._private_key = Gtk.TextView(wrap_mode=Gtk.WrapMode.CHAR, vexpand=True)
         self._sidebar_box.append(
             Gtk.Frame(
@@ -246,6 +247,10 @@ class ImagePage(Adw.Bin):
             self._window.show_error(_("Private key input contain invalid base64 text."))
             return None
 
+    def get_block_mode(self) -> BlockMode:
+        """Get the selected cipher block mode from the ui."""
+        return list(BlockMode)[self._block_mode.get_selected()]
+
     def _select_input(self, _button: Gtk.Button) -> None:
         """Get input path to open image."""
         dialog = Gtk.FileChooserDialog(
@@ -323,6 +328,11 @@ class ImagePage(Adw.Bin):
 
         dialog.close()
 
+    def open_image(self, file: Gio.File) -> None:
+        """Open an image file given from outside the page."""
+        self._open_image(file)
+
+    @tracing.traced("image.open")
     def _open_image(self, file: Gio.File) -> None:
         """Open an image file from path."""
         path = file.get_path()
@@ -331,21 +341,27 @@ class ImagePage(Adw.Bin):
             private_key = self.get_private_key()
 
             if path.endswith(".cipher_image") and private_key:
-                cm = CipherImage.read_from_file(Path(path))
+                # The payload stays in the mapped file, only viewed from here
+                cm = self._map_cipher_image(path, len(private_key))
+                if cm is None:
+                    return
+                size = cm.get_size()
 
                 self._input_mode = BinMode.CIPHER_IMAGE
+                self._release_input()
+                self._input_mapped = cm
                 self.input_buffer = cm.data
-                self._input_buffer_shape = cm.get_size()
+                # Workers map the file themselves, the data is never copied
+                self.input_handle = FileBufferHandle(path, cm.data_offset, len(cm.data))
+                self._input_buffer_shape = size
+                self.input_block_mode = cm.mode
 
                 display_buffer = self.input_buffer[
                     len(private_key) : cm.width * cm.height * 3 + len(private_key)
                 ]
 
                 if len(display_buffer) == cm.width * cm.height * 3:
-                    pixbuf = bytes_to_pixbuf(
-                        display_buffer,
-                        cm.get_size(),
-                    )
+                    pixbuf = bytes_to_pixbuf(display_buffer, size)
                     image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
                     self._input_bin.set_child(image_widget)
 
@@ -362,37 +378,105 @@ class ImagePage(Adw.Bin):
                         Adw.StatusPage(title=_("Corrupted Input"))
                     )
             else:
-                pm = Image.open(path).convert("RGB")  # Force RGB format
+                # Pillow is imported on first use, not when the page is built
+                from PIL import Image
+
+                with tracing.span("image.decode"):
+                    pm = Image.open(path).convert("RGB")  # Force RGB format
 
                 self._input_mode = BinMode.PLAIN_IMAGE
-                self.input_buffer = pm.tobytes()
+                self._release_input()
+                self._input_shared = SharedBuffer(pm.width * pm.height * 3)
+                with tracing.span("image.tobytes", len(self._input_shared.buf)):
+                    # Also given to the pixbuf, which can only be made from bytes
+                    pixels = pm.tobytes()
+                    self._input_shared.buf[:] = pixels
+                self.input_buffer = self._input_shared.buf
+                self.input_handle = self._input_shared.handle
                 self._input_buffer_shape = pm.size
 
-                pixbuf = bytes_to_pixbuf(self.input_buffer, pm.size)
+                pixbuf = bytes_to_pixbuf(pixels, pm.size)
+                del pixels
                 image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
                 self._input_bin.set_child(image_widget)
 
                 self._encrypt_button.set_sensitive(True)
                 self._decrypt_button.set_sensitive(False)
 
+    def _map_cipher_image(
+        self, path: str, key_size: int
+    ) -> Optional[MappedCipherImage]:
+        """Map a cipher image file, showing an error if it can't be decrypted."""
+        try:
+            with tracing.span("image.map_cipher"):
+                cm = MappedCipherImage.open(Path(path))
+                # The header is parsed, and validated, on first access
+                try:
+                    cm.get_size()
+                except CipherImageError:
+                    cm.close()
+                    raise
+        except CipherImageError:
+            self._window.show_error(
+                _("Failed to open image, not a valid cipher image file.")
+            )
+            self._input_bin.set_child(Adw.StatusPage(title=_("Corrupted Input")))
+            return None
+
+        # Known without decrypting anything for files with a block size
+        if cm.block_size is not None and cm.block_size != key_size:
+            cm.close()
+            self._window.show_error(
+                _("Failed to open and display image, key size doesn't match.")
+            )
+            self._input_bin.set_child(Adw.StatusPage(title=_("Corrupted Input")))
+            return None
+
+        # Damaged data would decrypt into a silently damaged image
+        with tracing.span("image.verify_cipher", len(cm.data)):
+            corrupted = cm.corrupted_chunks()
+        if corrupted:
+            cm.close()
+            self._window.show_error(_("Failed to open image, the file is corrupted."))
+            self._input_bin.set_child(Adw.StatusPage(title=_("Corrupted Input")))
+            return None
+
+        return cm
+
+    @tracing.traced("image.save")
     def _save_image(self, file: Gio.File) -> None:
         """Open an image file from path."""
         path = file.get_path()
 
         if path:
-            if hasattr(self, "output_buffer"):
+            if self._is_input_file(path):
+                # Truncating the file would break its mapping (SIGBUS)
+                self._window.show_error(
+                    _("Can't overwrite the opened input image, choose another file.")
+                )
+            elif hasattr(self, "output_buffer"):
                 if self._output_mode == BinMode.CIPHER_IMAGE:
-                    cm = CipherImage(*self.output_buffer_shape, self.output_buffer)
-
-                    if path:
-                        cm.write_to_file(Path(path))
+                    with (
+                        tracing.span("image.write_cipher", len(self.output_buffer)),
+                        MappedCipherImage.create(
+                            Path(path),
+                            *self.output_buffer_shape,
+                            self.output_block_size,
+                            self.output_block_mode,
+                        ) as cm,
+                    ):
+                        cm.data[:] = self.output_buffer
                 elif self._output_mode == BinMode.PLAIN_IMAGE:
-                    pm = Image.frombytes(
-                        mode="RGB",
-                        size=self.output_buffer_shape,
-                        data=self.output_buffer,
-                    )
-                    pm.save(path)
+                    from PIL import Image
+
+                    with tracing.span("image.frombytes", len(self.output_buffer)):
+                        pm = Image.frombytes(
+                            mode="RGB",
+                            size=self.output_buffer_shape,
+                            data=self.output_buffer,
+                        )
+                    with tracing.span("image.encode", format=Path(path).suffix):
+                        pm.save(path)
             else:
                 self._window.show_error(
                     _("Output buffer is empty, there is noting to be save.")
@@ -406,13 +490,31 @@ class ImagePage(Adw.Bin):
             if hasattr(self, "input_buffer"):
                 self._output_mode = BinMode.CIPHER_IMAGE
                 self.output_buffer_shape = self._input_buffer_shape
+                self.output_block_mode = self.get_block_mode()
+                self.output_block_size = len(private_key)
                 self.output_bin.set_child(Adw.Spinner())  # type: ignore[attr-defined]
                 self.set_buttons_sensitivity(False)
                 self._save_output_button.set_sensitive(False)
 
-                process = Encrypt(self, private_key)
-                process.start()
-                GLib.timeout_add(100, process.check_for_result)
+                output = self._new_output(
+                    ImageEncryptor(
+                        key=private_key, mode=self.output_block_mode
+                    ).encrypted_size(len(self.input_buffer))
+                )
+                # Covers the queueing, the worker and the delivery of the result
+                job = tracing.begin(
+                    "image.encrypt",
+                    len(self.input_buffer),
+                    mode=self.output_block_mode.name,
+                )
+                self._window.submit_job(
+                    partial(self._on_encrypt_result, output, job),
+                    encrypt_image,
+                    private_key,
+                    self.output_block_mode,
+                    self.input_handle,
+                    output.handle,
+                )
             else:
                 self._window.show_error(
                     _("Input buffer is empty, there is noting to be encrypted.")
@@ -432,10 +534,22 @@ class ImagePage(Adw.Bin):
                 self.set_buttons_sensitivity(False)
                 self._save_output_button.set_sensitive(False)
 
-                process = Decrypt(self, private_key)
-                process.start()
-                GLib.timeout_add(100, process.check_for_result)
-
+                output = self._new_output(
+                    max(len(self.input_buffer) - len(private_key), 0)
+                )
+                job = tracing.begin(
+                    "image.decrypt",
+                    len(self.input_buffer),
+                    mode=self.input_block_mode.name,
+                )
+                self._window.submit_job(
+                    partial(self._on_decrypt_result, output, job),
+                    decrypt_image,
+                    private_key,
+                    self.input_block_mode,
+                    self.input_handle,
+                    output.handle,
+                )
             else:
                 self._window.show_error(
                     _("Input buffer is empty, there is noting to be decrypted.")
@@ -443,6 +557,112 @@ class ImagePage(Adw.Bin):
         else:
             self._window.show_error(_("Private key is empty, can't decrypt."))
 
+    def _on_encrypt_result(
+        self, output: SharedBuffer, job: tracing.Span, future: "Future[int]"
+    ) -> None:
+        """Show the encryption job result."""
+        job.end()
+        error = future.exception()
+        if error is not None:
+            self._on_job_error(error, _("Failed to encrypt image."))
+            return
+
+        self.output_buffer = output.buf[: future.result()]
+
+        pixbuf = bytes_to_pixbuf(
+            self.output_buffer[
+                self.output_block_size : len(self.input_buffer) + self.output_block_size
+            ],
+            self.output_buffer_shape,
+        )
+        image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
+        self.output_bin.set_child(image_widget)
+        self.set_buttons_sensitivity(True)
+        self._save_output_button.set_sensitive(True)
+
+    def _on_decrypt_result(
+        self, output: SharedBuffer, job: tracing.Span, future: "Future[int]"
+    ) -> None:
+        """Show the decryption job result."""
+        job.end()
+        error = future.exception()
+        if isinstance(error, ValueError):
+            # Invalid padding, handled as a key size mismatch below
+            self.output_buffer = b""
+        elif error is not None:
+            self._on_job_error(error, _("Failed to decrypt image."))
+            return
+        else:
+            self.output_buffer = output.buf[: future.result()]
+
+        if (
+            len(self.output_buffer)
+            == self.output_buffer_shape[0] * self.output_buffer_shape[1] * 3
+        ):
+            pixbuf = bytes_to_pixbuf(self.output_buffer, self.output_buffer_shape)
+            image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
+            self.output_bin.set_child(image_widget)
+
+            self._save_output_button.set_sensitive(True)
+        else:
+            # When the image was encrypted using smaller key.
+            self._window.show_error(
+                _("Failed to decrypt and display image, key size doesn't match.")
+            )
+            # TODO: Show corrupted image icon.
+            self.output_bin.set_child(Adw.StatusPage(title=_("Corrupted Output")))
+
+        self.set_buttons_sensitivity(True)
+
+    def _on_job_error(self, error: BaseException, msg: str) -> None:
+        """Report a failed job, and restore the page to take a new one."""
+        self._window.report_job_error(error, msg)
+        self._release_output()
+        self.output_bin.set_child(Adw.StatusPage(title=_("Failed Output")))
+        self.set_buttons_sensitivity(True)
+
+    def _release_input(self) -> None:
+        """Remove the shared memory, or unmap the file, of the current input."""
+        if self._input_shared is not None:
+            self._input_shared.close()
+            self._input_shared = None
+        if self._input_mapped is not None:
+            # The view must be released before the file is unmapped
+            if hasattr(self, "input_buffer"):
+                del self.input_buffer
+            self._input_mapped.close()
+            self._input_mapped = None
+
+    def _is_input_file(self, path: str) -> bool:
+        """Check if a path is the file mapped as the current input."""
+        if self._input_mapped is None:
+            return False
+        try:
+            return Path(path).samefile(self._input_mapped.path)
+        except OSError:
+            return False
+
+    def _release_output(self) -> None:
+        """Remove the shared memory of the current output."""
+        if self._output_shared is not None:
+            if hasattr(self, "output_buffer"):
+                if isinstance(self.output_buffer, memoryview):
+                    self.output_buffer.release()
+                del self.output_buffer
+            self._output_shared.close()
+            self._output_shared = None
+
+    def _new_output(self, size: int) -> SharedBuffer:
+        """Replace the output with a new shared memory buffer."""
+        self._release_output()
+        self._output_shared = SharedBuffer(size)
+        return self._output_shared
+
+    def release_buffers(self) -> None:
+        """Remove all shared memory buffers of the page."""
+        self._release_input()
+        self._release_output()
+
     def set_buttons_sensitivity(self, value: bool) -> None:  # noqa: FBT001
         """Set buttons sinsitivity, and show a spinner in the output bin."""
         self._key_gen_button.set_sensitive(value)
@@ -464,108 +684,25 @@ class ImagePage(Adw.Bin):
         return self._save_output_button
 
 
-class Encrypt(multiprocessing.Process):
-    """Encrypt process."""
-
-    def __init__(self, page: ImagePage, private_key: bytes) -> None:
-        """Initialize the process."""
-        super().__init__(daemon=True)
-        self.page = page
-        self.private_key = private_key
-
-        self.parent_conn, self.child_conn = multiprocessing.Pipe()
+def bytes_to_pixbuf(
+    data: Union[bytes, memoryview], size: tuple[int, int]
+) -> GdkPixbuf.Pixbuf:
+    """
+    Convert a raw image to a GdkPixbuf.
 
-    def run(self) -> None:
-        """CPU intensive task."""
-        encryptor = ImageEncryptor(key=self.private_key)
-
-        self.child_conn.send(encryptor.encrypt(self.page.input_buffer))
-
-    def check_for_result(self) -> bool:
-        """Check for results and finalize process."""
-        if self.parent_conn.poll():
-            self.page.output_buffer = self.parent_conn.recv()
-
-            pixbuf = bytes_to_pixbuf(
-                self.page.output_buffer[
-                    len(self.private_key) : len(self.page.input_buffer)
-                    + len(self.private_key)
-                ],
-                self.page.output_buffer_shape,
-            )
-            image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
-            self.page.output_bin.set_child(image_widget)
-            self.page.set_buttons_sensitivity(True)
-            self.page.save_output_button.set_sensitive(True)
-
-            self.join()
-            return False
-        return True
-
-
-class Decrypt(multiprocessing.Process):
-    """Decrypt process."""
-
-    def __init__(self, page: ImagePage, private_key: bytes) -> None:
-        """Initialize the process."""
-        super().__init__(daemon=True)
-        self.page = page
-        self.private_key = private_key
-
-        self.parent_conn, self.child_conn = multiprocessing.Pipe()
-
-    def run(self) -> None:
-        """CPU intensive task."""
-        encryptor = ImageEncryptor(key=self.private_key)
-
-        self.child_conn.send(encryptor.decrypt(self.page.input_buffer))
-
-    def check_for_result(self) -> bool:
-        """Check for results and finalize process."""
-        if self.parent_conn.poll():
-            self.page.output_buffer = self.parent_conn.recv()
-
-            if (
-                len(self.page.output_buffer)
-                == self.page.output_buffer_shape[0]
-                * self.page.output_buffer_shape[1]
-                * 3
-            ):
-                pixbuf = bytes_to_pixbuf(
-                    self.page.output_buffer,
-                    self.page.output_buffer_shape,
-                )
-                image_widget = Gtk.Image.new_from_pixbuf(pixbuf)
-                self.page.output_bin.set_child(image_widget)
-
-                self.page.save_output_button.set_sensitive(True)
-            else:
-                # When the image was encrypted using smaller key.
-                self.page.window.show_error(
-                    _("Failed to decrypt and display image, key size doesn't match.")
-                )
-                # TODO: Show corrupted image icon.
-                self.page.output_bin.set_child(
-                    Adw.StatusPage(title=_("Corrupted Output"))
-                )
-
-            self.page.set_buttons_sensitivity(True)
-
-            self.join()
-            return False
-        return True
-
-
-def bytes_to_pixbuf(data: bytes, size: tuple[int, int]) -> GdkPixbuf.Pixbuf:
-    """Convert a raw image to a GdkPixbuf."""
+    GLib always copies the data, and PyGObject only copies bytes objects in a
+    single step (any other buffer is read byte by byte). Bytes are passed as
+    they are, and other buffers are converted once.
+    """
     width, height = size
 
-    return GdkPixbuf.Pixbuf.new_from_bytes(
-        data=GLib.Bytes.new(data),
-        colorspace=GdkPixbuf.Colorspace.RGB,
-        has_alpha=False,
-        bits_per_sample=8,
-        width=width,
-        height=height,
-        rowstride=width * 3,
-    )
+    with tracing.span("image.bytes_to_pixbuf", len(data)):
+        return GdkPixbuf.Pixbuf.new_from_bytes(
+            data=GLib.Bytes.new(data if isinstance(data, bytes) else bytes(data)),
+            colorspace=GdkPixbuf.Colorspace.RGB,
+            has_alpha=False,
+            bits_per_sample=8,
+            width=width,
+            height=height,
+            rowstride=width * 3,
+        )
@@ -0,0 +1,237 @@
+"""
+Pool of RSA key pairs generated ahead of time, in the background.
+
+Keys are generated one at a time by a low priority process, and can be kept in
+a cache file that only the user can read, so they survive restarts. Setting
+CYS403_KEY_POOL=0 turns off the background generation.
+
+This module must not import GTK, since it is imported in the worker process.
+The worker process, and the RSA implementation, are only imported once the pool
+is started, after the UI is shown.
+"""
+
+import contextlib
+import json
+import os
+import threading
+from base64 import b64decode, b64encode
+from collections import Counter
+from collections.abc import Iterable
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+    from multiprocessing.synchronize import Event
+
+KeyPair = tuple[tuple[bytes, bytes], tuple[bytes, ...]]
+KeyType = tuple[int, int]
+
+# Modulus size and public exponent of the keys kept by default.
+DEFAULT_KEY_TYPES: tuple[KeyType, ...] = ((2048, 65537), (4096, 65537))
+# Number of keys kept for every key type by default.
+DEFAULT_CAPACITY = 2
+
+_CACHE_VERSION = 1
+
+# Environment variable turning off the background generation when set to 0.
+KEY_POOL_ENV = "CYS403_KEY_POOL"
+
+
+def enabled() -> bool:
+    """Check if keys should be generated in the background."""
+    return os.environ.get(KEY_POOL_ENV, "1") != "0"
+
+
+# Event set when the pool of the current worker process is shut down.
+_worker_cancel: "Optional[Event]" = None
+
+
+def _init_worker(cancel: "Event") -> None:
+    """Lower the priority of the worker process, and keep the shutdown event."""
+    global _worker_cancel  # noqa: PLW0603
+    _worker_cancel = cancel
+
+    with contextlib.suppress(OSError):
+        os.nice(19)
+
+
+def _generate(size: int, e: int) -> KeyPair:
+    """Generate a key pair using a single process."""
+    from cys403_project.crypto.rsa import RSAEncryptor
+
+    return RSAEncryptor.keygen(size, e, workers=1, cancel=_worker_cancel)
+
+
+class KeyPool:
+    """
+    Pool of pre-generated RSA key pairs, refilled automatically.
+
+    Keys are handed out once, a taken key is removed from the pool (and cache).
+    """
+
+    def __init__(
+        self,
+        key_types: Iterable[KeyType] = DEFAULT_KEY_TYPES,
+        capacity: int = DEFAULT_CAPACITY,
+        cache_path: Optional[Path] = None,
+    ) -> None:
+        """
+        Initialize the pool, loading the cached keys if any.
+
+        Args:
+            key_types: Modulus size and public exponent of the keys to keep.
+            capacity: Number of keys to keep for every key type.
+            cache_path: File to keep the keys in, keys are only kept in memory
+                when not given.
+
+        """
+        self._capacity = capacity
+        self._cache_path = cache_path
+        self._keys: dict[KeyType, list[KeyPair]] = {
+            key_type: [] for key_type in key_types
+        }
+        self._pending: Counter[KeyType] = Counter()
+        self._lock = threading.Lock()
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cancel: Optional[Event] = None
+
+        if cache_path is not None:
+            self._load()
+
+    def start(self) -> None:
+        """Start generating the missing keys in the background."""
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking a multi-threaded GTK process is unsafe, spawn a fresh worker.
+            context = multiprocessing.get_context("spawn")
+            self._cancel = context.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._cancel,),
+            )
+
+        self._refill()
+
+    def available(self, size: int, e: int) -> int:
+        """Get the number of ready keys of a key type."""
+        with self._lock:
+            return len(self._keys.get((size, e), ()))
+
+    def take(self, size: int, e: int) -> Optional[KeyPair]:
+        """
+        Take a ready key pair out of the pool.
+
+        Args:
+            size: Size of the modulus in bits.
+            e: Public exponent.
+
+        Returns:
+            A key pair, or None when none is ready.
+
+        """
+        with self._lock:
+            keys = self._keys.get((size, e))
+            if not keys:
+                return None
+
+            key = keys.pop(0)
+            self._save()
+
+        if self._executor is not None:
+            self._refill()
+
+        return key
+
+    def shutdown(self) -> None:
+        """Stop generating keys, the ready ones stay in the cache."""
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _refill(self) -> None:
+        """Submit a job for every missing key."""
+        with self._lock:
+            if self._executor is None:
+                return
+
+            for key_type, keys in self._keys.items():
+                for _ in range(self._capacity - len(keys) - self._pending[key_type]):
+                    self._pending[key_type] += 1
+                    self._executor.submit(_generate, *key_type).add_done_callback(
+                        partial(self._on_generated, key_type)
+                    )
+
+    def _on_generated(self, key_type: KeyType, future: "Future[KeyPair]") -> None:
+        """Add a generated key to the pool."""
+        with self._lock:
+            self._pending[key_type] -= 1
+
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            self._keys[key_type].append(future.result())
+            self._save()
+
+    def _load(self) -> None:
+        """Load the keys from the cache file, ignoring it if it's not private."""
+        if self._cache_path is None or not self._cache_path.exists():
+            return
+
+        try:
+            # Keys that may have been read by others must not be used
+            if self._cache_path.stat().st_mode & 0o077:
+                self._cache_path.unlink()
+                return
+
+            cache = json.loads(self._cache_path.read_text())
+            if cache["version"] != _CACHE_VERSION:
+                return
+
+            for entry in cache["keys"]:
+                keys = self._keys.get((entry["size"], entry["e"]))
+                if keys is not None and len(keys) < self._capacity:
+                    e, n = (b64decode(x) for x in entry["public"])
+                    keys.append(((e, n), tuple(b64decode(x) for x in entry["private"])))
+        except (OSError, ValueError, KeyError, TypeError):
+            # A broken cache is just regenerated
+            return
+
+    def _save(self) -> None:
+        """Write the keys to the cache file, readable only by the user."""
+        if self._cache_path is None:
+            return
+
+        cache = {
+            "version": _CACHE_VERSION,
+            "keys": [
+                {
+                    "size": size,
+                    "e": e,
+                    "public": [b64encode(x).decode("ascii") for x in public_key],
+                    "private": [b64encode(x).decode("ascii") for x in private_key],
+                }
+                for (size, e), keys in self._keys.items()
+                for public_key, private_key in keys
+            ],
+        }
+
+        with contextlib.suppress(OSError):
+            self._cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+            # Written next to the cache, then moved over it at once
+            temporary_path = self._cache_path.with_suffix(".tmp")
+            fd = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                os.fchmod(f.fileno(), 0o600)
+                json.dump(cache, f)
+            temporary_path.replace(self._cache_path)
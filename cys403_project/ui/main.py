@@ -5,6 +5,7 @@ from collections.abc import Sequence
 
 import gi
 
+from cys403_project import tracing
 from cys403_project.__about__ import APP_ID, APP_NAME
 
 from .main_window import Cys403ProjectMainWindow
@@ -12,8 +13,10 @@ from .main_window import Cys403ProjectMainWindow
 gi.require_version("Adw", "1")
 from gi.repository import (  # noqa: E402
     Adw,
+    Gdk,
     Gio,
     GLib,
+    Gtk,
 )
 
 
@@ -28,6 +31,9 @@ class Cys403Project(Adw.Application):
         )
         GLib.set_application_name(APP_NAME)
 
+        # Ended when the first frame of the window is drawn
+        self._startup = tracing.begin("app.startup")
+
     def do_open(self, files: Sequence[Gio.File], _count: int, _hint: str) -> None:  # type: ignore[override]
         """Handle CLI args."""
         self.files = files
@@ -43,12 +49,18 @@ class Cys403Project(Adw.Application):
         if not self.window:
             self.window = Cys403ProjectMainWindow(self)
 
+        self.window.add_tick_callback(self._on_first_frame)
         self.window.present()
 
         # Pass CLI args to the main window
         with contextlib.suppress(AttributeError, KeyError):
             self.window.open_files(self.files)  # type: ignore[attr-defined]
 
+    def _on_first_frame(self, _widget: Gtk.Widget, _clock: Gdk.FrameClock) -> bool:
+        """End the startup span, once."""
+        self._startup.end()
+        return GLib.SOURCE_REMOVE
+
 
 def main_ui(argv: Sequence[str]) -> int:
     """Launch the UI with arguments."""
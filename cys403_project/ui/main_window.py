@@ -3,6 +3,8 @@
 import logging
 from collections.abc import Sequence
 from gettext import gettext as _
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar
 
 import gi
 
@@ -11,25 +13,39 @@ from cys403_project.__about__ import (
     APP_AUTHOR,
     APP_DEVELOPERS_LIST,
     APP_ID,
+    APP_NAME,
     APP_VERSION,
     BUG_REPORT_URL,
     BUILD_PROFILE,
     PROJECT_HOME_PAGE_URL,
 )
 
-from .image_page import ImagePage
-from .rsa_page import RsaPage
+from .key_pool import KeyPool
+from .key_pool import enabled as key_pool_enabled
+from .worker_pool import WorkerPool
+
+# Pages are imported when first shown, with their dependencies (like Pillow and
+# NumPy for the image page).
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .image_page import ImagePage
+    from .rsa_page import RsaPage
 
 gi.require_version("Adw", "1")
 gi.require_version("Gtk", "4.0")
 from gi.repository import (  # noqa: E402
     Adw,
     Gio,
+    GLib,
+    GObject,
     Gtk,
 )
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class Cys403ProjectMainWindow(Adw.ApplicationWindow):
     """Main window."""
@@ -42,6 +58,18 @@ class Cys403ProjectMainWindow(Adw.ApplicationWindow):
         )
         self.set_size_request(500, 800)
 
+        # Shared by all pages, so concurrent operations are capped by its size.
+        self.worker_pool = WorkerPool()
+
+        # Keys of the common sizes are generated ahead of time, once the UI is up.
+        # Cached keys are still used when the background generation is off.
+        self.key_pool = KeyPool(
+            cache_path=Path(GLib.get_user_cache_dir()) / APP_NAME / "rsa_keys.json"
+        )
+        if key_pool_enabled():
+            GLib.idle_add(self.key_pool.start)
+        self.connect("close-request", self._on_close_request)
+
         if BUILD_PROFILE == "development":
             self.add_css_class("devel")
 
@@ -56,15 +84,21 @@ class Cys403ProjectMainWindow(Adw.ApplicationWindow):
         # View stack
         view_stack = Adw.ViewStack()
         view_switcher.set_stack(view_stack)
+        self._view_stack = view_stack
 
-        self._rsa_page = RsaPage(self)
-        self._image_page = ImagePage(self)
+        # Pages are built when first shown, until then the stack holds empty bins
+        self._rsa_page: Optional[RsaPage] = None
+        self._image_page: Optional[ImagePage] = None
+        self._rsa_bin = Adw.Bin()
+        self._image_bin = Adw.Bin()
+        self._rsa_bin.connect("map", self._on_page_bin_map)
+        self._image_bin.connect("map", self._on_page_bin_map)
 
         view_stack.add_titled_with_icon(
-            self._rsa_page, "rsa", _("RSA"), "network-wireless-encrypted-symbolic"
+            self._rsa_bin, "rsa", _("RSA"), "network-wireless-encrypted-symbolic"
         )
         view_stack.add_titled_with_icon(
-            self._image_page,
+            self._image_bin,
             "image",
             _("Image"),
             "image-x-generic-symbolic",
@@ -90,9 +124,44 @@ class Cys403ProjectMainWindow(Adw.ApplicationWindow):
             condition=Adw.breakpoint_condition_parse("max-width: 700px")
         )
         self.add_breakpoint(break_point)
+        # Pages follow the toggle button, as they may not be built yet
         break_point.add_setter(self._sidebar_toggle_button, "visible", value=True)
-        break_point.add_setter(self._rsa_page.split_view, "collapsed", value=True)
-        break_point.add_setter(self._image_page.split_view, "collapsed", value=True)
+
+    def _on_page_bin_map(self, page_bin: Adw.Bin) -> None:
+        """Build a page when it's first shown."""
+        if page_bin is self._rsa_bin:
+            self._get_rsa_page()
+        else:
+            self._get_image_page()
+
+    def _get_rsa_page(self) -> "RsaPage":
+        """Get the RSA page, building it on first use."""
+        if self._rsa_page is None:
+            from .rsa_page import RsaPage
+
+            self._rsa_page = RsaPage(self)
+            self._add_page(self._rsa_bin, self._rsa_page.split_view, self._rsa_page)
+        return self._rsa_page
+
+    def _get_image_page(self) -> "ImagePage":
+        """Get the image page, building it on first use."""
+        if self._image_page is None:
+            from .image_page import ImagePage
+
+            self._image_page = ImagePage(self)
+            self._add_page(
+                self._image_bin, self._image_page.split_view, self._image_page
+            )
+        return self._image_page
+
+    def _add_page(
+        self, page_bin: Adw.Bin, split_view: Adw.OverlaySplitView, page: Gtk.Widget
+    ) -> None:
+        """Put a built page in its place, collapsing it with the window."""
+        self._sidebar_toggle_button.bind_property(
+            "visible", split_view, "collapsed", GObject.BindingFlags.SYNC_CREATE
+        )
+        page_bin.set_child(page)
 
     def __build_header(self) -> Adw.HeaderBar:
         """Create the header bar for the application."""
@@ -115,16 +184,63 @@ class Cys403ProjectMainWindow(Adw.ApplicationWindow):
 
     def _on_sidebar_toggle_button_toggled(self, button: Gtk.ToggleButton) -> None:
         """Hnalde sidebar button toggled."""
-        self._rsa_page.split_view.set_show_sidebar(button.props.active)
-        self._image_page.split_view.set_show_sidebar(button.props.active)
+        for page in (self._rsa_page, self._image_page):
+            if page is not None:
+                page.split_view.set_show_sidebar(button.props.active)
+
+    def submit_job(
+        self,
+        callback: "Callable[[Future[T]], None]",
+        function: Callable[..., T],
+        *args: object,
+    ) -> None:
+        """
+        Run a job in the worker pool and deliver its result to the main loop.
+
+        Args:
+            callback: Called from the main loop with the finished future.
+            function: Module level function to run in a worker.
+            *args: Picklable arguments of the function.
+
+        """
+
+        def on_done(future: "Future[T]") -> None:
+            # Runs in the pool's management thread, hand over to the main loop.
+            if not future.cancelled():
+                GLib.idle_add(callback, future)
+
+        self.worker_pool.submit(function, *args).add_done_callback(on_done)
+
+    def _on_close_request(self, _window: Adw.ApplicationWindow) -> bool:
+        """Stop the worker pool when the window is closed."""
+        self.worker_pool.shutdown()
+        self.key_pool.shutdown()
+        if self._image_page is not None:
+            self._image_page.release_buffers()
+        return False
 
     def open_files(self, files: Sequence[Gio.File]) -> None:
         """
         Open files.
 
-        Used to pass input from the CLI.
+        Used to pass input from the CLI, the first file is opened as the input
+        image. Batch processing is done headless by the cli module instead.
+        """
+        if files:
+            self._view_stack.set_visible_child_name("image")
+            self._get_image_page().open_image(files[0])
+
+    def report_job_error(self, error: BaseException, msg: str) -> None:
+        """
+        Log the error of a failed worker job, and show a message about it.
+
+        Args:
+            error: Exception raised by the job.
+            msg: Message shown to the user.
+
         """
-        # TODO: Implement opening files from CLI.
+        logger.error("Worker job failed", exc_info=error)
+        self.show_error(msg)
 
     def show_error(self, msg: str) -> None:
         """Display an error toast."""
@@ -163,6 +279,7 @@ class Cys403ProjectMainWindow(Adw.ApplicationWindow):
                 "PyGobject https://gitlab.gnome.org/GNOME/pygobject",
                 "pycryptodome https://www.pycryptodome.org/",
                 "Pillow https://python-pillow.github.io/",
+                "NumPy https://numpy.org/",
             ],
         )
 
@@ -1,28 +1,32 @@
 """RSA encryption page."""
 
 import binascii
-import multiprocessing
+import os
 from base64 import b64decode, b64encode
 from gettext import gettext as _
 from typing import TYPE_CHECKING, Optional
 
 import gi
 
+from cys403_project.crypto.primes import SearchCancelledError
 from cys403_project.crypto.rsa import (
+    IntegrityError,
     MessageTooLongError,
     NonPrimeExponentError,
     PadError,
     RSAEncryptor,
 )
+from cys403_project.ui.worker_pool import generate_rsa_key
 
 if TYPE_CHECKING:
+    from concurrent.futures import Future
+
     from cys403_project.ui.main_window import Cys403ProjectMainWindow
 
 gi.require_version("Adw", "1")
 gi.require_version("Gtk", "4.0")
 from gi.repository import (  # noqa: E402
     Adw,
-    GLib,
     Gtk,
 )
 
@@ -199,21 +203,55 @@ class RsaPage(Adw.Bin):
         def on_generate_button_clicked(_button: Gtk.Button) -> None:
             """Key generation handler."""
             options_dialog.close()
-            self.set_keygen_loading(True)
 
-            process = KeyGen(
-                self,
-                key_size=options_dialog.get_modulo_size(),
-                key_public_exponent=options_dialog.get_public_exponent(),
-            )
-            process.start()
+            size = options_dialog.get_modulo_size()
+            e = options_dialog.get_public_exponent()
 
-            GLib.timeout_add(100, process.check_for_result)
+            # A pre-generated key is shown at once
+            key = self._window.key_pool.take(size, e)
+            if key is not None:
+                self.set_key(key)
+                return
+
+            self.set_keygen_loading(True)
+            # The user waits on this key, so its search uses every CPU, from
+            # processes started by the worker. Pre-generated keys use one.
+            self._window.submit_job(
+                self._on_keygen_result,
+                generate_rsa_key,
+                size,
+                e,
+                os.cpu_count() or 1,
+            )
 
         options_dialog.generate_button.connect("clicked", on_generate_button_clicked)
 
         options_dialog.present(self._window)
 
+    def _on_keygen_result(
+        self, future: "Future[tuple[tuple[bytes, bytes], tuple[bytes, ...]]]"
+    ) -> None:
+        """Show the key generation job result."""
+        error = future.exception()
+        if isinstance(error, SearchCancelledError):
+            # The window is being closed.
+            return
+
+        if error is None:
+            self.set_key(future.result())
+        elif isinstance(error, NonPrimeExponentError):
+            self._window.show_error(
+                _("Public exponent is not prime number, failed to generate a key.")
+            )
+        elif isinstance(error, ValueError):
+            self._window.show_error(
+                _("Modulo size is too small, failed to generate a key.")
+            )
+        else:
+            self._window.report_job_error(error, _("Failed to generate a key."))
+
+        self.set_keygen_loading(False)
+
     def set_keygen_loading(self, value: bool) -> None:  # noqa: FBT001
         """Disable or enable key gen button and show spinners in sidebar."""
         self._key_gen_button.set_sensitive(not value)
@@ -227,7 +265,7 @@ class RsaPage(Adw.Bin):
             self._public_exponent_scrollable.set_child(self._public_exponent)
             self._private_exponent_scrollable.set_child(self._private_exponent)
 
-    def set_key(self, key: tuple[tuple[bytes, bytes], tuple[bytes, bytes]]) -> None:
+    def set_key(self, key: tuple[tuple[bytes, bytes], tuple[bytes, ...]]) -> None:
         """Set the key in the ui."""
         self._public_exponent.get_buffer().set_text(
             b64encode(key[0][0]).decode("ascii")
@@ -310,7 +348,11 @@ class RsaPage(Adw.Bin):
             pt = buf.get_text(start_iter, end_iter, include_hidden_chars=False).encode()
 
             try:
-                ct = encryptor.encrypt(pt)
+                # Long messages are encrypted with a session key instead
+                if len(pt) > encryptor.max_message_size:
+                    ct = encryptor.encrypt_hybrid(pt)
+                else:
+                    ct = encryptor.encrypt(pt)
 
                 self._output_text.get_buffer().set_text(b64encode(ct).decode("ascii"))
             except MessageTooLongError as e:
@@ -338,7 +380,11 @@ class RsaPage(Adw.Bin):
                 )
 
                 try:
-                    pt = encryptor.decrypt(ct)
+                    # Hybrid encryption output is longer than one RSA block
+                    if len(ct) > encryptor.block_size:
+                        pt = encryptor.decrypt_hybrid(ct)
+                    else:
+                        pt = encryptor.decrypt(ct)
 
                     try:
                         self._output_text.get_buffer().set_text(pt.decode("utf-8"))
@@ -350,6 +396,10 @@ class RsaPage(Adw.Bin):
                     self._window.show_error(
                         _("Invalid padding in decrypted message, failed to decrypt.")
                     )
+                except IntegrityError:
+                    self._window.show_error(
+                        _("Message was modified or key is wrong, failed to decrypt.")
+                    )
             except binascii.Error:
                 self._window.show_error(
                     _("Cipher text input contain invalid base64 text.")
@@ -359,43 +409,3 @@ class RsaPage(Adw.Bin):
     def window(self) -> "Cys403ProjectMainWindow":
         """Get the parent window."""
         return self._window
-
-
-class KeyGen(multiprocessing.Process):
-    """Key generation process."""
-
-    def __init__(self, page: RsaPage, key_size: int, key_public_exponent: int) -> None:
-        """Initialize the process."""
-        super().__init__(daemon=True)
-        self.page = page
-        self.key_size = key_size
-        self.public_exponent = key_public_exponent
-
-        self.parent_conn, self.child_conn = multiprocessing.Pipe()
-
-    def run(self) -> None:
-        """CPU intensive task."""
-        try:
-            key = RSAEncryptor.keygen(self.key_size, self.public_exponent)
-            self.child_conn.send(key)
-        except NonPrimeExponentError:
-            self.child_conn.send(None)
-        finally:
-            self.child_conn.close()
-
-    def check_for_result(self) -> bool:
-        """Check for results and finalize process."""
-        if self.parent_conn.poll():
-            key = self.parent_conn.recv()
-            if key:
-                self.page.set_key(key)
-            else:
-                self.page.window.show_error(
-                    _("Public exponent is not prime number, failed to generate a key.")
-                )
-
-            self.page.set_keygen_loading(False)
-
-            self.join()
-            return False
-        return True
@@ -0,0 +1,282 @@
+"""
+Long-lived worker pool for the CPU intensive tasks of the UI.
+
+The jobs defined here are plain module level functions that take and return
+only picklable data, so submitting one to the pool never pickles any widget.
+
+This module must not import GTK, since it is imported in the worker processes.
+The crypto modules and multiprocessing are only imported when a job is run, or
+the pool is first used, so importing it doesn't slow down the UI startup.
+"""
+
+import mmap
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional, TypeVar, Union
+
+from cys403_project import tracing
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+    from multiprocessing.synchronize import Event
+
+    from cys403_project.crypto.imgenc import BlockMode
+
+T = TypeVar("T")
+
+
+class SharedBufferHandle(NamedTuple):
+    """Descriptor of a buffer in a shared memory segment."""
+
+    name: str
+    size: int
+
+
+class FileBufferHandle(NamedTuple):
+    """Descriptor of a read only buffer in a file."""
+
+    path: str
+    offset: int
+    size: int
+
+
+BufferHandle = Union[SharedBufferHandle, FileBufferHandle]
+
+
+class SharedBuffer:
+    """
+    Buffer in a shared memory segment, owned by the UI process.
+
+    Only its handle is sent to the workers, which attach to the same memory, so
+    the buffer is never pickled or copied between processes.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Create the shared memory segment.
+
+        Args:
+            size: Size of the buffer in bytes.
+
+        """
+        from multiprocessing.shared_memory import SharedMemory
+
+        self._shm = SharedMemory(create=True, size=max(size, 1))
+        self._size = size
+
+        if self._shm.buf is None:
+            msg = "Shared memory segment is closed."
+            raise ValueError(msg)
+        self._view: memoryview = self._shm.buf[:size]
+
+    @property
+    def handle(self) -> SharedBufferHandle:
+        """Get the descriptor to pass to the workers."""
+        return SharedBufferHandle(self._shm.name, self._size)
+
+    @property
+    def buf(self) -> memoryview:
+        """Get a view of the buffer."""
+        return self._view
+
+    def close(self) -> None:
+        """
+        Remove the shared memory segment.
+
+        All views derived from the buffer must be released before.
+        """
+        self._view.release()
+        self._shm.close()
+        self._shm.unlink()
+
+
+@contextmanager
+def _attach(handle: BufferHandle) -> Iterator[memoryview]:
+    """Attach to a buffer from a worker."""
+    if isinstance(handle, FileBufferHandle):
+        with (
+            Path(handle.path).open("rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping,
+            memoryview(mapping) as view,
+            view[handle.offset : handle.offset + handle.size] as buffer,
+        ):
+            yield buffer
+    else:
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(name=handle.name)
+        try:
+            if shm.buf is None:
+                msg = "Shared memory segment is closed."
+                raise ValueError(msg)
+            with shm.buf[: handle.size] as buffer:
+                yield buffer
+        finally:
+            shm.close()
+
+
+def encrypt_image(
+    key: bytes, mode: "BlockMode", image: BufferHandle, output: SharedBufferHandle
+) -> int:
+    """
+    Encrypt a raw image into a shared buffer (job).
+
+    Args:
+        key: Symmetric key.
+        mode: Cipher block mode.
+        image: Raw image buffer.
+        output: Buffer of at least ImageEncryptor.encrypted_size() bytes.
+
+    Returns:
+        Size of the encrypted image.
+
+    """
+    from cys403_project.crypto.imgenc import ImageEncryptor
+
+    with (
+        tracing.span("worker.encrypt_image", image.size, mode=mode.name),
+        _attach(image) as source,
+        _attach(output) as destination,
+    ):
+        return ImageEncryptor(key=key, mode=mode).encrypt_into(source, destination)
+
+
+def decrypt_image(
+    key: bytes,
+    mode: "BlockMode",
+    encrypted_image: BufferHandle,
+    output: SharedBufferHandle,
+) -> int:
+    """
+    Decrypt an encrypted image into a shared buffer (job).
+
+    Args:
+        key: Symmetric key.
+        mode: Cipher block mode.
+        encrypted_image: Encrypted image buffer.
+        output: Buffer of at least the encrypted image size without the IV.
+
+    Returns:
+        Size of the raw image.
+
+    """
+    from cys403_project.crypto.imgenc import ImageEncryptor
+
+    with (
+        tracing.span("worker.decrypt_image", encrypted_image.size, mode=mode.name),
+        _attach(encrypted_image) as source,
+        _attach(output) as destination,
+    ):
+        return ImageEncryptor(key=key, mode=mode).decrypt_into(source, destination)
+
+
+# Event set when the pool of the current worker process is shut down.
+_worker_cancel: "Optional[Event]" = None
+
+
+def _init_worker(cancel: "Event") -> None:
+    """Keep the shutdown event of the pool."""
+    global _worker_cancel  # noqa: PLW0603
+    _worker_cancel = cancel
+
+
+def generate_rsa_key(
+    size: int, e: int, workers: int = 1
+) -> tuple[tuple[bytes, bytes], tuple[bytes, ...]]:
+    """
+    Generate an RSA key pair (job).
+
+    The generation stops when the pool is shut down.
+
+    Args:
+        size: Size of the modulo in bits.
+        e: Public exponent.
+        workers: Number of processes searching the primes, started by the
+            worker itself. 1 searches in the worker.
+
+    Returns:
+        Public and private keys.
+
+    """
+    from cys403_project.crypto.rsa import RSAEncryptor
+
+    return RSAEncryptor.keygen(size, e, workers=workers, cancel=_worker_cancel)
+
+
+class WorkerPool:
+    """
+    Process pool shared by all pages of a window.
+
+    The worker processes are started on the first submitted job, and then
+    reused for all following jobs until the pool is shut down. When a worker
+    dies, which breaks the whole pool, new workers are started for the next job.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Maximum number of concurrent jobs, defaults to the
+                number of CPUs.
+
+        """
+        self._max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cancel: Optional[Event] = None
+
+    def submit(self, function: Callable[..., T], *args: object) -> "Future[T]":
+        """
+        Submit a job to the pool.
+
+        Args:
+            function: Module level function to run in a worker.
+            *args: Picklable arguments of the function.
+
+        Returns:
+            Future of the job result.
+
+        """
+        from concurrent.futures.process import BrokenProcessPool
+
+        try:
+            return self._start().submit(function, *args)
+        except BrokenProcessPool:
+            # A worker was killed (out of memory for example), the jobs it
+            # broke already failed with the same error
+            self._stop(cancel=False)
+            return self._start().submit(function, *args)
+
+    def _start(self) -> "ProcessPoolExecutor":
+        """Get the executor, starting it if needed."""
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking a multi-threaded GTK process is unsafe, spawn fresh workers.
+            context = multiprocessing.get_context("spawn")
+            self._cancel = context.Event()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self._cancel,),
+            )
+
+        return self._executor
+
+    def _stop(self, *, cancel: bool) -> None:
+        """Stop the executor, and cancel the running jobs if asked."""
+        if self._cancel is not None:
+            # Long running jobs check it to stop early
+            if cancel:
+                self._cancel.set()
+            self._cancel = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self) -> None:
+        """Cancel pending jobs and stop the workers."""
+        self._stop(cancel=True)
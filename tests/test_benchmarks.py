@@ -0,0 +1,151 @@
+"""Tests for the benchmarks."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from benchmarks.compare import compare
+from benchmarks.compare import main as compare_main
+from benchmarks.crypto import format_size, image_cases, main, parse_size
+from benchmarks.measure import measure
+from cys403_project.crypto.imgenc import BlockMode
+
+
+def test_sizes() -> None:
+    """Parses and formats sizes with unit suffixes."""
+    assert parse_size("1K") == 1024
+    assert parse_size("256mb") == 256 << 20
+    assert parse_size("100") == 100
+    assert format_size(1 << 28) == "256M"
+    assert format_size(1536) == "1536"
+
+
+def test_measure() -> None:
+    """Measures run times, throughput and allocated memory."""
+    result = measure(
+        "case", lambda: bytearray(1 << 20), repeat=4, size=1 << 20, params={"a": 1}
+    )
+
+    assert len(result.times) == 4
+    assert result.percentile(0) == min(result.times)
+    assert result.percentile(100) == max(result.times)
+    assert result.peak_memory >= 1 << 20
+    assert result.throughput is not None
+    assert result.to_json()["params"] == {"a": 1}
+
+
+def test_crypto_benchmark_json(tmp_path: Path) -> None:
+    """Writes the results of every case as JSON."""
+    output = tmp_path / "run.json"
+    main(
+        [
+            *("--image-sizes", "1K", "64K", "--key-sizes", "16", "--rsa-sizes", "1024"),
+            *("--repeat", "2", "--keygen-repeat", "1", "--workers", "1"),
+            *("--output", str(output)),
+        ]
+    )
+
+    run = json.loads(output.read_text())
+    names = [result["name"] for result in run["results"]]
+
+    assert run["version"] == 1
+    assert "image.encrypt.cbc.k16.64K" in names
+    assert "image.decrypt.ctr.k16.1K" in names
+    assert "rsa.decrypt_crt.1024" in names
+    assert all(result["p50"] <= result["p99"] for result in run["results"])
+
+
+def make_run(**cases: tuple[float, int]) -> dict[str, Any]:
+    """Make benchmark results with the best time and peak memory of cases."""
+    return {
+        "results": [
+            {
+                "name": name,
+                "params": {"operation": name.split(".")[1]},
+                "size": 1000,
+                "min": best,
+                "peak_memory": peak_memory,
+            }
+            for name, (best, peak_memory) in cases.items()
+        ]
+    }
+
+
+def test_image_cases_empty() -> None:
+    """Runs no case when there is no key size or mode to measure."""
+    assert list(image_cases([1000], [], list(BlockMode), 1, 1.0)) == []
+    assert list(image_cases([1000], [16], [], 1, 1.0)) == []
+
+
+def test_compare() -> None:
+    """Flags slowdowns and memory growth above the thresholds."""
+    baseline = make_run(
+        **{
+            "image.encrypt": (1.0, 1 << 20),
+            "image.decrypt": (1.0, 1 << 20),
+            "rsa.encrypt": (1.0, 1000),
+            "rsa.keygen": (1.0, 1000),
+            "rsa.decrypt": (1.0, 1000),
+        }
+    )
+    run = make_run(
+        **{
+            "image.encrypt": (1.1, 1 << 21),
+            "image.decrypt": (2.0, 1 << 20),
+            "rsa.encrypt": (0.5, 2000),
+            "rsa.keygen": (1.5, 1000),
+        }
+    )
+
+    comparisons, missing = compare(
+        baseline, run, threshold=0.2, memory_threshold=0.2, memory_slack=10000
+    )
+    regressed = {c.name for c in comparisons if c.regressed}
+
+    assert missing == ["rsa.decrypt"]
+    # Memory doubled, and time doubled
+    assert regressed == {"image.encrypt", "image.decrypt"}
+    assert comparisons[1].slowdown == pytest.approx(1.0)
+    assert comparisons[2].slowdown == pytest.approx(-0.5)
+
+    comparisons, _ = compare(
+        baseline,
+        run,
+        threshold=0.2,
+        memory_threshold=0.2,
+        keygen_threshold=0.4,
+        ignore=["image.*"],
+    )
+    # The memory growth of rsa.encrypt is within the default slack
+    assert {c.name for c in comparisons if c.regressed} == {"rsa.keygen"}
+
+
+def test_compare_exit_status(tmp_path: Path) -> None:
+    """Exits with 1 when a case regressed."""
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(make_run(**{"image.encrypt": (1.0, 1000)})))
+    run = tmp_path / "run.json"
+
+    run.write_text(json.dumps(make_run(**{"image.encrypt": (1.1, 1000)})))
+    assert compare_main(["--baseline", str(baseline), "--run", str(run)]) == 0
+
+    run.write_text(json.dumps(make_run(**{"image.encrypt": (1.5, 1000)})))
+    assert compare_main(["--baseline", str(baseline), "--run", str(run)]) == 1
+
+
+def test_compare_missing_cases(tmp_path: Path) -> None:
+    """Exits with 1 when a baseline case is missing, unless it's allowed."""
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(
+        json.dumps(
+            make_run(**{"image.encrypt": (1.0, 1000), "image.decrypt": (1.0, 1000)})
+        )
+    )
+    run = tmp_path / "run.json"
+    run.write_text(json.dumps(make_run(**{"image.encrypt": (1.0, 1000)})))
+
+    args = ["--baseline", str(baseline), "--run", str(run)]
+    assert compare_main(args) == 1
+    assert compare_main([*args, "--allow-missing"]) == 0
@@ -0,0 +1,129 @@
+"""Tests for cipher_image.py."""
+
+from pathlib import Path
+
+import pytest
+
+from cys403_project.crypto.cipher_image import (
+    MAGIC,
+    CipherImage,
+    CipherImageError,
+    MappedCipherImage,
+)
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+
+
+def encrypted_image(
+    mode: BlockMode = BlockMode.CBC, width: int = 4, height: int = 3
+) -> tuple[ImageEncryptor, bytes, bytes]:
+    """Encrypt a random RGB image."""
+    img = ImageEncryptor(ImageEncryptor.keygen(), mode=mode)
+    original_image = ImageEncryptor.keygen(width * height * 3)
+    return img, original_image, img.encrypt(original_image)
+
+
+@pytest.mark.parametrize("mode", list(BlockMode))
+def test_write_read(tmp_path: Path, mode: BlockMode) -> None:
+    """A cipher image is read back the same as it was written."""
+    path = tmp_path / "image.cipher_image"
+    img, original_image, data = encrypted_image(mode)
+    CipherImage(4, 3, data, img.blocksize, mode).write_to_file(path, chunk_size=10)
+
+    assert path.read_bytes().startswith(MAGIC)
+
+    cm = CipherImage.read_from_file(path)
+    assert cm.get_size() == (4, 3)
+    assert cm.mode == mode
+    assert cm.block_size == img.blocksize
+    assert cm.data == data
+    assert cm.corrupted_chunks() == []
+    assert img.decrypt(cm.data) == original_image
+
+
+@pytest.mark.parametrize("header", [b"4\n3\n", b"ctr\n4\n3\n"])
+def test_read_legacy_file(tmp_path: Path, header: bytes) -> None:
+    """Files in the ASCII format are still readable."""
+    path = tmp_path / "image.cipher_image"
+    path.write_bytes(header + b"data")
+
+    cm = CipherImage.read_from_file(path)
+    assert cm.get_size() == (4, 3)
+    assert cm.block_size is None
+    assert cm.data == b"data"
+
+    with MappedCipherImage.open(path) as mapped:
+        assert mapped.version == 0
+        assert mapped.get_size() == (4, 3)
+        assert mapped.mode == cm.mode
+        assert mapped.data == b"data"
+
+
+def test_reject_invalid_files(tmp_path: Path) -> None:
+    """Invalid headers and truncated data are rejected without decrypting."""
+    path = tmp_path / "image.cipher_image"
+    img, _original_image, data = encrypted_image()
+
+    path.write_bytes(b"not an image")
+    with pytest.raises(CipherImageError, match="Not a cipher image file"):
+        CipherImage.read_from_file(path)
+
+    path.write_bytes(b"")
+    with pytest.raises(CipherImageError, match="Empty cipher image file"):
+        MappedCipherImage.open(path)
+
+    path.write_bytes(MAGIC + b"\x00")
+    with pytest.raises(CipherImageError, match="Truncated cipher image header"):
+        MappedCipherImage.open(path).get_size()
+
+    CipherImage(4, 3, data, img.blocksize).write_to_file(path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(CipherImageError, match="Truncated cipher image data"):
+        CipherImage.read_from_file(path)
+
+    CipherImage(6, 3, data, img.blocksize).write_to_file(path)
+    with pytest.raises(CipherImageError, match="doesn't match its dimensions"):
+        MappedCipherImage.open(path).get_size()
+
+    # The channels byte follows the magic, version, width and height
+    CipherImage(4, 3, data, img.blocksize).write_to_file(path)
+    header = bytearray(path.read_bytes())
+    header[len(MAGIC) + 10] = 4
+    path.write_bytes(header)
+    with pytest.raises(ValueError, match="Unsupported number of channels 4"):
+        MappedCipherImage.open(path).get_size()
+
+
+def test_corrupted_chunks(tmp_path: Path) -> None:
+    """Checksums find the chunks that were modified."""
+    path = tmp_path / "image.cipher_image"
+    img, _original_image, data = encrypted_image(width=10, height=10)
+    CipherImage(10, 10, data, img.blocksize).write_to_file(path, chunk_size=64)
+
+    corrupted = bytearray(path.read_bytes())
+    corrupted[-100] ^= 0xFF
+    path.write_bytes(corrupted)
+
+    with MappedCipherImage.open(path) as mapped:
+        chunk_index = (len(data) - 100) // 64
+        assert mapped.chunk_count == -(-len(data) // 64)
+        assert mapped.corrupted_chunks(workers=2) == [chunk_index]
+        assert mapped.chunk(chunk_index) != data[chunk_index * 64 :][:64]
+
+
+def test_mapped_encrypt_decrypt(tmp_path: Path) -> None:
+    """Encryption is written into a mapped file and decrypted from it."""
+    path = tmp_path / "image.cipher_image"
+    img = ImageEncryptor(ImageEncryptor.keygen())
+    original_image = b"A" * (4 * 3 * 3)
+
+    with MappedCipherImage.create(path, 4, 3, img.blocksize, chunk_size=16) as cm:
+        img.encrypt_into(original_image, cm.data)
+
+    cipher_image = CipherImage.read_from_file(path)
+    assert cipher_image.corrupted_chunks() == []
+    assert img.decrypt(cipher_image.data) == original_image
+
+    with MappedCipherImage.open(path) as mapped:
+        assert mapped.get_size() == (4, 3)
+        assert mapped.block_size == img.blocksize
+        assert img.decrypt(mapped.data) == original_image
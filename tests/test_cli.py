@@ -0,0 +1,164 @@
+"""Tests for cli.py."""
+
+import random
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from cys403_project.cli import (
+    _decrypt_image_file,
+    _encrypt_image_file,
+    main_cli,
+    read_key_file,
+)
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+
+
+def run(*args: object) -> int:
+    """Run the CLI with the given arguments."""
+    return main_cli([str(arg) for arg in args])
+
+
+def make_images(directory: Path, count: int) -> list[bytes]:
+    """Write random RGB images to a directory."""
+    directory.mkdir()
+    images = []
+    for i in range(count):
+        data = random.randbytes(17 * 11 * 3)
+        Image.frombytes("RGB", (17, 11), data).save(directory / f"{i}.png")
+        images.append(data)
+    return images
+
+
+@pytest.mark.parametrize("mode", ["cbc", "ctr"])
+def test_cli_image_round_trip(tmp_path: Path, mode: str) -> None:
+    """Encrypts and decrypts a directory of images."""
+    images = make_images(tmp_path / "in", 3)
+    (tmp_path / "in" / "notes.txt").write_text("Not an image")
+    key = tmp_path / "image.key"
+
+    assert run("image", "keygen", "-o", key) == 0
+    assert key.stat().st_mode & 0o077 == 0
+    assert len(read_key_file(key)[0]) == 16
+
+    src, enc = tmp_path / "in", tmp_path / "enc"
+    assert run("image", "encrypt", "-k", key, "-m", mode, "-j", 2, src, "-o", enc) == 0
+    assert sorted(p.name for p in enc.iterdir()) == [
+        f"{i}.cipher_image" for i in range(3)
+    ]
+
+    dec = tmp_path / "dec"
+    assert run("image", "decrypt", "-k", key, "-j", 2, enc, "-o", dec) == 0
+    for i, data in enumerate(images):
+        assert Image.open(dec / f"{i}.png").tobytes() == data
+
+
+def test_cli_rsa_round_trip(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Encrypts and decrypts files with RSA key files, and reports throughput."""
+    (tmp_path / "in").mkdir()
+    files = {f"{i}.bin": random.randbytes(i * 1000) for i in range(3)}
+    for name, data in files.items():
+        (tmp_path / "in" / name).write_bytes(data)
+    key, public_key = tmp_path / "rsa_key", tmp_path / "rsa_key.pub"
+
+    assert run("rsa", "keygen", "-s", 1024, "-j", 1, "-o", key) == 0
+    assert len(read_key_file(public_key)) == 2
+    assert key.stat().st_mode & 0o077 == 0
+
+    enc = tmp_path / "enc"
+    assert run("rsa", "encrypt", "-k", public_key, tmp_path / "in", "-o", enc) == 0
+    assert "MB/s" in capsys.readouterr().out
+
+    dec = tmp_path / "dec"
+    assert run("rsa", "decrypt", "-k", key, enc, "-o", dec) == 0
+    for name, data in files.items():
+        assert (dec / name).read_bytes() == data
+
+    # The public key can't decrypt
+    assert run("rsa", "decrypt", "-k", public_key, enc, "-o", dec) == 1
+
+
+def test_cli_errors(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """Reports invalid keys and inputs, with a non-zero exit status."""
+    make_images(tmp_path / "in", 1)
+    key = tmp_path / "image.key"
+
+    key.write_text("not base64!")
+    assert run("image", "encrypt", "-k", key, tmp_path / "in", "-o", tmp_path) == 1
+    assert "key file" in capsys.readouterr().err
+
+    # Plain images are not cipher images
+    run("image", "keygen", "-o", key)
+    assert run("image", "decrypt", "-k", key, tmp_path / "in", "-o", tmp_path) == 1
+    assert (
+        run("image", "decrypt", "-k", key, tmp_path / "in" / "0.png", "-o", tmp_path)
+        == 1
+    )
+    assert "0.png" in capsys.readouterr().err
+
+
+def test_cli_corrupted_cipher_image(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Refuses to decrypt cipher images that fail their checksums."""
+    make_images(tmp_path / "in", 1)
+    key, enc, dec = tmp_path / "image.key", tmp_path / "enc", tmp_path / "dec"
+    run("image", "keygen", "-o", key)
+    assert run("image", "encrypt", "-k", key, tmp_path / "in", "-o", enc) == 0
+
+    path = enc / "0.cipher_image"
+    corrupted = bytearray(path.read_bytes())
+    corrupted[-1] ^= 0xFF
+    path.write_bytes(corrupted)
+
+    assert run("image", "decrypt", "-k", key, path, "-o", dec) == 1
+    assert "Corrupted cipher image" in capsys.readouterr().err
+    assert not (dec / "0.png").exists()
+
+
+def test_cli_output_collisions(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Refuses inputs written to the same output file, before writing anything."""
+    make_images(tmp_path / "in", 1)
+    Image.new("RGB", (3, 2)).save(tmp_path / "in" / "0.jpg")
+    key, enc = tmp_path / "image.key", tmp_path / "enc"
+    run("image", "keygen", "-o", key)
+
+    assert run("image", "encrypt", "-k", key, tmp_path / "in", "-o", enc) == 1
+    assert "0.cipher_image" in capsys.readouterr().err
+    assert not enc.exists()
+
+    # The same file given twice is encrypted once
+    image = tmp_path / "in" / "0.png"
+    assert run("image", "encrypt", "-k", key, image, image, "-o", enc) == 0
+    assert [p.name for p in enc.iterdir()] == ["0.cipher_image"]
+
+
+def test_cli_rsa_keygen_pub_output(tmp_path: Path) -> None:
+    """Appends the public key suffix, keeping a private key named .pub."""
+    key = tmp_path / "key.pub"
+
+    assert run("rsa", "keygen", "-s", 1024, "-j", 1, "-o", key) == 0
+    assert len(read_key_file(key)) > 2
+    assert len(read_key_file(tmp_path / "key.pub.pub")) == 2
+
+
+def test_cli_image_jobs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Report the plain image size, and leave no partial file when failing."""
+    make_images(tmp_path / "in", 1)
+    source, target = tmp_path / "in" / "0.png", tmp_path / "0.cipher_image"
+    key = ImageEncryptor.keygen()
+
+    size = _encrypt_image_file(key, BlockMode.CBC, str(source), str(target))
+    assert size == 17 * 11 * 3
+    assert _decrypt_image_file(key, str(target), str(tmp_path / "0.png")) == size
+
+    def fail(*_args: object) -> int:
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(ImageEncryptor, "encrypt_into", fail)
+    with pytest.raises(KeyboardInterrupt):
+        _encrypt_image_file(key, BlockMode.CBC, str(source), str(target))
+    assert not target.exists()
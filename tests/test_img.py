@@ -1,6 +1,14 @@
 """Tests for imgenc.py."""
 
-from cys403_project.crypto.imgenc import ImageEncryptor
+import mmap
+import random
+from pathlib import Path
+from secrets import token_bytes
+
+import numpy as np
+import pytest
+
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
 
 
 def test_encrypt_decrypt_perfect_blocks() -> None:
@@ -19,3 +27,241 @@ def test_encrypt_decrypt_with_padding() -> None:
     encrypted_image = img.encrypt(original_image)
     decrypted_image = img.decrypt(encrypted_image)
     assert decrypted_image == original_image
+
+
+def reference_encrypt(key: bytes, image: bytes, iv: bytes) -> bytes:
+    """Encrypt using the original per-byte CBC loop."""
+    blocksize = len(key)
+    pad_length = blocksize - (len(image) % blocksize)
+    image += bytes([pad_length] * pad_length)
+
+    encrypted_blocks = []
+    previous = iv
+    for i in range(0, len(image), blocksize):
+        xor_block = bytes(
+            a ^ b for a, b in zip(image[i : i + blocksize], previous, strict=True)
+        )
+        previous = bytes((~a & 0xFF) ^ b for a, b in zip(xor_block, key, strict=True))
+        encrypted_blocks.append(previous)
+
+    return iv + b"".join(encrypted_blocks)
+
+
+@pytest.mark.parametrize("key_size", [1, 3, 16, 33])
+@pytest.mark.parametrize("image_size", [0, 1, 15, 16, 17, 64, 1000])
+def test_encrypt_matches_reference(key_size: int, image_size: int) -> None:
+    """Encryption is byte-for-byte the same as the original implementation."""
+    key = ImageEncryptor.keygen(key_size)
+    iv = token_bytes(key_size)
+    image = token_bytes(image_size)
+
+    img = ImageEncryptor(key)
+    encrypted_image = img.encrypt(image, iv=iv)
+
+    assert encrypted_image == reference_encrypt(key, image, iv)
+    assert img.decrypt(encrypted_image) == image
+
+
+def test_decrypt_with_wrong_key_size() -> None:
+    """Decrypting with a smaller key gives an output of the wrong size."""
+    original_image = b"A" * 48
+    encrypted_image = ImageEncryptor(ImageEncryptor.keygen(16)).encrypt(original_image)
+
+    decrypted_image = ImageEncryptor(ImageEncryptor.keygen(5)).decrypt(encrypted_image)
+    assert len(decrypted_image) != len(original_image)
+
+
+def test_encrypt_matches_reference_random_inputs() -> None:
+    """The prefix XOR scan gives the same output as the sequential loop."""
+    rng = random.Random(403)
+    for _ in range(50):
+        key_size = rng.randint(1, 64)
+        key = rng.randbytes(key_size)
+        iv = rng.randbytes(key_size)
+        image = rng.randbytes(rng.randint(0, 4096))
+
+        assert ImageEncryptor(key).encrypt(image, iv=iv) == reference_encrypt(
+            key, image, iv
+        )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 16, 100, 4096])
+def test_stream_matches_whole_buffer(chunk_size: int) -> None:
+    """Chunked encryption and decryption give the same output as the whole buffer."""
+    img = ImageEncryptor(ImageEncryptor.keygen())
+    iv = token_bytes(img.blocksize)
+    image = token_bytes(1000)
+
+    encryptor = img.encryptor(iv=iv)
+    encrypted_chunks = [
+        encryptor.update(image[i : i + chunk_size])
+        for i in range(0, len(image), chunk_size)
+    ]
+    encrypted_image = b"".join(encrypted_chunks) + encryptor.finalize()
+    assert encrypted_image == img.encrypt(image, iv=iv)
+
+    decryptor = img.decryptor()
+    decrypted_chunks = [
+        decryptor.update(encrypted_image[i : i + chunk_size])
+        for i in range(0, len(encrypted_image), chunk_size)
+    ]
+    assert b"".join(decrypted_chunks) + decryptor.finalize() == image
+
+
+def test_encrypt_decrypt_file(tmp_path: Path) -> None:
+    """Encrypts and decrypts a file in small chunks."""
+    img = ImageEncryptor(ImageEncryptor.keygen())
+    original_image = token_bytes(10_000)
+    plain_path = tmp_path / "image.raw"
+    plain_path.write_bytes(original_image)
+
+    img.encrypt_file(plain_path, tmp_path / "image.enc", chunk_size=333)
+    img.decrypt_file(tmp_path / "image.enc", tmp_path / "image.dec", chunk_size=333)
+
+    assert img.decrypt((tmp_path / "image.enc").read_bytes()) == original_image
+    assert (tmp_path / "image.dec").read_bytes() == original_image
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3])
+def test_decrypt_parallel(workers: int) -> None:
+    """Parallel decryption gives the same output as the sequential one."""
+    img = ImageEncryptor(ImageEncryptor.keygen())
+    original_image = token_bytes(100_003)
+    encrypted_image = img.encrypt(original_image)
+
+    assert img.decrypt_parallel(encrypted_image, workers=workers) == original_image
+
+
+def reference_ctr_encrypt(key: bytes, image: bytes, iv: bytes) -> bytes:
+    """Encrypt in CTR mode one block at a time."""
+    blocksize = len(key)
+    counter = int.from_bytes(iv, "big")
+
+    encrypted_blocks = []
+    for i in range(0, len(image), blocksize):
+        counter_block = ((counter + i // blocksize) % (1 << (8 * blocksize))).to_bytes(
+            blocksize, "big"
+        )
+        keystream = bytes(
+            (~a & 0xFF) ^ b for a, b in zip(counter_block, key, strict=True)
+        )
+        encrypted_blocks.append(
+            bytes(
+                a ^ b for a, b in zip(image[i : i + blocksize], keystream, strict=False)
+            )
+        )
+
+    return iv + b"".join(encrypted_blocks)
+
+
+@pytest.mark.parametrize("key_size", [1, 3, 8, 9, 16, 33])
+@pytest.mark.parametrize("image_size", [0, 1, 15, 16, 17, 1000])
+def test_ctr_encrypt_decrypt(key_size: int, image_size: int) -> None:
+    """CTR mode matches a per-block implementation and decrypts back."""
+    key = ImageEncryptor.keygen(key_size)
+    image = token_bytes(image_size)
+    img = ImageEncryptor(key, mode=BlockMode.CTR)
+
+    # Counters near the wrap around of the lower 8 bytes and of the whole block
+    for iv in (token_bytes(key_size), b"\xff" * key_size):
+        encrypted_image = img.encrypt(image, iv=iv)
+        assert encrypted_image == reference_ctr_encrypt(key, image, iv)
+        assert img.decrypt(encrypted_image) == image
+
+
+@pytest.mark.parametrize("mode", list(BlockMode))
+def test_decrypt_range(mode: BlockMode) -> None:
+    """Decrypting a byte range gives the same bytes as decrypting everything."""
+    img = ImageEncryptor(ImageEncryptor.keygen(), mode=mode)
+    original_image = token_bytes(1000)
+    encrypted_image = img.encrypt(original_image)
+
+    for start, stop in ((0, 1000), (0, 1), (5, 37), (16, 32), (990, 2000), (3, 3)):
+        assert (
+            img.decrypt_range(encrypted_image, start, stop)
+            == original_image[start:stop]
+        )
+
+
+@pytest.mark.parametrize("mode", list(BlockMode))
+def test_stream_and_parallel_modes(mode: BlockMode) -> None:
+    """Chunked and parallel processing work in every block mode."""
+    img = ImageEncryptor(ImageEncryptor.keygen(), mode=mode)
+    iv = token_bytes(img.blocksize)
+    original_image = token_bytes(10_007)
+    encrypted_image = img.encrypt(original_image, iv=iv)
+
+    encryptor = img.encryptor(iv=iv)
+    assert (
+        encryptor.update(original_image[:100])
+        + encryptor.update(original_image[100:])
+        + encryptor.finalize()
+        == encrypted_image
+    )
+
+    decryptor = img.decryptor()
+    assert (
+        decryptor.update(encrypted_image[:5])
+        + decryptor.update(encrypted_image[5:])
+        + decryptor.finalize()
+        == original_image
+    )
+
+    assert img.encrypt_parallel(original_image, workers=3, iv=iv) == encrypted_image
+    assert img.decrypt_parallel(encrypted_image, workers=3) == original_image
+
+
+@pytest.mark.parametrize("mode", list(BlockMode))
+def test_parallel_buffers(mode: BlockMode) -> None:
+    """Parallel processing accepts memoryviews and mmaps, like mapped files."""
+    img = ImageEncryptor(ImageEncryptor.keygen(), mode=mode)
+    original_image = token_bytes(10_007)
+    encrypted_image = img.encrypt(original_image)
+
+    mapped = mmap.mmap(-1, len(encrypted_image))
+    mapped[:] = encrypted_image
+    try:
+        assert (
+            img.decrypt_parallel(memoryview(encrypted_image), workers=3)
+            == original_image
+        )
+        assert img.decrypt_parallel(mapped, workers=3) == original_image
+        assert (
+            img.decrypt(img.encrypt_parallel(memoryview(original_image), workers=3))
+            == original_image
+        )
+    finally:
+        mapped.close()
+
+
+@pytest.mark.parametrize("mode", list(BlockMode))
+def test_encrypt_decrypt_into_buffers(mode: BlockMode) -> None:
+    """Any buffer protocol object can be used as input and output."""
+    img = ImageEncryptor(ImageEncryptor.keygen(), mode=mode)
+    iv = token_bytes(img.blocksize)
+    original_image = token_bytes(1000)
+    expected = img.encrypt(original_image, iv=iv)
+
+    with mmap.mmap(-1, img.encrypted_size(len(original_image))) as encrypted_map:
+        written = img.encrypt_into(memoryview(original_image), encrypted_map, iv=iv)
+        assert written == len(expected)
+        assert encrypted_map[:written] == expected
+
+        out = np.zeros(len(expected), dtype=np.uint8)
+        size = img.decrypt_into(encrypted_map, out)
+        assert out[:size].tobytes() == original_image
+
+    out_array = bytearray(len(expected))
+    img.encrypt_into(np.frombuffer(original_image, dtype=np.uint8), out_array, iv=iv)
+    assert out_array == expected
+
+
+def test_into_small_output_buffer() -> None:
+    """An output buffer that can't hold the result is rejected."""
+    img = ImageEncryptor(ImageEncryptor.keygen())
+    encrypted_image = img.encrypt(b"A" * 32)
+
+    with pytest.raises(ValueError, match="Output buffer is too small"):
+        img.encrypt_into(b"A" * 32, bytearray(32))
+    with pytest.raises(ValueError, match="Output buffer is too small"):
+        img.decrypt_into(encrypted_image, bytearray(16))
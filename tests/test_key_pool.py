@@ -0,0 +1,74 @@
+"""Tests for key_pool.py."""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from cys403_project.crypto.rsa import RSAEncryptor
+from cys403_project.ui.key_pool import KEY_POOL_ENV, KeyPool, enabled
+
+
+def wait_for_keys(pool: KeyPool, size: int, e: int, count: int) -> None:
+    """Wait until the pool has some ready keys."""
+    deadline = time.monotonic() + 60
+    while pool.available(size, e) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_key_pool_refill(tmp_path: Path) -> None:
+    """Hands out ready keys, and generates new ones in their place."""
+    cache_path = tmp_path / "cache" / "keys.json"
+    pool = KeyPool([(512, 65537)], capacity=2, cache_path=cache_path)
+
+    assert pool.take(512, 65537) is None
+    assert pool.take(1024, 3) is None
+
+    pool.start()
+    try:
+        wait_for_keys(pool, 512, 65537, 2)
+
+        key = pool.take(512, 65537)
+        assert key is not None
+        public_key, private_key = key
+        rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+        assert rsa.decrypt(rsa.encrypt(b"message")) == b"message"
+
+        wait_for_keys(pool, 512, 65537, 2)
+    finally:
+        pool.shutdown()
+
+    # Only the user can read the cached keys
+    assert cache_path.stat().st_mode & 0o777 == 0o600
+
+    cached = KeyPool([(512, 65537)], capacity=2, cache_path=cache_path)
+    assert cached.available(512, 65537) == 2
+    cached_key = cached.take(512, 65537)
+    assert cached_key is not None
+    # A key is never handed out twice
+    assert cached_key[0] != public_key
+
+
+def test_key_pool_ignores_public_cache(tmp_path: Path) -> None:
+    """Doesn't use cached keys that other users may have read."""
+    cache_path = tmp_path / "keys.json"
+    pool = KeyPool([(512, 65537)], capacity=1, cache_path=cache_path)
+    pool.start()
+    try:
+        wait_for_keys(pool, 512, 65537, 1)
+    finally:
+        pool.shutdown()
+
+    cache_path.chmod(0o644)
+    assert KeyPool([(512, 65537)], cache_path=cache_path).available(512, 65537) == 0
+    assert not cache_path.exists()
+
+
+def test_key_pool_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Background generation is on unless turned off by the environment."""
+    monkeypatch.delenv(KEY_POOL_ENV, raising=False)
+    assert enabled()
+
+    monkeypatch.setenv(KEY_POOL_ENV, "0")
+    assert not enabled()
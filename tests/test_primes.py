@@ -0,0 +1,69 @@
+"""Tests for primes.py."""
+
+import multiprocessing
+
+import pytest
+from Crypto.Util.number import isPrime
+
+from cys403_project.crypto.primes import (
+    MIN_PRIME_SIZE,
+    SearchCancelledError,
+    generate_primes,
+    is_probable_prime,
+)
+from cys403_project.crypto.rsa import RSAEncryptor
+
+
+def test_is_probable_prime() -> None:
+    """Agrees with pycryptodome, including on Carmichael numbers."""
+    for n in [*range(1000), 561, 1105, 1729, 8911, 2**89 - 1, 2**127 - 1]:
+        assert is_probable_prime(n) == bool(isPrime(n)), n
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_generate_primes(workers: int) -> None:
+    """Generates distinct primes of exactly the given sizes, in order."""
+    sizes = [257, 256, 256]
+    primes = generate_primes(sizes, workers=workers)
+
+    assert len(set(primes)) == len(sizes)
+    for prime, bits in zip(primes, sizes):
+        assert prime.bit_length() == bits
+        assert isPrime(prime)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_primes_cancelled(workers: int) -> None:
+    """Stops searching as soon as the cancel event is set."""
+    cancel = multiprocessing.get_context("spawn").Event()
+    cancel.set()
+
+    with pytest.raises(SearchCancelledError):
+        generate_primes([4096, 4096], workers=workers, cancel=cancel)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_primes_coprime_exponent(workers: int) -> None:
+    """Only generates primes where p - 1 is coprime with the exponent."""
+    for _ in range(20):
+        for prime in generate_primes([8, 8, 64], workers=workers, e=3):
+            assert prime % 3 == 2
+
+
+def test_generate_primes_too_small() -> None:
+    """Rejects sizes that don't have two distinct primes."""
+    with pytest.raises(ValueError, match="Prime size must be at least"):
+        generate_primes([MIN_PRIME_SIZE - 1])
+
+
+@pytest.mark.parametrize("size", [16, 1023, 2048])
+def test_keygen_modulus_size(size: int) -> None:
+    """The modulus of generated keys has exactly the requested size."""
+    public_key, private_key = RSAEncryptor.keygen(size, crt=True)
+    n = int.from_bytes(public_key[1], "big")
+
+    assert n.bit_length() == size
+    assert (
+        int.from_bytes(private_key[2], "big") * int.from_bytes(private_key[3], "big")
+        == n
+    )
@@ -1,12 +1,21 @@
 """Tests for rsa.py."""
 
+import io
+import random
+
 import pytest
 
 from cys403_project.crypto.rsa import (
+    BLOCKS_MAGIC,
+    FrameError,
+    IntegrityError,
     MessageTooLongError,
+    NonPrimeExponentError,
     PadError,
     PrivateKeyError,
     PublicKeyError,
+    RSABlockReader,
+    RSABlockWriter,
     RSAEncryptor,
 )
 
@@ -70,3 +79,139 @@ def test_invalid_padding() -> None:
     invalid_encrypted_message = b"\x00" * 25
     with pytest.raises(PadError, match="Invalid padding in decrypted message."):
         rsa.decrypt(invalid_encrypted_message)
+
+
+def test_crt_decrypt() -> None:
+    """Test decryption with the CRT components of the private key."""
+    public_key, private_key = RSAEncryptor.keygen(crt=True)
+    assert len(private_key) == 7
+
+    message = b"Test message"
+    encrypted = RSAEncryptor(public_key=public_key).encrypt(message)
+
+    assert RSAEncryptor(private_key=private_key).decrypt(encrypted) == message
+    # Without the CRT components, the same key still decrypts.
+    assert RSAEncryptor(private_key=private_key[:2]).decrypt(encrypted) == message
+
+
+def test_set_keys_after_init() -> None:
+    """Test replacing the keys of an existing encryptor."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024)
+    rsa = RSAEncryptor()
+    rsa.public_key = public_key
+    rsa.private_key = private_key
+
+    assert rsa.decrypt(rsa.encrypt(b"Test message")) == b"Test message"
+
+    rsa.private_key = None
+    with pytest.raises(PrivateKeyError, match="Private key is not set."):
+        rsa.decrypt(b"Encrypted message")
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_encrypt_decrypt_many(workers: int) -> None:
+    """Test batch encryption and decryption, in order."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024, crt=True)
+    rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+
+    messages = [b"record %d" % i for i in range(100)]
+    encrypted = rsa.encrypt_many(messages, workers=workers, chunksize=8)
+    assert len(encrypted) == len(messages)
+    assert [rsa.decrypt(ct) for ct in encrypted] == messages
+
+    assert rsa.decrypt_many(encrypted, workers=workers, chunksize=8) == messages
+
+
+def test_encrypt_many_message_too_long() -> None:
+    """Test that batch encryption raises errors from the workers."""
+    public_key, _private_key = RSAEncryptor.keygen(size=16)
+    rsa = RSAEncryptor(public_key=public_key)
+
+    with pytest.raises(MessageTooLongError):
+        rsa.encrypt_many([b"A"] * 10 + [b"A" * 1000], workers=2, chunksize=2)
+
+
+def test_hybrid_encrypt_decrypt() -> None:
+    """Test hybrid encryption of a message longer than the modulus."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024)
+    rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+
+    message = b"A" * 10000
+    assert len(message) > rsa.max_message_size
+
+    encrypted = rsa.encrypt_hybrid(message)
+    assert len(encrypted) > rsa.block_size
+    assert rsa.decrypt_hybrid(encrypted) == message
+
+    # Any modification is detected
+    tampered = bytearray(encrypted)
+    tampered[-1] ^= 1
+    with pytest.raises(IntegrityError):
+        rsa.decrypt_hybrid(bytes(tampered))
+
+    with pytest.raises(IntegrityError, match="Encrypted data is too short."):
+        rsa.decrypt_hybrid(encrypted[: rsa.block_size])
+
+
+def test_max_message_size() -> None:
+    """Test that messages of the maximum size can be decrypted."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024)
+    rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+
+    message = b"\xff" * rsa.max_message_size
+    assert rsa.decrypt(rsa.encrypt(message)) == message
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_encrypt_decrypt_blocks(workers: int) -> None:
+    """Test multi-block encryption of messages longer than the modulus."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024, crt=True)
+    rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+
+    for size in (0, 1, rsa.max_message_size, rsa.max_message_size * 7 + 3):
+        message = random.randbytes(size)
+        encrypted = rsa.encrypt_blocks(message, workers=workers, chunksize=2)
+        assert rsa.decrypt_blocks(encrypted, workers=workers, chunksize=2) == message
+
+    with pytest.raises(FrameError, match="Truncated block."):
+        rsa.decrypt_blocks(encrypted[:-1])
+
+    with pytest.raises(FrameError, match="Not a multi-block message."):
+        rsa.decrypt_blocks(encrypted[1:])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_block_stream(workers: int) -> None:
+    """Test the streaming multi-block writer and reader."""
+    public_key, private_key = RSAEncryptor.keygen(size=1024)
+    rsa = RSAEncryptor(public_key=public_key, private_key=private_key)
+    message = random.randbytes(rsa.max_message_size * 20 + 5)
+
+    encrypted = io.BytesIO()
+    with RSABlockWriter(rsa, encrypted, workers=workers, batch_size=4) as writer:
+        for i in range(0, len(message), 37):
+            writer.write(message[i : i + 37])
+    assert encrypted.getvalue().startswith(BLOCKS_MAGIC)
+
+    encrypted.seek(0)
+    with RSABlockReader(rsa, encrypted, workers=workers, batch_size=3) as reader:
+        assert reader.read() == message
+
+    # Streamed messages are the same format as encrypt_blocks() output
+    assert rsa.decrypt_blocks(encrypted.getvalue()) == message
+
+
+@pytest.mark.parametrize("e", [1, 2, 4, 9, 65535])
+def test_keygen_invalid_exponent(e: int) -> None:
+    """Test that bad public exponents are rejected before any prime search."""
+    with pytest.raises(NonPrimeExponentError):
+        RSAEncryptor.keygen(size=1 << 20, e=e)
+
+
+def test_keygen_small_exponent() -> None:
+    """Test that small public exponents never make the generation fail."""
+    for _ in range(20):
+        public_key, private_key = RSAEncryptor.keygen(size=64, e=3, workers=1)
+        n = int.from_bytes(public_key[1], "big")
+        d = int.from_bytes(private_key[0], "big")
+        assert pow(pow(42, 3, n), d, n) == 42
@@ -0,0 +1,69 @@
+"""Tests for the startup time of the application."""
+
+import pytest
+
+from benchmarks.startup import (
+    StartupError,
+    heavy_modules,
+    import_case,
+    import_module,
+    parse_importtime,
+)
+from cys403_project import crypto
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+-- startup benchmark --
+import time:       300 |        300 |     numpy
+import time:       200 |        500 |   cys403_project.crypto.imgenc
+import time:        50 |        550 | cys403_project.crypto
+Traceback (most recent call last):
+"""
+
+
+def test_parse_importtime() -> None:
+    """Parses the import times after the marker, with their nesting depth."""
+    imports = parse_importtime(IMPORTTIME)
+
+    assert [(entry.name, entry.depth) for entry in imports] == [
+        ("numpy", 2),
+        ("cys403_project.crypto.imgenc", 1),
+        ("cys403_project.crypto", 0),
+    ]
+    assert imports[1].self_us == 200
+    assert imports[1].cumulative_us == 500
+    assert heavy_modules(imports) == ["numpy"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "cys403_project.crypto",
+        "cys403_project.crypto.rsa",
+        "cys403_project.ui.worker_pool",
+        "cys403_project.ui.key_pool",
+    ],
+)
+def test_no_heavy_imports(module: str) -> None:
+    """Imports the modules used at startup without the heavy dependencies."""
+    result = import_case(module, repeat=1, top=3)
+
+    assert result.params["heavy"] == []
+    assert result.times[0] > 0
+    assert len(result.params["slowest"]) == 3
+
+
+def test_import_failure() -> None:
+    """Reports modules that fail to import."""
+    with pytest.raises(StartupError, match="missing_module"):
+        import_module("cys403_project.missing_module")
+
+
+def test_lazy_crypto_exports() -> None:
+    """Exports every name of the crypto package on first access."""
+    for name in crypto.__all__:
+        assert getattr(crypto, name).__name__ == name
+
+    with pytest.raises(AttributeError):
+        _ = crypto.missing_name
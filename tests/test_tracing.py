@@ -0,0 +1,122 @@
+"""Tests for tracing.py."""
+
+import json
+import random
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from cys403_project import tracing
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+from cys403_project.ui.worker_pool import SharedBuffer, WorkerPool, encrypt_image
+
+
+@pytest.fixture(autouse=True)
+def _stop_tracing() -> Iterator[None]:
+    """Stop recording spans after every test."""
+    yield
+    tracing.configure(None)
+
+
+def test_tracing_disabled(tmp_path: Path) -> None:
+    """Records nothing without a trace file."""
+    tracing.configure(None)
+
+    with tracing.span("stage", 10) as span:
+        span.size = 20
+    tracing.begin("job").end()
+
+    assert not tracing.enabled()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tracing_json_lines(tmp_path: Path) -> None:
+    """Writes nested spans with their time, size and memory as JSON lines."""
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(str(path), memory=True)
+
+    job = tracing.begin("job", mode="CBC")
+    with tracing.span("outer"):
+        with tracing.span("inner") as inner:
+            inner.size = 1 << 20
+            data = bytearray(1 << 20)
+        del data
+
+        @tracing.traced("decorated")
+        def function() -> int:
+            return 1
+
+        assert function() == 1
+    job.end()
+    job.end()
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    by_name = {event["name"]: event for event in events}
+
+    assert [event["name"] for event in events] == ["inner", "decorated", "outer", "job"]
+    assert by_name["inner"]["bytes"] == 1 << 20
+    assert by_name["inner"]["peak_traced"] >= 1 << 20
+    # The peak of nested spans counts for the outer one
+    assert by_name["outer"]["peak_traced"] >= 1 << 20
+    assert by_name["outer"]["wall"] >= by_name["inner"]["wall"]
+    assert by_name["job"]["args"] == {"mode": "CBC"}
+    assert 0 < by_name["job"]["process_peak_rss"] <= tracing.peak_rss()
+    # Spans only count their own growth of the process peak
+    assert 0 <= by_name["inner"]["rss_growth"] <= by_name["outer"]["rss_growth"]
+
+
+def test_tracing_outer_peak(tmp_path: Path) -> None:
+    """Keeps the peak of outer spans reached before a nested span started."""
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(str(path), memory=True)
+
+    job = tracing.begin("job")
+    with tracing.span("outer"):
+        data = bytearray(8 << 20)
+        del data
+        with tracing.span("inner"):
+            small = bytearray(1 << 20)
+        del small
+    job.end()
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    by_name = {event["name"]: event for event in events}
+
+    assert by_name["inner"]["peak_traced"] < 8 << 20
+    assert by_name["outer"]["peak_traced"] >= 8 << 20
+    # Spans ended manually keep their peak too
+    assert by_name["job"]["peak_traced"] >= 8 << 20
+
+
+def test_tracing_chrome_workers(tmp_path: Path) -> None:
+    """Writes a Chrome trace, including the spans of worker processes."""
+    path = tmp_path / "trace.json"
+    tracing.configure(str(path))
+
+    key = random.randbytes(16)
+    image = SharedBuffer(3000)
+    output = SharedBuffer(ImageEncryptor(key).encrypted_size(3000))
+    pool = WorkerPool(max_workers=1)
+    try:
+        with tracing.span("image.encrypt", 3000):
+            pool.submit(
+                encrypt_image, key, BlockMode.CBC, image.handle, output.handle
+            ).result()
+    finally:
+        pool.shutdown()
+        image.close()
+        output.close()
+
+    # The array is left open, as Chrome and Perfetto allow
+    text = path.read_text()
+    events = json.loads(text.rstrip().removesuffix(",") + "]")
+
+    assert text.startswith("[\n")
+    assert {event["name"] for event in events} == {
+        "image.encrypt",
+        "worker.encrypt_image",
+    }
+    assert len({event["pid"] for event in events}) == 2
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    assert all(event["args"]["bytes"] == 3000 for event in events)
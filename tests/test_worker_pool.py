@@ -0,0 +1,102 @@
+"""Tests for worker_pool.py."""
+
+import os
+import random
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from cys403_project.crypto.cipher_image import MappedCipherImage
+from cys403_project.crypto.imgenc import BlockMode, ImageEncryptor
+from cys403_project.ui.worker_pool import (
+    FileBufferHandle,
+    SharedBuffer,
+    WorkerPool,
+    decrypt_image,
+    encrypt_image,
+    generate_rsa_key,
+)
+
+
+def test_worker_pool_round_trip() -> None:
+    """Encrypts and decrypts images in shared memory through the same workers."""
+    pool = WorkerPool(max_workers=2)
+
+    try:
+        for mode in BlockMode:
+            key = random.randbytes(16)
+            image = random.randbytes(300)
+
+            source = SharedBuffer(len(image))
+            source.buf[:] = image
+            encrypted = SharedBuffer(
+                ImageEncryptor(key, mode).encrypted_size(len(image))
+            )
+            decrypted = SharedBuffer(len(encrypted.buf) - len(key))
+
+            size = pool.submit(
+                encrypt_image, key, mode, source.handle, encrypted.handle
+            ).result()
+            assert size == len(encrypted.buf)
+
+            size = pool.submit(
+                decrypt_image, key, mode, encrypted.handle, decrypted.handle
+            ).result()
+            assert decrypted.buf[:size] == image
+
+            for buffer in (source, encrypted, decrypted):
+                buffer.close()
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_file_input(tmp_path: Path) -> None:
+    """Decrypts a mapped cipher image file without copying it to the workers."""
+    pool = WorkerPool(max_workers=1)
+    key = random.randbytes(16)
+    image = random.randbytes(4 * 5 * 3)
+    path = tmp_path / "image.cipher_image"
+
+    with MappedCipherImage.create(path, 4, 5, len(key)) as cm:
+        cm.data[:] = ImageEncryptor(key).encrypt(image)
+        handle = FileBufferHandle(str(path), cm.data_offset, len(cm.data))
+
+    decrypted = SharedBuffer(handle.size - len(key))
+    try:
+        size = pool.submit(
+            decrypt_image, key, BlockMode.CBC, handle, decrypted.handle
+        ).result()
+        assert decrypted.buf[:size] == image
+    finally:
+        decrypted.close()
+        pool.shutdown()
+
+
+def test_worker_pool_keygen() -> None:
+    """Generates an RSA key in a pool worker."""
+    pool = WorkerPool(max_workers=1)
+
+    try:
+        public_key, _private_key = pool.submit(generate_rsa_key, 512, 65537).result()
+        assert int.from_bytes(public_key[1], "big").bit_length() == 512
+
+        # The primes are searched in processes spawned by the worker
+        public_key, _private_key = pool.submit(generate_rsa_key, 512, 65537, 2).result()
+        assert int.from_bytes(public_key[1], "big").bit_length() == 512
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_restarts_broken_pool() -> None:
+    """Starts new workers for later jobs after a worker died."""
+    pool = WorkerPool(max_workers=1)
+
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+
+        public_key, _private_key = pool.submit(generate_rsa_key, 512, 65537).result()
+        assert int.from_bytes(public_key[1], "big").bit_length() == 512
+    finally:
+        pool.shutdown()